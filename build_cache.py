@@ -0,0 +1,183 @@
+"""构建输入的条件下载与构建结果缓存
+
+- 上游文件通过 ETag / If-Modified-Since 条件请求下载，未变化时服务器返回 304，
+  直接复用本地文件；下载以分块流式写入临时文件并同时计算 SHA-256，
+  校验长度后再替换目标文件，多个文件并行下载
+- 构建结果按输入内容的哈希（上游文件、rules.json 和构建脚本）缓存在
+  tmp/cache/builds 下，输入未变化时直接复用，跳过规则合并和编译
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import requests
+
+CACHE_DIR = Path("tmp/cache")
+DOWNLOAD_INDEX = CACHE_DIR / "downloads.json"
+BUILD_CACHE_DIR = CACHE_DIR / "builds"
+# 保留的构建结果数量
+BUILD_CACHE_KEEP = 5
+
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# 参与构建的脚本，修改后构建结果失效
+BUILD_SOURCES = tuple(
+    Path(__file__).parent / name
+    for name in (
+        "main.py",
+        "srs.py",
+        "domain_index.py",
+        "domain_regex.py",
+        "ip_ranges.py",
+        "rule_merge.py",
+        "rule_model.py",
+    )
+)
+
+
+class DownloadError(Exception):
+    """下载失败或校验未通过"""
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_index() -> dict:
+    try:
+        with open(DOWNLOAD_INDEX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: dict) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = DOWNLOAD_INDEX.with_name(DOWNLOAD_INDEX.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, DOWNLOAD_INDEX)
+
+
+def fetch(url: str, dest: Union[str, Path], entry: Optional[dict] = None) -> dict:
+    """
+    条件下载 url 到 dest，返回该文件的缓存记录（etag、last_modified、sha256）
+    本地文件与记录的 SHA-256 一致时才发送条件请求，否则重新完整下载
+    """
+    dest = Path(dest)
+    entry = dict(entry or {})
+    headers = {}
+    if dest.exists() and entry.get("sha256") == file_sha256(dest):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        elif not entry.get("etag"):
+            headers["If-Modified-Since"] = formatdate(dest.stat().st_mtime, usegmt=True)
+
+    with requests.get(
+        url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+    ) as response:
+        if response.status_code == 304:
+            print(f"Not modified: {url}")
+            return entry
+        if response.status_code != 200:
+            raise DownloadError(f"{url}: HTTP {response.status_code}")
+
+        print(f"Downloading {url}")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name(dest.name + ".part")
+        digest = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+
+        expected = response.headers.get("Content-Length")
+        # 压缩传输时 Content-Length 为压缩后的长度，无法用于校验
+        if expected and not response.headers.get("Content-Encoding"):
+            if int(expected) != size:
+                os.remove(tmp_path)
+                raise DownloadError(
+                    f"{url}: expected {expected} bytes, received {size}"
+                )
+        os.replace(tmp_path, dest)
+
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": digest.hexdigest(),
+            "size": size,
+        }
+
+
+def fetch_all(artifacts: dict[str, Union[str, Path]]) -> dict[str, str]:
+    """并行条件下载多个文件，返回 {url: sha256}"""
+    index = _load_index()
+    with ThreadPoolExecutor(max_workers=max(1, len(artifacts))) as pool:
+        futures = {
+            url: pool.submit(fetch, url, dest, index.get(url))
+            for url, dest in artifacts.items()
+        }
+        results = {url: future.result() for url, future in futures.items()}
+    index.update(results)
+    _save_index(index)
+    return {url: entry["sha256"] for url, entry in results.items()}
+
+
+def build_key(input_hashes: Iterable[str], inputs: Iterable[Union[str, Path]]) -> str:
+    """由上游文件哈希、本地输入文件和构建脚本的内容计算构建键"""
+    digest = hashlib.sha256()
+    for value in input_hashes:
+        digest.update(value.encode("ascii") + b"\n")
+    for path in [*inputs, *BUILD_SOURCES]:
+        digest.update(f"{Path(path).name}:{file_sha256(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def restore_build(key: str, outputs: Iterable[Union[str, Path]]) -> bool:
+    """构建键对应的缓存存在时复制到输出位置，返回是否命中"""
+    build_dir = BUILD_CACHE_DIR / key
+    outputs = [Path(p) for p in outputs]
+    if not all((build_dir / p.name).exists() for p in outputs):
+        return False
+    for path in outputs:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(build_dir / path.name, path)
+    # 更新修改时间，使最近使用的构建结果不被清理
+    os.utime(build_dir)
+    return True
+
+
+def store_build(key: str, outputs: Iterable[Union[str, Path]]) -> None:
+    """保存构建结果，并只保留最近的若干个"""
+    build_dir = BUILD_CACHE_DIR / key
+    tmp_dir = BUILD_CACHE_DIR / (key + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for path in outputs:
+        shutil.copy2(path, tmp_dir / Path(path).name)
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(tmp_dir, build_dir)
+
+    builds = sorted(
+        (p for p in BUILD_CACHE_DIR.iterdir() if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in builds[BUILD_CACHE_KEEP:]:
+        shutil.rmtree(stale, ignore_errors=True)
@@ -1,12 +1,23 @@
 """优化后的Python脚本 - 改进日志输出以清晰展示逻辑关系"""
 
+import argparse
 import asyncio
 import json
 import logging
+import multiprocessing
+import os
 import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
+from domain_index import SuffixIndex, collapse_domains
+from domain_regex import RegexSet
 from helper import sort_rule_file
-from utils import check_domain
+from probe_memo import SingleFlight
+from public_suffix import get_main_domain, is_public_suffix
+from utils import check_domain, close_probe_clients, dns_limiter, http_limiter
+from verdict_store import VERDICT_DB_PATH, VerdictStore, remove_database
 
 # pylint: disable=c0103
 skip_count = 0
@@ -29,6 +40,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DOMAINS_FILE = "domains.txt"
+RESULT_FILE = "final_domain_suffix.txt"
+CHECKPOINT_FILE = "domains.checkpoint.json"
+# 记录分片输入文件对应的原始输入，用于中断后复用拆分结果
+SHARD_INDEX_FILE = "domains.shards.json"
+# 检查点的最短保存间隔，单位秒
+CHECKPOINT_INTERVAL = 5
+
+# 上级域名的探测方式，通过环境变量 ANCESTOR_PROBE_MODE 或 --ancestor-probe 选择：
+# - sequential: 逐级向上探测，上一级确认为中国域名后才探测下一级
+# - parallel: 同时探测全部上级域名（直到主域名），遇到非中国域名时取消其余探测
+ANCESTOR_PROBE_MODES = ("sequential", "parallel")
+ANCESTOR_PROBE_MODE = os.getenv("ANCESTOR_PROBE_MODE", "sequential")
+
 # 预设的域名后缀列表
 ignore_domain_suffix_list = []
 
@@ -54,65 +79,198 @@ def update_cache(domain: str, is_cn: bool):
         non_cn_domain.add(domain)
 
 
-def load_domains():
-    """读取未处理的域名列表"""
-    # pylint: disable=W0603
-    global skip_count
-    _data = []
+# 编译后的忽略后缀匹配器，每个域名只需按标签逐级探测一次
+ignore_suffix_index = SuffixIndex(ignore_domain_suffix_list)
+# rules.json 中的 domain_regex 编译为一个交替表达式，每个域名只需搜索一次
+ignore_regex_set = RegexSet(rules_data.get("domain_regex", []))
+gTLD_set = frozenset(gTLD)
 
-    try:
-        # pylint: disable=W0621
-        with open("domains.txt", "r", encoding="utf-8") as f:
-            domains = [line.strip().lower() for line in f if line.strip().lower()]
 
-        for domain in domains:
-            # 如果域名后缀在忽略列表中，则跳过
-            if any(domain.endswith(suffix) for suffix in ignore_domain_suffix_list):
-                skip_count += 1
-                continue
+def should_skip_domain(domain: str) -> bool:
+    """判断域名是否在预加载阶段被忽略，所有过滤条件在一次遍历中完成"""
+    # IPv6 地址
+    if ":" in domain or "[" in domain:
+        return True
 
-            if domain.count(".") < 1:
-                skip_count += 1
-                continue
+    tld_index = domain.rfind(".")
+    if tld_index == -1:
+        return True
 
-            if ":" in domain or "[" in domain:
-                skip_count += 1
-                continue
+    # 检查顶级域名是否在 gTLD 列表中
+    if domain[tld_index + 1 :] not in gTLD_set:
+        return True
 
-            if "google" in domain:
-                skip_count += 1
-                continue
+    if domain.startswith("www") or "google" in domain:
+        return True
 
-            if domain.startswith("www"):
-                skip_count += 1
-                continue
+    # 如果域名后缀在忽略列表中，或已被自定义正则规则匹配，则跳过
+    return ignore_suffix_index.covers(domain) or ignore_regex_set.search(domain)
 
-            # 检查域名后缀是否在 gTLD 列表中
-            if not any(domain.endswith(suffix) for suffix in gTLD):
-                skip_count += 1
-                continue
 
-            _data.append(domain)
+def shard_of(domain: str, shards: int) -> int:
+    """按主域名的哈希值计算域名所属的分片，同一主域名下的域名总是位于同一分片"""
+    return zlib.crc32(get_main_domain(domain).encode("utf-8")) % shards
 
-        return _data
 
-    except Exception as e:  # pylint: disable=W0718
-        logger.error("加载domains.txt失败: %s", str(e))
-        return []
+def shard_path(path: str, shard: int, shards: int) -> str:
+    """分片使用的文件路径，例如 final_domain_suffix.txt -> final_domain_suffix.0.txt"""
+    if shards <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard}{ext}"
 
 
-# 添加全局变量
+def iter_domains(path: str = DOMAINS_FILE, start_line: int = 0, prefiltered=False):
+    """
+    逐行惰性读取域名列表，返回 (行号, 域名)
+    从 start_line 行开始读取，被过滤的域名计入 skip_count，
+    prefiltered 为 True 时输入已经过滤（分片的输入文件），不再检查
+    """
+    # pylint: disable=W0603
+    global skip_count
+
+    # pylint: disable=W0621
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            if line_no < start_line:
+                continue
+
+            domain = line.strip().lower()
+            if not domain:
+                continue
+
+            if not prefiltered and should_skip_domain(domain):
+                skip_count += 1
+                continue
+
+            yield line_no, domain
+
+
+def split_domains(path: str, shards: int) -> int:
+    """
+    父进程只读取一次输入，过滤后按主域名哈希写入各分片的输入文件，
+    返回预加载阶段忽略的域名数量
+    输入文件未变化且分片文件齐全时复用上次的拆分结果，各分片的检查点因此保持有效
+    """
+    stat = os.stat(path)
+    fingerprint = {
+        "source": path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "shards": shards,
+    }
+    shard_files = [shard_path(path, shard, shards) for shard in range(shards)]
+    try:
+        with open(SHARD_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("fingerprint") == fingerprint and all(
+            os.path.exists(p) for p in shard_files
+        ):
+            logger.info("输入文件未变化，复用已拆分的 %d 个分片", shards)
+            return int(index["skipped"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    skipped_before = skip_count
+    # pylint: disable=R1732
+    outputs = [open(p, "w", encoding="utf-8") for p in shard_files]
+    try:
+        for _, domain in iter_domains(path):
+            outputs[shard_of(domain, shards)].write(domain + "\n")
+    finally:
+        for output in outputs:
+            output.close()
+    skipped = skip_count - skipped_before
+
+    tmp_path = SHARD_INDEX_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "skipped": skipped}, f)
+    os.replace(tmp_path, SHARD_INDEX_FILE)
+    return skipped
+
+
+def remove_split(path: str, shards: int) -> None:
+    """全部分片处理完成后删除分片的输入文件"""
+    for shard in range(shards):
+        os.remove(shard_path(path, shard, shards))
+    os.remove(SHARD_INDEX_FILE)
+
+
+class Checkpoint:
+    """
+    记录输入文件中已全部处理完成的行号，用于中断后从该行恢复
+    检查点与输入文件的大小和修改时间绑定，输入文件变化后检查点失效
+    """
+
+    def __init__(self, path: str, source: str, shards: int = 1):
+        self.path = path
+        stat = os.stat(source)
+        self._fingerprint = {"source": source, "size": stat.st_size}
+        self._fingerprint["mtime_ns"] = stat.st_mtime_ns
+        # 分片数变化后各分片处理的域名不同，检查点同样失效
+        if shards > 1:
+            self._fingerprint["shards"] = shards
+        # 已分发但尚未处理完成的行号
+        self._pending: set[int] = set()
+        # 下一个将被读取的行号
+        self._frontier = 0
+        self._saved_at = 0.0
+        self.start_line = self._load()
+        self._frontier = self.start_line
+
+    def _load(self) -> int:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if any(data.get(k) != v for k, v in self._fingerprint.items()):
+            logger.info("输入文件已变化，忽略检查点 %s", self.path)
+            return 0
+        return int(data.get("next_line", 0))
+
+    @property
+    def next_line(self) -> int:
+        """该行之前的所有行都已处理完成"""
+        return min(self._pending) if self._pending else self._frontier
+
+    def dispatch(self, line_no: int) -> None:
+        """记录一行已分发给工作协程"""
+        self._pending.add(line_no)
+        self._frontier = line_no + 1
+
+    def done(self, line_no: int) -> None:
+        """记录一行已处理完成，并定期保存检查点"""
+        self._pending.discard(line_no)
+        if time.monotonic() - self._saved_at >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """保存检查点"""
+        data = dict(self._fingerprint, next_line=self.next_line)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def clear(self) -> None:
+        """输入处理完毕后删除检查点"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# 工作协程数量，即同时处理的域名数上限，多进程运行时按进程数平分
+# DNS 和 HTTP 探测的实际并发由 utils 中的自适应限制器控制
 MAX_CONCURRENCY = 200
-session = None
-semaphore = None
+# 正在进行中的域名检查，用于合并同一域名的并发检查
+inflight_checks = SingleFlight()
+# 跨运行的持久化判定缓存
+verdict_store = VerdictStore()
 
 
 async def is_china_domain(domain):
     """检查域名是否为中国域名"""
-    # 确保 semaphore 已初始化
-    if semaphore is None:
-        raise RuntimeError("Semaphore 未初始化")
-
     # 检查缓存
     if domain in cn_domain:
         logger.info("域名检查: [%s] -> [%s]", "✅", domain)
@@ -121,93 +279,114 @@ async def is_china_domain(domain):
         logger.info("域名检查: [%s] -> [%s]", "❌", domain)
         return False
 
-    try:
-        async with semaphore:  # 此时 semaphore 已确保不为 None
-            data = await check_domain(domain)
-            is_chinese = data.get("is_chinese_ip", False)
-            logger.info("域名检查: [%s] -> [%s]", "✅" if is_chinese else "❌", domain)
+    # 检查持久化缓存
+    cached = verdict_store.get(domain)
+    if cached is not None:
+        logger.info("域名检查(缓存): [%s] -> [%s]", "✅" if cached else "❌", domain)
+        update_cache(domain, cached)
+        return cached
 
-            # 更新缓存
-            update_cache(domain, is_chinese)
-            return is_chinese
+    # 同一域名的并发检查合并为一次探测
+    return await inflight_checks.do(domain, lambda: check_china_domain(domain))
+
+
+async def check_china_domain(domain):
+    """探测域名是否为中国域名并更新缓存"""
+    try:
+        data = await check_domain(domain)
+        is_chinese = data.get("is_chinese_ip", False)
+        logger.info("域名检查: [%s] -> [%s]", "✅" if is_chinese else "❌", domain)
+
+        # 更新缓存，探测未完成（超时等临时故障）的结果不持久化
+        update_cache(domain, is_chinese)
+        if data.get("conclusive", True):
+            verdict_store.put(
+                domain, is_chinese, data.get("ips", []), data.get("country")
+            )
+        else:
+            logger.info("域名[%s]探测未完成，不保存判定结果", domain)
+        return is_chinese
 
     except Exception as e:
         logger.error("检查域名[%s]失败: %s", domain, str(e))
         return False
 
 
-async def get_china_domain_suffix(domain):
-    """获取中国域名的后缀"""
-
-    finally_domain = domain
+def set_ancestor_probe_mode(mode: str) -> None:
+    """设置本次运行的上级域名探测方式"""
+    # pylint: disable=W0603
+    global ANCESTOR_PROBE_MODE
+    if mode not in ANCESTOR_PROBE_MODES:
+        raise ValueError(f"不支持的上级域名探测方式: {mode}")
+    ANCESTOR_PROBE_MODE = mode
+
+
+def get_ancestor_domains(domain: str) -> list[str]:
+    """
+    返回需要探测的上级域名，由近到远排列，例如 a.b.example.com -> [b.example.com, example.com]
+    公共后缀（如 com.cn）不属于任何站点，无需探测
+    """
+    ancestors = []
     current_domain = domain
-
-    # 记录已检查过的域名以避免重复检查
-    checked_domains = set()
-
     while current_domain.count(".") > 1:
         # 获取当前域名去掉最左边一级后的部分
         sub_domain = current_domain.split(".", 1)[1]
-
-        # 如果该域名已经检查过，直接跳过
-        if sub_domain in checked_domains:
+        if is_public_suffix(sub_domain):
             break
+        ancestors.append(sub_domain)
+        current_domain = sub_domain
+    return ancestors
 
-        checked_domains.add(sub_domain)
 
-        if await is_china_domain(sub_domain):
-            finally_domain = sub_domain
-        else:
+async def get_china_domain_suffix(domain):
+    """获取中国域名的后缀：从近到远连续确认为中国域名的最短上级域名"""
+    if ANCESTOR_PROBE_MODE == "parallel":
+        return await get_china_domain_suffix_parallel(domain)
+
+    finally_domain = domain
+    for sub_domain in get_ancestor_domains(domain):
+        if not await is_china_domain(sub_domain):
             break
+        finally_domain = sub_domain
+
+    return finally_domain
 
-        current_domain = sub_domain
+
+async def get_china_domain_suffix_parallel(domain):
+    """
+    同时探测全部上级域名，再由近到远检查结果，
+    遇到非中国域名时取消更远的上级域名的探测，耗时取决于最慢的单个探测
+    """
+    ancestors = get_ancestor_domains(domain)
+    tasks = [asyncio.ensure_future(is_china_domain(d)) for d in ancestors]
+
+    finally_domain = domain
+    try:
+        for sub_domain, task in zip(ancestors, tasks):
+            if not await task:
+                break
+            finally_domain = sub_domain
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     return finally_domain
 
 
 def get_domain_list(domain_list: set[str]):
     """获取域名列表"""
-    domain_suffix = set()
-    for domain in domain_list:
-        # 获取域名后缀
-        if domain.count(".") > 1:
-            # 取最后两级域名
-            domain_suffix.add(".".join(domain.split(".")[-2:]))
-
-    summary = {}
-    for domain_suffix_item in domain_suffix:
-        if domain_suffix_item not in summary:
-            summary[domain_suffix_item] = 0
-
-        for domain in domain_list:
-            if domain.endswith(domain_suffix_item):
-                summary[domain_suffix_item] += 1
-    ready_delete_domain_list = []
-    data = []
-
-    for item, count in summary.items():
-        if count >= 2:
-            for domain in domain_list:
-                if domain.endswith(item):
-                    ready_delete_domain_list.append(domain)
-            data.append(item)
-
-    for domain in domain_list:
-        if domain in ready_delete_domain_list:
-            continue
-        data.append(domain)
-
-    return data
-
-
-async def process_domain(domain, index, total):
+    return collapse_domains(domain_list, get_main_domain)
+
+
+async def process_domain(domain, index):
     """处理单个域名"""
     is_cn = await is_china_domain(domain)
     result = None
     if is_cn:
         result = await get_china_domain_suffix(domain)
 
-    logger.info("正在处理域名 [%d/%d]  [%s]", index, total, "✅" if is_cn else "❌")
+    logger.info("正在处理域名 [%d]  [%s]", index, "✅" if is_cn else "❌")
 
     return result
 
@@ -242,35 +421,179 @@ async def merge_local_china_rules():
         logger.error("读取 rules/china.txt 失败: %s", str(e))
 
 
-async def main():
-    """主函数"""
-    global semaphore
-    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+async def analyze_domains(
+    shard: int = 0, shards: int = 1, concurrency: int = MAX_CONCURRENCY
+) -> set[str]:
+    """
+    以流式方式处理域名列表：惰性读取输入，通过有界队列分发给 concurrency 个工作协程，
+    结果逐条追加到 final_domain_suffix.txt，并定期保存检查点以便中断后恢复
+    shards 大于 1 时处理父进程拆分出的 shard 分片的输入文件，
+    结果和检查点使用分片各自的文件
+    """
+    source = shard_path(DOMAINS_FILE, shard, shards)
+    result_path = shard_path(RESULT_FILE, shard, shards)
+    checkpoint = Checkpoint(shard_path(CHECKPOINT_FILE, shard, shards), source, shards)
+    if checkpoint.start_line:
+        logger.info("从检查点恢复，跳过前 %d 行", checkpoint.start_line)
+    # 有界队列限制内存中同时存在的域名数量
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
 
-    domain_list = load_domains()
-    if not domain_list:
-        logger.info("没有需要处理的域名")
-        return
+    # pylint: disable=W0621
+    with open(
+        result_path, "a" if checkpoint.start_line else "w", encoding="utf-8"
+    ) as result_file:
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    line_no, domain = item
+                    try:
+                        result = await process_domain(domain, line_no + 1)
+                    except Exception as e:  # pylint: disable=W0718
+                        logger.error("处理域名[%s]失败: %s", domain, str(e))
+                        result = None
+                    if result:
+                        result_file.write(result + "\n")
+                        result_file.flush()
+                    checkpoint.done(line_no)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for line_no, domain in iter_domains(
+                source, checkpoint.start_line, prefiltered=shards > 1
+            ):
+                checkpoint.dispatch(line_no)
+                await queue.put((line_no, domain))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            checkpoint.save()
+            await close_probe_clients()
+            verdict_store.flush()
+            logger.info(
+                "并发窗口: DNS %d, HTTP %d", dns_limiter.window, http_limiter.window
+            )
+
+    # 读取本次运行（包括恢复前）追加的全部结果并去重
+    with open(result_path, "r", encoding="utf-8") as f:
+        finally_domain_list = {line.strip() for line in f if line.strip()}
 
-    logger.info("开始处理域名列表")
-    total_domains = len(domain_list)
+    # 将最终的域名后缀保存到文件
+    write_result_file(result_path, finally_domain_list)
 
-    # 并发处理域名
-    tasks = [
-        process_domain(domain, i + 1, total_domains)
-        for i, domain in enumerate(domain_list)
-    ]
-    results = await asyncio.gather(*tasks)
+    checkpoint.clear()
+    return finally_domain_list
 
-    # 过滤掉None结果
-    finally_domain_list = set(filter(None, results))
 
-    # 将最终的域名后缀保存到文件
-    # pylint: disable=W0621
-    with open("final_domain_suffix.txt", "w", encoding="utf-8") as f:
-        for domain in finally_domain_list:
+def write_result_file(path: str, domains: set[str]) -> None:
+    """将域名后缀排序后写入结果文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        for domain in sorted(domains):
             f.write(domain + "\n")
 
+
+def run_shard(
+    shard: int, shards: int, ancestor_probe_mode: str = "sequential"
+) -> list[str]:
+    """
+    子进程入口：在独立的事件循环中处理一个分片，返回该分片的域名后缀（已排序）
+    工作协程数量和 DNS、HTTP 并发预算按分片数平分，
+    判定结果写入分片各自的数据库，查询时同时读取共享的数据库
+    """
+    # pylint: disable=W0603
+    global verdict_store
+
+    set_ancestor_probe_mode(ancestor_probe_mode)
+    dns_limiter.divide(shards)
+    http_limiter.divide(shards)
+    verdict_store = VerdictStore(
+        shard_verdict_path(shard, shards), base=VERDICT_DB_PATH
+    )
+    try:
+        result = asyncio.run(
+            analyze_domains(shard, shards, max(1, MAX_CONCURRENCY // shards))
+        )
+    finally:
+        verdict_store.close()
+    return sorted(result)
+
+
+def shard_verdict_path(shard: int, shards: int) -> Path:
+    """分片写入判定结果使用的数据库"""
+    return Path(shard_path(str(VERDICT_DB_PATH), shard, shards))
+
+
+async def analyze_domains_sharded(workers: int) -> set[str]:
+    """
+    父进程读取一次输入并按主域名哈希拆分为 workers 个分片，由各进程并行处理，
+    每个进程拥有各自的事件循环、DNS 解析器、HTTP 会话和判定数据库，
+    父进程按固定顺序合并各分片的结果写入 final_domain_suffix.txt，
+    并将各分片的判定结果合并到共享的数据库中
+    """
+    # pylint: disable=W0603
+    global skip_count
+
+    skip_count = split_domains(DOMAINS_FILE, workers)
+
+    loop = asyncio.get_running_loop()
+    # 使用 spawn 启动子进程，避免继承父进程的事件循环和网络连接
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            shard_results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool, run_shard, shard, workers, ANCESTOR_PROBE_MODE
+                    )
+                    for shard in range(workers)
+                )
+            )
+    finally:
+        # 中断时同样保留已完成的判定
+        for shard in range(workers):
+            path = shard_verdict_path(shard, workers)
+            verdict_store.merge(path)
+            remove_database(path)
+
+    finally_domain_list = set()
+    for domains in shard_results:
+        finally_domain_list.update(domains)
+
+    write_result_file(RESULT_FILE, finally_domain_list)
+    for shard in range(workers):
+        os.remove(shard_path(RESULT_FILE, shard, workers))
+    remove_split(DOMAINS_FILE, workers)
+    return finally_domain_list
+
+
+async def main(workers: int = 1):
+    """主函数"""
+    # 只检查输入文件，分析过程中的其他错误（如缺少 GeoIP 数据库）照常抛出
+    try:
+        with open(DOMAINS_FILE, "r", encoding="utf-8"):
+            pass
+    except FileNotFoundError as e:
+        logger.error("加载domains.txt失败: %s", str(e))
+        return
+
+    logger.info("开始处理域名列表")
+    if workers > 1:
+        finally_domain_list = await analyze_domains_sharded(workers)
+    else:
+        finally_domain_list = await analyze_domains()
+
+    if not finally_domain_list:
+        logger.info("没有新增的中国域名后缀")
+        return
+
     finally_domain_list = get_domain_list(finally_domain_list)
 
     # data = json.loads("rules.json")
@@ -290,12 +613,30 @@ async def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分析域名列表中的中国域名后缀")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并行处理的进程数，按主域名哈希对域名进行分片（默认 1）",
+    )
+    parser.add_argument(
+        "--ancestor-probe",
+        choices=ANCESTOR_PROBE_MODES,
+        default=ANCESTOR_PROBE_MODE,
+        help="上级域名的探测方式：逐级探测或同时探测全部上级域名",
+    )
+    args = parser.parse_args()
+    set_ancestor_probe_mode(args.ancestor_probe)
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.workers))
         time.sleep(5)  # 等待日志输出完成
         asyncio.run(sort_rule_file(True))
         print("预加载阶段忽略的域名列表: ", skip_count)
     except Exception as e:  # pylint: disable=W0718
         logger.exception("程序执行出错: %s", str(e))
+    finally:
+        verdict_store.close()
 
     asyncio.run(merge_local_china_rules())
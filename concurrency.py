@@ -0,0 +1,188 @@
+"""自适应并发限制
+
+AdaptiveLimiter 按 AIMD（加性增、乘性减）调整并发窗口：每处理完一个窗口
+大小的请求评估一次错误率，错误率超过阈值时窗口按比例缩小，
+窗口被占满且错误率正常时窗口加一。
+
+公共 DNS 服务器会对过高的并发进行限速，超时会被误判为非中国域名，
+因此 DNS 和 HTTP 探测分别使用各自的限制器，窗口变化会写入日志。
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# 错误率超过该值时缩小窗口
+LIMITER_ERROR_THRESHOLD = 0.05
+# 缩小窗口时乘以的系数
+LIMITER_DECREASE_FACTOR = 0.5
+# 每轮评估至少需要的完成数，避免窗口很小时样本过少
+LIMITER_MIN_EPOCH = 10
+
+
+class Slot:
+    """一次占用的并发名额，用于报告该请求是否出错"""
+
+    __slots__ = ("epoch", "failed")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.failed = False
+
+    def error(self) -> None:
+        """将本次请求记为出错（超时、被拒绝等过载信号）"""
+        self.failed = True
+
+
+class AdaptiveLimiter:
+    """AIMD 并发限制器，名额按请求顺序分配"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        error_types: tuple[type[BaseException], ...] = (TimeoutError,),
+        error_threshold: float = LIMITER_ERROR_THRESHOLD,
+        decrease_factor: float = LIMITER_DECREASE_FACTOR,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else initial * 4
+        # 在 slot() 中抛出时自动记为出错的异常类型
+        self.error_types = error_types
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self._limit = float(max(min_limit, min(initial, self.max_limit)))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self._in_flight = 0
+
+        # 当前评估轮次的统计
+        self._epoch = 0
+        self._completed = 0
+        self._errors = 0
+        self._saturated = False
+        # 最近一次缩小窗口时的轮次，之前发出的请求不再计入统计
+        self._decreased_epoch = 0
+
+    @property
+    def window(self) -> int:
+        """当前的并发窗口"""
+        return int(self._limit)
+
+    def divide(self, parts: int) -> None:
+        """将并发预算平分给 parts 个进程：当前窗口和窗口上限都除以 parts"""
+        parts = max(1, parts)
+        self.max_limit = max(self.min_limit, self.max_limit // parts)
+        self._limit = max(
+            float(self.min_limit), min(self._limit / parts, self.max_limit)
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """正在进行中的请求数"""
+        return self._in_flight
+
+    def __repr__(self) -> str:
+        return (
+            f"<AdaptiveLimiter {self.name} window={self.window} "
+            f"in_flight={self._in_flight} waiting={len(self._waiters)}>"
+        )
+
+    def _check_loop(self) -> asyncio.AbstractEventLoop:
+        """名额与事件循环绑定，事件循环变化时重置名额，保留已学习到的窗口"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = deque()
+            self._in_flight = 0
+        return loop
+
+    def _wake(self) -> None:
+        """将空闲的名额按顺序交给等待者"""
+        while self._waiters and self._in_flight < self.window:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+        if self._waiters:
+            self._saturated = True
+
+    async def acquire(self) -> Slot:
+        """等待并占用一个名额"""
+        loop = self._check_loop()
+        if self._in_flight < self.window and not self._waiters:
+            self._in_flight += 1
+            if self._in_flight >= self.window:
+                self._saturated = True
+            return Slot(self._epoch)
+
+        self._saturated = True
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已经分配给本请求，交还给下一个等待者
+                self._in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return Slot(self._epoch)
+
+    def release(self, slot: Slot) -> None:
+        """归还名额并记录请求结果"""
+        self._in_flight = max(0, self._in_flight - 1)
+        if slot.epoch >= self._decreased_epoch:
+            self._record(slot.failed)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Slot]:
+        """占用一个名额，error_types 中的异常会自动记为出错"""
+        slot = await self.acquire()
+        try:
+            yield slot
+        except self.error_types:
+            slot.error()
+            raise
+        finally:
+            self.release(slot)
+
+    def _record(self, failed: bool) -> None:
+        self._completed += 1
+        if failed:
+            self._errors += 1
+        if self._completed < max(LIMITER_MIN_EPOCH, self.window):
+            return
+
+        error_rate = self._errors / self._completed
+        previous = self.window
+        if error_rate > self.error_threshold:
+            self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            self._decreased_epoch = self._epoch + 1
+        elif self._saturated:
+            self._limit = min(float(self.max_limit), self._limit + 1)
+
+        if self.window != previous:
+            logger.info(
+                "%s 并发窗口: %d -> %d (错误率 %.1f%%)",
+                self.name,
+                previous,
+                self.window,
+                error_rate * 100,
+            )
+
+        self._epoch += 1
+        self._completed = 0
+        self._errors = 0
+        self._saturated = bool(self._waiters) or self._in_flight >= self.window
@@ -0,0 +1,308 @@
+"""DNS 解析器连接池与应答缓存
+
+每个 DNS 服务器只维护一个长期存在的 aiodns 解析器（c-ares channel），
+解析结果按 (域名, 记录类型) 缓存并遵循记录的 TTL，NXDOMAIN 等否定应答
+按固定 TTL 进行否定缓存。
+
+查询优先发往延迟和错误率最低的服务器，超过对冲延迟仍未返回时，
+再向下一个服务器发送对冲查询，采用最先返回的应答。
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import aiodns
+import aiodns.error
+
+logger = logging.getLogger(__name__)
+
+# 否定应答（NXDOMAIN / NODATA）的缓存时间，单位秒
+DNS_NEGATIVE_TTL = 300
+# 肯定应答缓存时间的上下限，单位秒
+DNS_MIN_TTL = 30
+DNS_MAX_TTL = 24 * 3600
+# 缓存的最大条目数
+DNS_CACHE_SIZE = 1 << 18
+# 单个服务器的查询超时时间，单位秒
+DNS_QUERY_TIMEOUT = 3.0
+# 主服务器超过该时间仍未应答时，向下一个服务器发送对冲查询，单位秒
+DNS_HEDGE_DELAY = 0.3
+# 延迟和错误率 EWMA 的平滑系数
+DNS_EWMA_ALPHA = 0.2
+
+# 表示域名不存在或没有对应类型记录的 c-ares 错误码
+_NEGATIVE_ERRORS = {aiodns.error.ARES_ENOTFOUND, aiodns.error.ARES_ENODATA}
+
+
+class DNSResolutionError(Exception):
+    """域名解析失败（服务器错误、拒绝应答或无法连接），不包括域名不存在"""
+
+    def __init__(self, name: str, message: str, nameserver: Optional[str] = None):
+        super().__init__(f"{name}: {message} (nameserver: {nameserver})")
+        self.name = name
+        self.nameserver = nameserver
+
+
+class DNSTimeoutError(DNSResolutionError):
+    """DNS 查询超时"""
+
+
+class NameserverSelector:
+    """记录每个 DNS 服务器的延迟与错误率（EWMA），按健康程度排序"""
+
+    def __init__(
+        self,
+        nameservers: Sequence[str],
+        alpha: float = DNS_EWMA_ALPHA,
+        error_penalty: float = DNS_QUERY_TIMEOUT,
+    ):
+        self.alpha = alpha
+        # 错误率折算为延迟惩罚时使用的系数，单位秒
+        self.error_penalty = error_penalty
+        self._latency: dict[str, float] = {}
+        self._error_rate: dict[str, float] = {}
+        self.nameservers = nameservers
+
+    @property
+    def nameservers(self) -> list[str]:
+        """全部 DNS 服务器"""
+        return list(self._latency)
+
+    @nameservers.setter
+    def nameservers(self, value: Sequence[str]) -> None:
+        # 尚未使用过的服务器延迟记为 0，使其优先得到尝试
+        self._latency = {ns: self._latency.get(ns, 0.0) for ns in value}
+        self._error_rate = {ns: self._error_rate.get(ns, 0.0) for ns in value}
+
+    def score(self, nameserver: str) -> float:
+        """服务器得分，越小越好"""
+        return (
+            self._latency[nameserver]
+            + self._error_rate[nameserver] * self.error_penalty
+        )
+
+    def ranked(self) -> list[str]:
+        """按得分从优到劣排序的服务器列表，得分相同时随机排序"""
+        servers = self.nameservers
+        random.shuffle(servers)
+        return sorted(servers, key=self.score)
+
+    def record_latency(self, nameserver: str, latency: float) -> None:
+        """记录一次延迟样本"""
+        if nameserver not in self._latency:
+            return
+        self._latency[nameserver] += self.alpha * (latency - self._latency[nameserver])
+
+    def record_success(self, nameserver: str, latency: float) -> None:
+        """记录一次成功的查询"""
+        if nameserver not in self._error_rate:
+            return
+        self.record_latency(nameserver, latency)
+        self._error_rate[nameserver] *= 1 - self.alpha
+
+    def record_failure(self, nameserver: str) -> None:
+        """记录一次失败的查询"""
+        if nameserver not in self._error_rate:
+            return
+        self._error_rate[nameserver] += self.alpha * (1 - self._error_rate[nameserver])
+
+    def stats(self) -> dict[str, tuple[float, float]]:
+        """每个服务器当前的 (延迟, 错误率)"""
+        return {ns: (self._latency[ns], self._error_rate[ns]) for ns in self._latency}
+
+
+class DNSCache:
+    """按 (域名, 记录类型) 缓存的 DNS 应答，空元组表示否定应答"""
+
+    __slots__ = ("_entries", "maxsize")
+
+    def __init__(self, maxsize: int = DNS_CACHE_SIZE):
+        self._entries: OrderedDict[tuple[str, str], tuple[float, tuple[str, ...]]]
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str, qtype: str) -> Optional[tuple[str, ...]]:
+        """返回未过期的缓存应答，不存在或已过期时返回 None"""
+        key = (name, qtype)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, records = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return records
+
+    def put(self, name: str, qtype: str, records: Sequence[str], ttl: float) -> None:
+        """写入缓存应答"""
+        key = (name, qtype)
+        self._entries[key] = (time.monotonic() + ttl, tuple(records))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+
+class DNSResolverPool:
+    """每个 DNS 服务器一个长期解析器，共享一份应答缓存，并对慢服务器进行对冲查询"""
+
+    def __init__(
+        self,
+        nameservers: Sequence[str],
+        cache: Optional[DNSCache] = None,
+        hedge_delay: float = DNS_HEDGE_DELAY,
+        timeout: float = DNS_QUERY_TIMEOUT,
+    ):
+        self.selector = NameserverSelector(nameservers)
+        self.cache = cache if cache is not None else DNSCache()
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self._resolvers: dict[str, aiodns.DNSResolver] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def nameservers(self) -> list[str]:
+        """全部 DNS 服务器"""
+        return self.selector.nameservers
+
+    @nameservers.setter
+    def nameservers(self, value: Sequence[str]) -> None:
+        self.selector.nameservers = value
+
+    def _get_resolver(self, nameserver: str) -> aiodns.DNSResolver:
+        """获取指定服务器的解析器，解析器与事件循环绑定，事件循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._resolvers.clear()
+            self._loop = loop
+
+        resolver = self._resolvers.get(nameserver)
+        if resolver is None:
+            # 重试由对冲查询负责，c-ares 自身只尝试一次
+            resolver = aiodns.DNSResolver(
+                nameservers=[nameserver], loop=loop, timeout=self.timeout, tries=1
+            )
+            self._resolvers[nameserver] = resolver
+        return resolver
+
+    async def _query_server(
+        self, nameserver: str, name: str, qtype: str
+    ) -> tuple[tuple[str, ...], float]:
+        """向单个服务器查询，返回 (记录, TTL)，并更新该服务器的健康统计"""
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self._get_resolver(nameserver).query(name, qtype), self.timeout
+            )
+        except asyncio.CancelledError:
+            # 被对冲查询抢先时，已等待的时间是该服务器延迟的下限
+            self.selector.record_latency(nameserver, time.monotonic() - started)
+            raise
+        except asyncio.TimeoutError as e:
+            self.selector.record_failure(nameserver)
+            raise DNSTimeoutError(name, "query timed out", nameserver) from e
+        except aiodns.error.DNSError as e:
+            if e.args and e.args[0] in _NEGATIVE_ERRORS:
+                self.selector.record_success(nameserver, time.monotonic() - started)
+                return (), DNS_NEGATIVE_TTL
+            self.selector.record_failure(nameserver)
+            if e.args and e.args[0] == aiodns.error.ARES_ETIMEOUT:
+                raise DNSTimeoutError(name, "query timed out", nameserver) from e
+            message = e.args[1] if len(e.args) > 1 else str(e)
+            raise DNSResolutionError(name, message, nameserver) from e
+
+        self.selector.record_success(nameserver, time.monotonic() - started)
+        records = tuple(dict.fromkeys(record.host for record in result))
+        ttl = min((record.ttl for record in result), default=DNS_NEGATIVE_TTL)
+        return records, max(DNS_MIN_TTL, min(ttl, DNS_MAX_TTL))
+
+    async def query(self, name: str, qtype: str) -> tuple[str, ...]:
+        """
+        查询单一类型的记录，返回全部记录的地址
+        域名不存在或没有该类型记录时返回空元组，其他错误抛出 DNSResolutionError
+        """
+        records = self.cache.get(name, qtype)
+        if records is not None:
+            return records
+
+        servers = self.selector.ranked()
+        if not servers:
+            raise DNSResolutionError(name, "no nameserver configured")
+
+        pending: set[asyncio.Task] = set()
+        next_server = 0
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal next_server
+            pending.add(
+                asyncio.ensure_future(
+                    self._query_server(servers[next_server], name, qtype)
+                )
+            )
+            next_server += 1
+
+        launch()
+        try:
+            while pending:
+                # 还有未使用的服务器时，等待对冲延迟后向下一个服务器发起查询
+                timeout = self.hedge_delay if next_server < len(servers) else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        records, ttl = task.result()
+                        self.cache.put(name, qtype, records, ttl)
+                        return records
+                    last_error = task.exception()
+
+                # 已发出的查询全部失败时，立即尝试下一个服务器
+                if not pending and next_server < len(servers):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if last_error is None:
+            raise DNSResolutionError(name, "no answer from any nameserver")
+        raise last_error
+
+    async def resolve(self, name: str) -> list[str]:
+        """
+        同时查询 A 和 AAAA 记录，返回全部地址（IPv4 在前）
+        两种记录都查询失败时抛出 DNSResolutionError
+        """
+        results = await asyncio.gather(
+            self.query(name, "A"),
+            self.query(name, "AAAA"),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        ips = [ip for r in results if not isinstance(r, BaseException) for ip in r]
+        if errors and not ips:
+            raise errors[0]
+        return ips
+
+    async def close(self) -> None:
+        """关闭全部解析器"""
+        resolvers = list(self._resolvers.values())
+        self._resolvers.clear()
+        self._loop = None
+        for resolver in resolvers:
+            await resolver.close()
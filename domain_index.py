@@ -0,0 +1,121 @@
+"""域名后缀索引
+
+按标签边界逐级探测域名的各级后缀（等价于反转标签路径的哈希集合），
+用于判断某个域名是否已被后缀规则覆盖。匹配语义与 sing-box 的
+domain_suffix 一致：
+- ``example.com`` 匹配 ``example.com`` 及其所有子域名
+- ``.example.com`` 只匹配 ``example.com`` 的子域名
+
+同时提供按主域名分组、合并子域名的线性时间工具函数。
+"""
+
+from typing import Callable, Iterable, Optional
+
+
+def normalize_domain(domain: str) -> str:
+    """统一域名格式：去除首尾空白和末尾的根点，并转为小写"""
+    return domain.strip().rstrip(".").lower()
+
+
+class SuffixIndex:
+    """域名后缀索引，单次查询的开销只与域名的标签数量相关"""
+
+    __slots__ = ("_suffixes", "_subdomain_suffixes")
+
+    def __init__(self, suffixes: Iterable[str] = ()):
+        # 普通后缀：匹配自身及子域名
+        self._suffixes: set[str] = set()
+        # 以 . 开头的后缀（存储时去掉前导点）：只匹配子域名
+        self._subdomain_suffixes: set[str] = set()
+        for suffix in suffixes:
+            self.add(suffix)
+
+    def __len__(self) -> int:
+        return len(self._suffixes) + len(self._subdomain_suffixes)
+
+    def __contains__(self, suffix: str) -> bool:
+        suffix = normalize_domain(suffix)
+        if suffix.startswith("."):
+            return suffix[1:] in self._subdomain_suffixes
+        return suffix in self._suffixes
+
+    def add(self, suffix: str) -> None:
+        """添加一条后缀规则"""
+        suffix = normalize_domain(suffix)
+        if not suffix:
+            return
+        if suffix.startswith("."):
+            self._subdomain_suffixes.add(suffix[1:])
+        else:
+            self._suffixes.add(suffix)
+
+    def match(self, domain: str) -> Optional[str]:
+        """
+        返回匹配该域名的后缀规则，没有匹配时返回 None
+        """
+        return self.match_normalized(normalize_domain(domain))
+
+    def match_normalized(self, domain: str) -> Optional[str]:
+        """
+        与 match 相同，但要求域名已经过 normalize_domain 处理，用于高频查询
+        """
+        if not domain:
+            return None
+
+        if domain.startswith("."):
+            # 子域名规则：当其根域名本身被覆盖时，其所有子域名也被覆盖
+            root = domain[1:]
+            if root in self._subdomain_suffixes:
+                return domain
+            return self.match_normalized(root)
+
+        if domain in self._suffixes:
+            return domain
+
+        # 逐级去掉最左侧标签，只在标签边界上探测
+        index = domain.find(".")
+        while index != -1:
+            parent = domain[index + 1 :]
+            if parent in self._suffixes:
+                return parent
+            if parent in self._subdomain_suffixes:
+                return "." + parent
+            index = domain.find(".", index + 1)
+        return None
+
+    def covers(self, domain: str) -> bool:
+        """判断域名是否已被索引中的后缀规则覆盖"""
+        return self.match(domain) is not None
+
+
+def group_domains(
+    domains: Iterable[str], key: Callable[[str], str]
+) -> dict[str, set[str]]:
+    """按主域名对域名进行一次性分组"""
+    groups: dict[str, set[str]] = {}
+    for domain in domains:
+        parent = key(domain)
+        members = groups.get(parent)
+        if members is None:
+            groups[parent] = {domain}
+        else:
+            members.add(domain)
+    return groups
+
+
+def collapse_groups(groups: dict[str, set[str]]) -> list[str]:
+    """
+    合并分组结果：同一主域名下有多个域名时只保留主域名，否则保留域名本身
+    """
+    collapsed = set()
+    for parent, members in groups.items():
+        if len(members) > 1:
+            collapsed.add(parent)
+        else:
+            collapsed.update(members)
+    return sorted(collapsed)
+
+
+def collapse_domains(domains: Iterable[str], key: Callable[[str], str]) -> list[str]:
+    """对域名列表去重，并将拥有多个子域名的主域名合并为主域名本身"""
+    return collapse_groups(group_domains(domains, key))
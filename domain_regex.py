@@ -0,0 +1,289 @@
+"""domain_regex 规则的批量匹配与覆盖检查
+
+- RegexSet 将多条 domain_regex 规则编译为一个交替表达式，每个域名只需
+  执行一次搜索，而不是逐条尝试；匹配语义与 sing-box 一致（非锚定搜索）。
+  以 ``$`` 结尾的规则先按顶级域和字面量尾部预筛选，结尾不符的域名
+  不再执行正则搜索
+- subsumed_by 在构建时解析正则表达式的语法树，展开以 ``$`` 结尾的有限字面量
+  尾部，若所有可能的尾部都落在某条 domain_suffix 规则之下，
+  该正则规则匹配的域名必然已被后缀规则覆盖，可以删除
+"""
+
+import logging
+import re
+from typing import Iterable, Optional, Protocol
+
+# 语法树解析依赖 re 的内部模块，不可用时不做尾部展开：
+# 所有规则单独匹配，也不会被判定为已被后缀覆盖
+try:
+    from re import _parser as sre_parse  # pylint: disable=W0212
+    from re._constants import (  # pylint: disable=W0212
+        AT,
+        AT_BEGINNING,
+        AT_BEGINNING_STRING,
+        AT_END,
+        AT_END_STRING,
+        BRANCH,
+        GROUPREF,
+        GROUPREF_EXISTS,
+        IN,
+        LITERAL,
+        MAX_REPEAT,
+        MIN_REPEAT,
+        RANGE,
+        SUBPATTERN,
+    )
+except ImportError:  # pragma: no cover
+    sre_parse = None
+
+logger = logging.getLogger(__name__)
+
+
+class SuffixMatcher(Protocol):
+    """
+    后缀规则的覆盖查询，如 SuffixIndex 和 SortedDomainSet
+    match() 返回覆盖该域名的后缀规则，没有匹配时返回 None
+    """
+
+    def match(self, domain: str) -> Optional[str]: ...
+
+
+# 展开字面量尾部时最多保留的候选字符串数量，超过时停止展开
+TAIL_EXPANSION_LIMIT = 64
+# 匹配预筛选使用的尾部数量上限，尾部越长预筛选越精确
+PREFILTER_TAIL_LIMIT = 1024
+
+
+def _has_group_refs(items) -> bool:
+    """判断正则表达式是否包含反向引用，包含时无法安全地合并为一个表达式"""
+    for op, av in items:
+        if op in (GROUPREF, GROUPREF_EXISTS):
+            return True
+        if op is SUBPATTERN and _has_group_refs(av[-1]):
+            return True
+        if op is BRANCH and any(_has_group_refs(alt) for alt in av[1]):
+            return True
+        if op in (MAX_REPEAT, MIN_REPEAT) and _has_group_refs(av[2]):
+            return True
+    return False
+
+
+class RegexSet:
+    """编译为单个交替表达式的 domain_regex 规则集合"""
+
+    __slots__ = (
+        "patterns",
+        "_tails",
+        "_filtered",
+        "_unfiltered",
+        "_separate",
+    )
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: list[str] = []
+        # 可按字面量尾部预筛选的规则，以及其余需要对每个域名搜索的规则
+        filtered: list[str] = []
+        unfiltered: list[str] = []
+        # 顶级域 -> 以其结尾的字面量尾部
+        tails: dict[str, set[str]] = {}
+        # 含反向引用、命名分组或全局标志（如 (?i)）的规则无法合并为一个表达式，
+        # 单独匹配
+        self._separate: list[re.Pattern] = []
+        for pattern in dict.fromkeys(patterns):
+            # sing-box 使用 Go 的 RE2 语法，其中部分写法（如 \z）Python 无法解析
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                logger.warning("跳过无法解析的 domain_regex 规则 %r: %s", pattern, e)
+                continue
+            self.patterns.append(pattern)
+            if (
+                sre_parse is None
+                or compiled.groupindex
+                or compiled.flags & ~re.UNICODE
+                or _has_group_refs(sre_parse.parse(pattern))
+            ):
+                self._separate.append(compiled)
+                continue
+
+            # 尾部需要包含点，才能确定匹配的域名的顶级域
+            result = literal_tails(pattern, PREFILTER_TAIL_LIMIT)
+            if result is None or not all("." in tail for tail in result[0]):
+                unfiltered.append(f"(?:{pattern})")
+                continue
+            filtered.append(f"(?:{pattern})")
+            for tail in result[0]:
+                tails.setdefault(tail.rpartition(".")[2], set()).add(tail)
+
+        self._tails = {tld: tuple(sorted(values)) for tld, values in tails.items()}
+        self._filtered = re.compile("|".join(filtered)) if filtered else None
+        self._unfiltered = re.compile("|".join(unfiltered)) if unfiltered else None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def search(self, domain: str) -> bool:
+        """判断域名是否匹配任意一条规则"""
+        if self._filtered is not None:
+            tails = self._tails.get(domain.rpartition(".")[2])
+            if tails and domain.endswith(tails) and self._filtered.search(domain):
+                return True
+        if self._unfiltered is not None and self._unfiltered.search(domain):
+            return True
+        return any(regex.search(domain) for regex in self._separate)
+
+    def match(self, domain: str) -> Optional[str]:
+        """返回匹配该域名的第一条规则，没有匹配时返回 None"""
+        if not self.search(domain):
+            return None
+        for pattern in self.patterns:
+            if re.search(pattern, domain):
+                return pattern
+        return None
+
+    def filter(self, domains: Iterable[str]) -> list[str]:
+        """批量匹配，返回匹配任意规则的域名"""
+        return [domain for domain in domains if self.search(domain)]
+
+
+def _expand(items, limit: int) -> Optional[set[str]]:
+    """将语法树片段展开为其能匹配的全部字符串，无法有限展开时返回 None"""
+    results = {""}
+    for op, av in items:
+        options = _expand_item(op, av, limit)
+        if options is None:
+            return None
+        results = {prefix + option for prefix in results for option in options}
+        if len(results) > limit:
+            return None
+    return results
+
+
+def _expand_item(op, av, limit: int) -> Optional[set[str]]:
+    # pylint: disable=R0911
+    if op is LITERAL:
+        return {chr(av)}
+
+    if op is IN:
+        chars: set[str] = set()
+        for item_op, item_av in av:
+            if item_op is LITERAL:
+                chars.add(chr(item_av))
+            elif item_op is RANGE and item_av[1] - item_av[0] < limit:
+                chars.update(chr(c) for c in range(item_av[0], item_av[1] + 1))
+            else:
+                # 取反、字符类别等无法有限展开
+                return None
+        return chars if len(chars) <= limit else None
+
+    if op is SUBPATTERN:
+        # 带有局部标志的分组（如 (?i:...)）匹配的字符串不止其字面量
+        if av[1] or av[2]:
+            return None
+        return _expand(av[-1], limit)
+
+    if op is BRANCH:
+        options: set[str] = set()
+        for alt in av[1]:
+            expanded = _expand(alt, limit)
+            if expanded is None:
+                return None
+            options |= expanded
+        return options if len(options) <= limit else None
+
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        low, high, sub = av
+        if high > limit:
+            return None
+        body = _expand(sub, limit)
+        if body is None:
+            return None
+        options = set()
+        sequence = {""}
+        for count in range(high + 1):
+            if count >= low:
+                options |= sequence
+            sequence = {s + b for s in sequence for b in body}
+            if len(options) > limit or len(sequence) > limit:
+                return None
+        return options
+
+    return None
+
+
+def literal_tails(
+    pattern: str, limit: int = TAIL_EXPANSION_LIMIT
+) -> Optional[tuple[set[str], bool]]:
+    """
+    返回以 ``$`` 结尾的正则表达式匹配的域名必然具有的结尾字符串集合，
+    以及这些字符串是否就是整个域名（表达式同时以 ``^`` 锚定且可完全展开）
+    不以 ``$`` 结尾或无法解析的表达式返回 None
+    """
+    if sre_parse is None:
+        return None
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    # 全局忽略大小写时字面量不代表实际匹配的字符串
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    items = list(parsed)
+    if not items or items[-1] not in ((AT, AT_END), (AT, AT_END_STRING)):
+        return None
+
+    tails = {""}
+    for index in range(len(items) - 2, -1, -1):
+        op, av = items[index]
+        if op is AT and av in (AT_BEGINNING, AT_BEGINNING_STRING) and index == 0:
+            return tails, True
+        options = _expand_item(op, av, limit)
+        if options is None:
+            break
+        expanded = {option + tail for option in options for tail in tails}
+        if len(expanded) > limit:
+            break
+        tails = expanded
+    return tails, False
+
+
+def subsumed_by(pattern: str, index: SuffixMatcher) -> Optional[str]:
+    """
+    若正则规则匹配的所有域名都已被索引中的后缀规则覆盖，返回覆盖它的后缀规则，
+    否则返回 None
+    """
+    result = literal_tails(pattern)
+    if result is None:
+        return None
+
+    tails, exact = result
+    matched = None
+    for tail in sorted(tails):
+        if exact:
+            suffix = index.match(tail)
+        else:
+            # 尾部第一个点之后的部分之前至少还有一个标签，
+            # 因此匹配的域名都是该部分的子域名
+            dot = tail.find(".")
+            if dot == -1:
+                return None
+            suffix = index.match(tail[dot:])
+        if suffix is None:
+            return None
+        matched = matched or suffix
+    return matched
+
+
+def find_subsumed(
+    patterns: Iterable[str], index: SuffixMatcher
+) -> list[tuple[str, str]]:
+    """返回被后缀规则完全覆盖的正则规则：(规则, 覆盖它的后缀)"""
+    subsumed = []
+    for pattern in patterns:
+        suffix = subsumed_by(pattern, index)
+        if suffix is not None:
+            subsumed.append((pattern, suffix))
+    return subsumed
@@ -0,0 +1,179 @@
+"""中国大陆 IP 地址段表
+
+将 GeoLite2 国家数据库中属于 CN 的网段展开为有序的整数区间数组
+（IPv4 使用 uint32，IPv6 使用 16 字节大端序），通过一次 NumPy
+searchsorted 批量判断大量 IP 地址是否位于中国大陆。
+
+区间表会以紧凑的二进制文件缓存在数据库文件旁，启动时以 mmap 方式加载，
+只有当 GeoLite2 数据库的构建时间变化时才重新生成。
+"""
+
+import logging
+import os
+import socket
+import struct
+from pathlib import Path
+from typing import Sequence
+
+import maxminddb
+import numpy as np
+
+from ip_ranges import merge_ranges
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件头：魔数、数据库构建时间、IPv4 区间数、IPv6 区间数
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"CNRANGE1"
+
+_V4_DTYPE = np.dtype("<u4")
+_V6_DTYPE = np.dtype("S16")
+_IPV4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+
+class CNRangeTable:
+    """CN 地址区间表"""
+
+    __slots__ = ("build_epoch", "v4_start", "v4_end", "v6_start", "v6_end")
+
+    def __init__(
+        self,
+        build_epoch: int,
+        v4_start: np.ndarray,
+        v4_end: np.ndarray,
+        v6_start: np.ndarray,
+        v6_end: np.ndarray,
+    ):
+        self.build_epoch = build_epoch
+        self.v4_start = v4_start
+        self.v4_end = v4_end
+        self.v6_start = v6_start
+        self.v6_end = v6_end
+
+    def __len__(self) -> int:
+        return len(self.v4_start) + len(self.v6_start)
+
+    @classmethod
+    def build(cls, db_path: Path, country: str = "CN") -> "CNRangeTable":
+        """遍历 GeoLite2 数据库，提取指定国家的全部网段"""
+        v4_ranges = []
+        v6_ranges = []
+        with maxminddb.open_database(str(db_path), maxminddb.MODE_MMAP) as reader:
+            build_epoch = reader.metadata().build_epoch
+            for network, record in reader:
+                if (record or {}).get("country", {}).get("iso_code") != country:
+                    continue
+                start = int(network.network_address)
+                end = int(network.broadcast_address)
+                if network.version == 4:
+                    v4_ranges.append((start, end))
+                else:
+                    v6_ranges.append((start, end))
+
+        v4_ranges = merge_ranges(v4_ranges)
+        v6_ranges = merge_ranges(v6_ranges)
+        logger.info(
+            "Built %s IP range table: %d IPv4 ranges, %d IPv6 ranges",
+            country,
+            len(v4_ranges),
+            len(v6_ranges),
+        )
+        return cls(
+            build_epoch,
+            np.array([r[0] for r in v4_ranges], dtype=_V4_DTYPE),
+            np.array([r[1] for r in v4_ranges], dtype=_V4_DTYPE),
+            np.array([r[0].to_bytes(16, "big") for r in v6_ranges], dtype=_V6_DTYPE),
+            np.array([r[1].to_bytes(16, "big") for r in v6_ranges], dtype=_V6_DTYPE),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "CNRangeTable":
+        """以 mmap 方式加载缓存的区间表"""
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, build_epoch, n4, n6 = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Invalid IP range table file: {path}")
+
+        offset = _HEADER.size
+        arrays = []
+        for dtype, count in (
+            (_V4_DTYPE, n4),
+            (_V4_DTYPE, n4),
+            (_V6_DTYPE, n6),
+            (_V6_DTYPE, n6),
+        ):
+            arrays.append(
+                np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            )
+            offset += dtype.itemsize * count
+        return cls(build_epoch, *arrays)
+
+    def save(self, path: Path) -> None:
+        """将区间表写入缓存文件"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC, self.build_epoch, len(self.v4_start), len(self.v6_start)
+                )
+            )
+            for array in (self.v4_start, self.v4_end, self.v6_start, self.v6_end):
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+    def contains(self, ips: Sequence[str]) -> np.ndarray:
+        """批量判断 IP 地址是否位于区间表中，无法解析的地址视为不在表中"""
+        result = np.zeros(len(ips), dtype=bool)
+        v4_index, v4_packed = [], []
+        v6_index, v6_packed = [], []
+
+        for i, ip in enumerate(ips):
+            try:
+                if ":" in ip:
+                    packed = socket.inet_pton(socket.AF_INET6, ip)
+                    if packed.startswith(_IPV4_MAPPED_PREFIX):
+                        v4_index.append(i)
+                        v4_packed.append(packed[12:])
+                    else:
+                        v6_index.append(i)
+                        v6_packed.append(packed)
+                else:
+                    v4_packed.append(socket.inet_aton(ip))
+                    v4_index.append(i)
+            except OSError:
+                continue
+
+        if v4_index and len(self.v4_start):
+            keys = np.frombuffer(b"".join(v4_packed), dtype=">u4").astype(_V4_DTYPE)
+            result[v4_index] = self._lookup(self.v4_start, self.v4_end, keys)
+        if v6_index and len(self.v6_start):
+            keys = np.frombuffer(b"".join(v6_packed), dtype=_V6_DTYPE)
+            result[v6_index] = self._lookup(self.v6_start, self.v6_end, keys)
+        return result
+
+    @staticmethod
+    def _lookup(starts: np.ndarray, ends: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """在有序且互不重叠的区间中查找每个键所在的区间"""
+        index = np.searchsorted(starts, keys, side="right") - 1
+        found = index >= 0
+        return found & (keys <= ends[np.maximum(index, 0)])
+
+
+def load_or_build(db_path: Path, cache_path: Path) -> CNRangeTable:
+    """加载缓存的区间表，缓存不存在或数据库已更新时重新生成"""
+    with maxminddb.open_database(str(db_path), maxminddb.MODE_MMAP) as reader:
+        build_epoch = reader.metadata().build_epoch
+
+    if cache_path.exists():
+        try:
+            table = CNRangeTable.load(cache_path)
+            if table.build_epoch == build_epoch:
+                return table
+            logger.info("GeoLite2 database changed, rebuilding IP range table")
+        except (ValueError, struct.error) as e:
+            logger.warning("Failed to load IP range table %s: %s", cache_path, e)
+
+    table = CNRangeTable.build(db_path)
+    table.save(cache_path)
+    # 重新以 mmap 方式加载，释放构建过程中的内存
+    return CNRangeTable.load(cache_path)
@@ -1,15 +1,17 @@
 # 提取主域名
 import asyncio
 import json
+from typing import Optional
 
-from utils import check_domain_availability
-
-
-def get_main_domain(domain: str):
-    """获取主域名"""
-    if domain.count(".") > 1:
-        return ".".join(domain.split(".")[-2:])
-    return domain
+from domain_index import collapse_groups, group_domains
+from public_suffix import get_main_domain
+from rule_verification import VerificationScheduler
+from utils import (
+    check_domain_availability,
+    close_probe_clients,
+    dns_limiter,
+    http_limiter,
+)
 
 
 # 从列表中去掉重复的域名
@@ -18,44 +20,26 @@ def remove_duplicates_from_list(domain_list: list[str]):
     如果域名列表中有重复的域名，则删除。
     如果有多个相同的主域名的子域名，则删除子域名，只保留主域名
     """
-    data = sorted(set(domain_list))
     print("去重前: ", len(domain_list))
-    # 提取主域名
-    domain_suffix_list = []
-    for domain in data:
-        domain_suffix_list.append(get_main_domain(domain))
-
-    domain_suffix_list = sorted(domain_suffix_list)
-
-    domain_suffix_unique_list = list(set(domain_suffix_list))
 
-    ready_delete_domain_list = []
-
-    for i in domain_suffix_unique_list:
-        # 如果 i 在 domain_suffix_list 中出现多次，则删除
-        if domain_suffix_list.count(i) > 1:
-            ready_delete_domain_list.append(i)
-
-    new_domain_list = []
-
-    for domain in domain_list:
-        for i in ready_delete_domain_list:
-            if domain.endswith(i):
+    groups = group_domains(domain_list, get_main_domain)
+    for parent, members in groups.items():
+        if len(members) > 1:
+            for domain in sorted(members - {parent}):
                 print("删除重复的域名: ", domain)
-                new_domain_list.append(i)
-                break
-        else:
-            new_domain_list.append(domain)
+
+    new_domain_list = collapse_groups(groups)
 
     print("去重后: ", len(new_domain_list))
 
-    return sorted(set(new_domain_list))
+    return new_domain_list
 
 
-async def sort_rule_file(flag: bool = False):
+async def sort_rule_file(flag: bool = False, budget: Optional[int] = None):
     """对规则文件进行排序进行二次检查
     检查主域名和www前缀的域名对应的ip是否可用
     大型企业一般会维护主域名和www前缀的域名的80端口或443端口的可用性
+    每次只复查最久未复查的 budget 条规则，连续多次复查失败的规则才会被删除
     """
     # pylint: disable=W0621
     with open("rules.json", "r", encoding="utf-8") as f:
@@ -67,27 +51,42 @@ async def sort_rule_file(flag: bool = False):
     domain_suffix = remove_duplicates_from_list(domain_suffix)
 
     if flag:
-        # 使用信号量限制并发数
-        semaphore = asyncio.Semaphore(25)  # 同时最多处理50个请求
-
-        async def check_with_semaphore(domain):
-            async with semaphore:
-                ok = await check_domain_availability(domain)
-                if not ok:
-                    # echo domain >> error_domain.txt
-                    with open("error_domain.txt", "a", encoding="utf-8") as f:
-                        f.write(get_main_domain(domain) + "\n")
-                return ok
+        scheduler = VerificationScheduler.load()
+        scheduler.prune(domain_suffix)
+        to_check = scheduler.select(domain_suffix, budget)
+        print(f"本次复查规则: {len(to_check)}/{len(domain_suffix)}")
+
+        # DNS 和 HTTP 探测的并发由 utils 中的自适应限制器控制
+        async def check_and_record(domain):
+            ok = await check_domain_availability(domain)
+            if ok is False:
+                # echo domain >> error_domain.txt
+                with open("error_domain.txt", "a", encoding="utf-8") as f:
+                    f.write(get_main_domain(domain) + "\n")
+            return ok
 
         # 并发检查域名可用性
-        tasks = [check_with_semaphore(domain) for domain in domain_suffix]
-        results = await asyncio.gather(*tasks)
+        tasks = [check_and_record(domain) for domain in to_check]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            await close_probe_clients()
+            print(f"并发窗口: DNS {dns_limiter.window}, HTTP {http_limiter.window}")
+
+        # 只删除连续多次复查失败的域名
+        removed = set()
+        for domain, is_available in zip(to_check, results):
+            if scheduler.record(domain, is_available):
+                removed.add(domain)
+                print("删除连续复查失败的域名: ", domain)
+            elif is_available is None:
+                print("复查未完成，下次运行时重试: ", domain)
+            elif not is_available:
+                print(f"复查失败 ({scheduler.failures(domain)} 次): ", domain)
+        scheduler.save()
 
-        # 筛选可用的域名
         new_domain_suffix = [
-            domain
-            for domain, is_available in zip(domain_suffix, results)
-            if is_available
+            domain for domain in domain_suffix if domain not in removed
         ]
     else:
         new_domain_suffix = domain_suffix
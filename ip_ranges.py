@@ -0,0 +1,54 @@
+"""IP 地址区间
+
+网段与整数区间之间的转换：合并重叠和相邻的区间，将区间拆分为最少的 CIDR 前缀。
+供规则合并、.srs 编码、GeoIP 区间表与规则匹配共用。
+"""
+
+import ipaddress
+from typing import Iterable
+
+
+def merge_ranges(ranges: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    """合并重叠或相邻的整数区间"""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def range_to_prefixes(start: int, end: int, bits: int) -> list[tuple[int, int]]:
+    """将整数区间拆分为最少的对齐前缀，返回 (起始地址, 前缀长度)"""
+    prefixes = []
+    while start <= end:
+        # 起始地址的对齐程度决定了块的最大大小
+        size = start & -start if start else 1 << bits
+        while start + size - 1 > end:
+            size >>= 1
+        prefixes.append((start, bits - size.bit_length() + 1))
+        start += size
+    return prefixes
+
+
+def aggregate_cidrs(cidrs: Iterable[str]) -> list[str]:
+    """将网段列表合并为互不重叠的最少 CIDR 前缀，IPv4 在前，按地址排序"""
+    ranges: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+    for cidr in cidrs:
+        network = ipaddress.ip_network(cidr.strip(), strict=False)
+        ranges[network.version].append(
+            (int(network.network_address), int(network.broadcast_address))
+        )
+
+    result = []
+    for version, address_class in (
+        (4, ipaddress.IPv4Address),
+        (6, ipaddress.IPv6Address),
+    ):
+        bits = 32 if version == 4 else 128
+        for start, end in merge_ranges(ranges[version]):
+            for address, length in range_to_prefixes(start, end, bits):
+                result.append(f"{address_class(address)}/{length}")
+    return result
@@ -1,243 +1,149 @@
-"""Sing Box Rule Set Decompiler and Merger
-1. 下载 Sing Box
-2. 下载 geosite-cn.srs
-3. 执行 Sing Box 的 rule-set decompile 命令
-4. 合并规则
-5. 执行 Sing Box 的 rule-set compile 命令
+"""Sing Box Rule Set Merger
+1. 下载 geosite-cn.srs（条件请求，未变化时复用本地文件）
+2. 输入未变化时复用缓存的构建结果
+3. 读取 geosite-cn.srs 中的规则
+4. 转换为紧凑的规则模型并合并规则
+5. 写入 geosite-one-cn.srs
+6. 与上一次发布比较并写入 manifest.json，未变化时通知工作流跳过发布
 """
 
+import contextlib
 import json
 import os
-import platform
 import shutil
-import subprocess
-import tarfile
 
-import requests
-
-
-def get_system_info():
-    """
-    获取系统信息
-    :return: (os_platform, os_arch)
-    """
-    # GitHub Actions 环境检测
-    if os.getenv("GITHUB_ACTIONS"):
-        return "linux", "amd64"  # GitHub hosted runner 使用 x64 架构
-
-    # 常规环境检测
-    system = platform.system().lower()
-    machine = platform.machine().lower()
-
-    arch_map = {
-        "x86_64": "amd64",
-        "amd64": "amd64",
-        "aarch64": "arm64",
-        "arm64": "arm64",
-    }
-
-    platform_map = {"linux": "linux", "darwin": "darwin"}
-
-    system_arch = arch_map.get(machine)
-    if not system_arch:
-        raise ValueError(f"不支持的系统架构: {machine}")
-
-    detected_platform = platform_map.get(system)
-    if not os_platform:
-        raise ValueError(f"不支持的操作系统: {system}")
-
-    return detected_platform, system_arch
-
-
-os_platform, os_arch = get_system_info()
+from build_cache import build_key, fetch_all, restore_build, store_build
+from release_manifest import (
+    MANIFEST_NAME,
+    build_manifest,
+    set_github_output,
+    write_manifest,
+)
+from rule_merge import RuleMerger
+from rule_model import RuleModel
+from srs import read_srs, write_srs
 
 # pylint: disable=invalid-name,C0301
-sing_box_ver = "1.11.8"
-# pylint: disable=invalid-name
-sing_box_url = f"https://github.com/SagerNet/sing-box/releases/download/v{sing_box_ver}/sing-box-{sing_box_ver}-{os_platform}-{os_arch}.tar.gz"
-sing_box_bin = "tmp/sing-box"
-# pylint: disable=invalid-name
 geosite_cn_url = "https://raw.githubusercontent.com/SagerNet/sing-geosite/refs/heads/rule-set/geosite-cn.srs"
 
 
-def download_sing_box():
-    """
-    下载 Sing Box
-    """
-
-    os.makedirs("tmp", exist_ok=True)
+GEOSITE_CN_SRS = "tmp/geosite-cn.srs"
+GEOSITE_ONE_CN_SRS = "tmp/geosite-one-cn.srs"
 
-    def tar_filter(member, _):
-        # 只允许 sing-box 可执行文件
-        if member.name.endswith("sing-box"):
-            member.name = os.path.basename(member.name)
-            return member
-        return None
-
-    if not os.path.exists(sing_box_bin):
-        print("Downloading Sing Box...")
-        print(f"URL: {sing_box_url}")
-        response = requests.get(sing_box_url, timeout=10)
-        with open("tmp/sing-box.tar.gz", "wb") as f:
-            f.write(response.content)
-        print("Download complete.")
-
-        print("Extracting Sing Box...")
-        with tarfile.open("tmp/sing-box.tar.gz", "r:gz") as tar:
-            tar.extractall(path="tmp", filter=tar_filter)
-        print("Extraction complete.")
-    else:
-        print("Sing Box already downloaded.")
-
-
-# 下载 geosite-cn
-def download_geosite_cn():
-    """
-    下载 geosite-cn.srs
-    """
+# 需要下载的上游文件
+artifacts = {geosite_cn_url: GEOSITE_CN_SRS}
 
-    os.makedirs("tmp", exist_ok=True)
 
-    if not os.path.exists("tmp/geosite-cn.srs"):
-        print("Downloading geosite-cn...")
-        print(f"URL: {geosite_cn_url}")
-        response = requests.get(geosite_cn_url, timeout=10)
-        with open("tmp/geosite-cn.srs", "wb") as f:
-            f.write(response.content)
-        print("Download complete.")
-    else:
-        print("geosite-cn already downloaded.")
-
-
-def merge_domain_regex(geosite_rules: dict, custom_rules: dict) -> None:
-    """合并正则表达式域名规则"""
-    if "domain_regex" in custom_rules:
-        if "domain_regex" not in geosite_rules:
-            geosite_rules["domain_regex"] = []
-        for rule in custom_rules["domain_regex"]:
-            if rule not in geosite_rules["domain_regex"]:
-                geosite_rules["domain_regex"].append(rule)
-
-
-def merge_domain(geosite_rules: dict, custom_rules: dict) -> None:
-    """合并完整域名规则"""
-    if "domain" in custom_rules:
-        if "domain" not in geosite_rules:
-            geosite_rules["domain"] = []
-        for rule in custom_rules["domain"]:
-            if rule not in geosite_rules["domain"]:
-                geosite_rules["domain"].append(rule)
-
-
-def merge_domain_suffix(geosite_rules: dict, custom_rules: dict) -> None:
-    """合并域名后缀规则"""
-    if "domain_suffix" in custom_rules:
-        if "domain_suffix" not in geosite_rules:
-            geosite_rules["domain_suffix"] = []
-        for rule in custom_rules["domain_suffix"]:
-            # 如果 rule 的域名后缀在 geosite_rules["domain_suffix"] 中，则跳过
-            if any(rule.endswith(suffix) for suffix in geosite_rules["domain_suffix"]):
-                print(f"Skipping rule: {rule} (already in domain_suffix)")
-                continue
-            if rule not in geosite_rules["domain_suffix"]:
-                geosite_rules["domain_suffix"].append(rule)
-
-
-def merge_ip_cidr(geosite_rules: dict, custom_rules: dict) -> None:
-    """合并 IP CIDR 规则"""
-    if "ip_cidr" in custom_rules:
-        if "ip_cidr" not in geosite_rules:
-            geosite_rules["ip_cidr"] = []
-        for rule in custom_rules["ip_cidr"]:
-            if rule not in geosite_rules["ip_cidr"]:
-                geosite_rules["ip_cidr"].append(rule)
-
-
-# 执行 sing-box rule-set decompile  geosite-cn.srs
-
-
-def execute_sing_box(args="rule-set decompile tmp/geosite-cn.srs"):
+# 下载上游文件
+def download_inputs() -> dict[str, str]:
     """
-    执行 Sing Box
-    :param args: 命令行参数
-    :return:
+    条件下载全部上游文件，返回 {url: sha256}
     """
-    if not os.path.exists("tmp/geosite-cn.srs"):
-        print("geosite-cn.srs not found. Please download it first.")
-        return
-
-    print("Executing Sing Box...")
-    try:
-        cmd = [sing_box_bin] + args.split()
-        print(f"Command: {cmd}")
-        subprocess.run(cmd, check=True)
-        print("Execution complete.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing Sing Box: {e}")
+    os.makedirs("tmp", exist_ok=True)
+    hashes = fetch_all(artifacts)
+    print("Download complete.")
+    return hashes
 
 
 def merge_rules():
     """
-    合并规则
+    合并规则，读取或写入失败时抛出异常，不生成 geosite-one-cn.srs
     """
 
     # 读取自定义规则
     with open("rules.json", "r", encoding="utf-8") as f:
         custom_rules = json.load(f)
 
-    # 读取解压后的 geosite-cn.json
+    # 读取 geosite-cn.srs
     try:
-        with open("tmp/geosite-cn.json", "r", encoding="utf-8") as f:
-
-            data = json.load(f)
-            geosite_rules = data["rules"][0]
+        data = read_srs(GEOSITE_CN_SRS)
+        geosite_rules = data["rules"][0]
     except FileNotFoundError:
-        print(
-            "Error: tmp/geosite-cn.json not found. Please run sing-box decompile first."
-        )
-        return
+        print(f"Error: {GEOSITE_CN_SRS} not found. Please download it first.")
+        raise
 
     print(f"当前规则键值: {geosite_rules.keys()}")
 
-    # 分别处理每种规则
-    merge_domain_regex(geosite_rules, custom_rules)
-    merge_domain(geosite_rules, custom_rules)
-    merge_domain_suffix(geosite_rules, custom_rules)
-    merge_ip_cidr(geosite_rules, custom_rules)
-
-    # 对所有规则进行排序
-    rule_keys = ["domain_regex", "domain", "domain_suffix", "ip_cidr"]
-    for key in rule_keys:
-        geosite_rules[key].sort()
-
-    data["rules"] = [geosite_rules]
-
-    # 保存更新后的文件
-    with open("tmp/geosite-one-cn.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # 转换为紧凑的规则模型后释放解码出的字符串列表
+    model = RuleModel.from_rule(geosite_rules)
+    del geosite_rules
+    data["rules"] = []
+
+    # 合并各类规则，输出的规则已排序
+    merger = RuleMerger(model)
+    stats = merger.merge(custom_rules)
+    data["rules"] = [merger.to_rule()]
+
+    for rule, matched in stats.skipped_suffixes:
+        print(f"Skipping rule: {rule} (already in domain_suffix: {matched})")
+    for domain in stats.pruned_domains:
+        print(f"Removing domain: {domain} (covered by domain_suffix)")
+    for pattern, matched in stats.subsumed_regexes:
+        print(f"Removing domain_regex: {pattern} (covered by domain_suffix: {matched})")
+    print(f"新增规则: {stats.added}")
+    print(
+        f"ip_cidr: {stats.cidrs_before} -> {len(data['rules'][0].get('ip_cidr', []))}"
+    )
+
+    # 保存更新后的规则集
+    write_srs(GEOSITE_ONE_CN_SRS, data)
 
     print("Rules merged successfully.")
 
-    execute_sing_box("rule-set compile tmp/geosite-one-cn.json")
-
 
-# 将 tmp/*.srs 移动到 output 目录
+# 将 tmp/*.srs 复制到 output 目录
 def move_files():
     """
-    将 tmp/*.srs 移动到 output 目录
+    将 tmp/*.srs 复制到 output 目录
+    tmp 中的文件保留，供下次运行的条件请求使用
     """
     os.makedirs("output", exist_ok=True)
 
     for file in os.listdir("tmp"):
         if file.endswith(".srs"):
-            shutil.move(os.path.join("tmp", file), os.path.join("output", file))
+            shutil.copy2(os.path.join("tmp", file), os.path.join("output", file))
 
-    print("Files moved to output directory.")
+    print("Files copied to output directory.")
 
 
-if __name__ == "__main__":
-    download_sing_box()
-    download_geosite_cn()
-    execute_sing_box()
+def build():
+    """
+    构建规则集，上游文件和 rules.json 均未变化时直接复用上次的构建结果
+    """
+    hashes = download_inputs()
+    key = build_key(hashes.values(), ["rules.json"])
+    if restore_build(key, [GEOSITE_ONE_CN_SRS]):
+        print(f"Inputs unchanged, reusing cached build {key[:12]}.")
+        return
+
+    # 先删除上一次运行留下的输出，合并失败时不会发布或缓存旧文件
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(GEOSITE_ONE_CN_SRS)
     merge_rules()
+    store_build(key, [GEOSITE_ONE_CN_SRS])
+
+
+def update_manifest():
+    """
+    生成 output/manifest.json，并将是否有变化写入 GitHub Actions 的步骤输出 changed
+    """
+    published = [
+        os.path.join("output", file)
+        for file in os.listdir("output")
+        if file.endswith(".srs")
+    ]
+    manifest, changed = build_manifest(
+        os.path.join("output", os.path.basename(GEOSITE_ONE_CN_SRS)), published
+    )
+    write_manifest(os.path.join("output", MANIFEST_NAME), manifest)
+    for key, change in (manifest.get("changes") or {}).items():
+        if "added" in change:
+            print(f"{key}: +{change['added']} -{change['removed']}")
+    print(f"规则集{'已' if changed else '未'}变化。")
+    set_github_output("changed", "true" if changed else "false")
+
+
+if __name__ == "__main__":
+    build()
     move_files()
+    update_manifest()
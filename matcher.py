@@ -0,0 +1,340 @@
+"""规则集匹配器
+
+在进程内按 sing-box 的匹配语义对域名和 IP 地址进行分类，用于以生产环境的
+DNS 日志回放验证 geosite-one-cn 规则集：
+- domain：哈希集合精确匹配
+- domain_suffix：按标签边界逐级探测的后缀索引
+- domain_keyword / domain_regex：各自编译为一个交替表达式批量匹配
+- ip_cidr：合并后的有序整数区间表，二分查找
+
+规则集中的多条规则按“或”合并；同一条规则中的域名类与 IP 类条件分别判断，
+日志中的每一行只包含域名或 IP 地址之一。
+
+用法：
+    python matcher.py classify dns.log [--rule-set output/geosite-one-cn.srs]
+    python matcher.py bench [--count 1000000] [--rule-set output/geosite-one-cn.srs]
+"""
+
+import argparse
+import bisect
+import ipaddress
+import random
+import re
+import socket
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
+
+from domain_index import SuffixIndex, normalize_domain
+from domain_regex import RegexSet
+from ip_ranges import merge_ranges
+from rule_model import RuleModel
+from srs import read_srs
+
+DEFAULT_RULE_SET = "output/geosite-one-cn.srs"
+# 流式分类时每批处理的行数
+CLASSIFY_BATCH_SIZE = 100_000
+BENCH_COUNT = 1_000_000
+
+# 分类结果中的规则类型，按匹配顺序排列
+DOMAIN_RULE_TYPES = ("domain", "domain_suffix", "domain_keyword", "domain_regex")
+IP_RULE_TYPE = "ip_cidr"
+# 匹配器能够处理的规则项
+_SUPPORTED_RULE_KEYS = {"type", "invert", *DOMAIN_RULE_TYPES, IP_RULE_TYPE}
+
+
+def _parse_ip(value: str) -> Optional[tuple[int, int]]:
+    """将 IP 地址解析为 (版本, 整数)，不是 IP 地址时返回 None"""
+    try:
+        if ":" in value:
+            packed = socket.inet_pton(socket.AF_INET6, value)
+            if packed.startswith(b"\x00" * 10 + b"\xff\xff"):
+                return 4, int.from_bytes(packed[12:], "big")
+            return 6, int.from_bytes(packed, "big")
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, value), "big")
+    except OSError:
+        return None
+
+
+class IPRangeTable:
+    """有序且互不重叠的 IP 区间表"""
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, cidrs: Iterable[str] = ()):
+        ranges: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        for cidr in cidrs:
+            try:
+                network = ipaddress.ip_network(cidr.strip(), strict=False)
+            except ValueError as e:
+                raise ValueError(f"Invalid ip_cidr: {cidr}") from e
+            version = network.version
+            start = int(network.network_address)
+            end = int(network.broadcast_address)
+            # 查询时 IPv4 映射地址按 IPv4 匹配，完全位于映射段内的网段同样转换
+            if (
+                version == 6
+                and network.prefixlen >= 96
+                and network.network_address.ipv4_mapped is not None
+            ):
+                version, start, end = 4, start & 0xFFFFFFFF, end & 0xFFFFFFFF
+            ranges[version].append((start, end))
+
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        for version, values in ranges.items():
+            merged = merge_ranges(values)
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return sum(len(starts) for starts in self._starts.values())
+
+    def contains(self, version: int, address: int) -> bool:
+        """判断整数形式的地址是否位于区间表中"""
+        starts = self._starts[version]
+        index = bisect.bisect_right(starts, address) - 1
+        return index >= 0 and address <= self._ends[version][index]
+
+
+class RuleSetMatcher:
+    """由 headless 规则构建的匹配器"""
+
+    __slots__ = ("_domains", "_suffixes", "_keywords", "_regexes", "_ips")
+
+    def __init__(self, rules: Iterable[dict[str, Any]]):
+        domains: set[str] = set()
+        suffixes: list[str] = []
+        keywords: list[str] = []
+        regexes: list[str] = []
+        cidrs: list[str] = []
+        for rule in rules:
+            if rule.get("type", "default") != "default":
+                raise ValueError("Logical rules are not supported")
+            if rule.get("invert"):
+                raise ValueError("Inverted rules are not supported")
+            # 其余条件（端口、查询类型等）无法由域名或 IP 判断，忽略会误报匹配
+            unsupported = rule.keys() - _SUPPORTED_RULE_KEYS
+            if unsupported:
+                raise ValueError(
+                    f"Unsupported rule items: {', '.join(sorted(unsupported))}"
+                )
+            domains.update(normalize_domain(d) for d in _as_list(rule, "domain"))
+            suffixes += _as_list(rule, "domain_suffix")
+            keywords += _as_list(rule, "domain_keyword")
+            regexes += _as_list(rule, "domain_regex")
+            cidrs += _as_list(rule, "ip_cidr")
+
+        self._domains = frozenset(domains)
+        self._suffixes = SuffixIndex(suffixes)
+        # domain_keyword 为子串匹配，转义后与正则规则使用同样的批量匹配方式
+        self._keywords = RegexSet(re.escape(keyword) for keyword in keywords)
+        self._regexes = RegexSet(regexes)
+        self._ips = IPRangeTable(cidrs)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RuleSetMatcher":
+        """从 .srs 规则集文件构建匹配器"""
+        return cls(read_srs(path)["rules"])
+
+    @classmethod
+    def from_model(cls, model: RuleModel) -> "RuleSetMatcher":
+        """由合并后的规则模型构建匹配器"""
+        return cls([model.to_rule()])
+
+    def __repr__(self) -> str:
+        return (
+            f"<RuleSetMatcher domain={len(self._domains)} "
+            f"domain_suffix={len(self._suffixes)} "
+            f"domain_keyword={len(self._keywords)} "
+            f"domain_regex={len(self._regexes)} ip_cidr={len(self._ips)}>"
+        )
+
+    def match_domain(self, domain: str) -> Optional[str]:
+        """返回匹配该域名的规则类型，没有匹配时返回 None"""
+        domain = normalize_domain(domain)
+        if domain in self._domains:
+            return "domain"
+        if self._suffixes.match_normalized(domain) is not None:
+            return "domain_suffix"
+        if self._keywords and self._keywords.search(domain):
+            return "domain_keyword"
+        if self._regexes and self._regexes.search(domain):
+            return "domain_regex"
+        return None
+
+    def match_ip(self, ip: str) -> bool:
+        """判断 IP 地址是否位于 ip_cidr 中"""
+        parsed = _parse_ip(ip.strip())
+        return parsed is not None and self._ips.contains(*parsed)
+
+    def classify(self, value: str) -> Optional[str]:
+        """对一个域名或 IP 地址分类，返回匹配的规则类型"""
+        return self.classify_many([value])[0]
+
+    def classify_many(self, values: Iterable[str]) -> list[Optional[str]]:
+        """批量分类，返回与输入一一对应的规则类型，没有匹配时为 None"""
+        # pylint: disable=R0912
+        domains = self._domains
+        suffix_match = self._suffixes.match_normalized
+        keyword_search = self._keywords.search if self._keywords else None
+        regex_search = self._regexes.search if self._regexes else None
+        contains_ip = self._ips.contains
+
+        results: list[Optional[str]] = []
+        append = results.append
+        for value in values:
+            value = value.strip().rstrip(".").lower()
+            if value in domains:
+                append("domain")
+                continue
+            # 域名的最后一个字符不会是数字，IPv6 地址一定包含冒号
+            if value and (value[-1].isdigit() or ":" in value):
+                parsed = _parse_ip(value)
+                if parsed is not None:
+                    append(IP_RULE_TYPE if contains_ip(*parsed) else None)
+                    continue
+            if suffix_match(value) is not None:
+                append("domain_suffix")
+            elif keyword_search is not None and keyword_search(value):
+                append("domain_keyword")
+            elif regex_search is not None and regex_search(value):
+                append("domain_regex")
+            else:
+                append(None)
+        return results
+
+
+def _as_list(rule: dict[str, Any], key: str) -> list[str]:
+    value = rule.get(key, [])
+    return [value] if isinstance(value, str) else list(value)
+
+
+def iter_batches(
+    path: Union[str, Path], batch_size: int, field: Optional[int] = None
+) -> Iterator[list[str]]:
+    """
+    流式读取日志文件，每次返回 batch_size 行
+    field 不为 None 时按空白分隔后取该列作为待分类的值
+    """
+    batch: list[str] = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if field is not None:
+                columns = line.split()
+                if not -len(columns) <= field < len(columns):
+                    continue
+                line = columns[field]
+            elif not line.strip():
+                continue
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def classify_log(
+    matcher: RuleSetMatcher,
+    path: Union[str, Path],
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    field: Optional[int] = None,
+) -> Counter:
+    """按批次分类日志文件，返回各规则类型的匹配数量，未匹配的计为 None"""
+    counts: Counter = Counter()
+    for batch in iter_batches(path, batch_size, field):
+        counts.update(matcher.classify_many(batch))
+    return counts
+
+
+def print_counts(counts: Counter, elapsed: float) -> None:
+    """打印分类统计"""
+    total = sum(counts.values())
+    print(
+        f"总计: {total} 行, 耗时 {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f}/s)"
+    )
+    for rule_type in (*DOMAIN_RULE_TYPES, IP_RULE_TYPE, None):
+        count = counts.get(rule_type, 0)
+        name = rule_type or "未匹配"
+        print(f"  {name:<16} {count:>12} ({count / max(total, 1):.2%})")
+
+
+def bench_queries(rule_set: dict[str, Any], count: int, seed: int = 0) -> list[str]:
+    """由规则集生成测试查询：精确域名、后缀的子域名、IP 地址和不匹配的域名"""
+    rng = random.Random(seed)
+    domains, suffixes, cidrs = [], [], []
+    for rule in rule_set["rules"]:
+        domains += _as_list(rule, "domain")
+        suffixes += [s.lstrip(".") for s in _as_list(rule, "domain_suffix")]
+        cidrs += [c.partition("/")[0] for c in _as_list(rule, "ip_cidr")]
+
+    generators = [
+        lambda: f"{rng.getrandbits(32):x}.example-{rng.randrange(1000)}.org",
+    ]
+    if domains:
+        generators.append(lambda: rng.choice(domains))
+    if suffixes:
+        generators.append(lambda: f"www.{rng.choice(suffixes)}")
+    if cidrs:
+        generators.append(lambda: rng.choice(cidrs))
+    return [rng.choice(generators)() for _ in range(count)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="按规则集对域名和 IP 地址进行分类")
+    # 各子命令共用的选项，写在子命令之后
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--rule-set",
+        default=DEFAULT_RULE_SET,
+        help=f"规则集文件（默认 {DEFAULT_RULE_SET}）",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classify = subparsers.add_parser(
+        "classify", parents=[common], help="分类日志文件中的每一行"
+    )
+    classify.add_argument("log", help="日志文件，每行一个域名或 IP 地址")
+    classify.add_argument(
+        "--field",
+        type=int,
+        default=None,
+        help="按空白分隔后取该列作为域名（默认使用整行）",
+    )
+    classify.add_argument(
+        "--batch-size",
+        type=int,
+        default=CLASSIFY_BATCH_SIZE,
+        help=f"每批处理的行数（默认 {CLASSIFY_BATCH_SIZE}）",
+    )
+
+    bench = subparsers.add_parser("bench", parents=[common], help="测量匹配吞吐量")
+    bench.add_argument(
+        "--count",
+        type=int,
+        default=BENCH_COUNT,
+        help=f"生成的查询数量（默认 {BENCH_COUNT}）",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rule_set = read_srs(args.rule_set)
+    matcher = RuleSetMatcher(rule_set["rules"])
+    print(f"加载规则集: {matcher!r} ({time.perf_counter() - start:.2f}s)")
+
+    if args.command == "classify":
+        start = time.perf_counter()
+        counts = classify_log(matcher, args.log, args.batch_size, args.field)
+        print_counts(counts, time.perf_counter() - start)
+    else:
+        queries = bench_queries(rule_set, args.count)
+        start = time.perf_counter()
+        counts = Counter(matcher.classify_many(queries))
+        print_counts(counts, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""探测结果备忘与并发请求合并
+
+- SingleFlight: 同一个键的并发调用共享同一个任务，只执行一次
+- ProbeMemo: 本次运行内的探测结果备忘，每个网络事实最多计算一次
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """正在执行的任务及等待其结果的调用者数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并同一个键的并发调用，同时到达的调用者等待同一个任务的结果"""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行 factory 并返回结果，若相同的键正在执行则等待其结果
+        单个调用者被取消时不影响其他调用者，全部调用者都被取消时任务随之取消
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(factory())
+            flight = self._inflight[key] = _Flight(task)
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 之后的调用者不再加入正在取消的任务，而是重新执行
+                self._forget(key, flight.task)
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+
+
+class ProbeMemo:
+    """
+    本次运行内的探测结果备忘，按 (类型, 域名) 记录 DNS 解析、GeoIP 判定和 HTTP 判定
+    并发的相同探测会被合并，抛出异常的探测不会被记录
+    """
+
+    def __init__(self):
+        self._results: dict[tuple[str, str], Any] = {}
+        self._flight = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    async def get_or_compute(
+        self, kind: str, key: str, factory: Callable[[], Awaitable[T]]
+    ) -> T:
+        """返回已记录的结果，没有记录时执行 factory 计算并记录"""
+        memo_key = (kind, key)
+        try:
+            return self._results[memo_key]
+        except KeyError:
+            pass
+
+        value = await self._flight.do(memo_key, factory)
+        self._results[memo_key] = value
+        return value
+
+    def clear(self) -> None:
+        """清空全部记录"""
+        self._results.clear()
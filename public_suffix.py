@@ -0,0 +1,118 @@
+"""基于公共后缀列表（Public Suffix List）的主域名提取
+
+使用仓库内置的离线公共后缀列表 data/public_suffix_list.dat，
+将规则编译为哈希集合后按标签逐级查找，提取域名的 eTLD+1。
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+PSL_PATH = Path(__file__).parent / "data" / "public_suffix_list.dat"
+
+
+def _to_ascii(rule: str) -> str:
+    """将规则中的国际化标签转换为 punycode 形式"""
+    labels = []
+    for label in rule.split("."):
+        if label.isascii():
+            labels.append(label)
+            continue
+        try:
+            labels.append(label.encode("idna").decode("ascii"))
+        except UnicodeError:
+            return rule
+    return ".".join(labels)
+
+
+class PublicSuffixList:
+    """公共后缀列表的查找结构"""
+
+    __slots__ = ("_rules", "_wildcards", "_exceptions")
+
+    def __init__(self, lines, include_private: bool = False):
+        # 普通规则，例如 com.cn
+        self._rules: set[str] = set()
+        # 通配规则去掉 "*." 后的部分，例如 *.ck -> ck
+        self._wildcards: set[str] = set()
+        # 例外规则去掉 "!" 后的部分，例如 !www.ck -> www.ck
+        self._exceptions: set[str] = set()
+
+        in_private = False
+        for line in lines:
+            line = line.strip()
+            if line.startswith("// ===BEGIN PRIVATE DOMAINS==="):
+                in_private = True
+                continue
+            if line.startswith("// ===END PRIVATE DOMAINS==="):
+                in_private = False
+                continue
+            if not line or line.startswith("//"):
+                continue
+            if in_private and not include_private:
+                continue
+
+            rule = line.split()[0].lower()
+            for form in {rule, _to_ascii(rule)}:
+                if form.startswith("!"):
+                    self._exceptions.add(form[1:])
+                elif form.startswith("*."):
+                    self._wildcards.add(form[2:])
+                else:
+                    self._rules.add(form)
+
+    @classmethod
+    def load(cls, path: Path = PSL_PATH, include_private: bool = False):
+        """从文件加载公共后缀列表"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f, include_private=include_private)
+
+    def public_suffix(self, domain: str) -> str:
+        """返回域名的公共后缀，未命中任何规则时以顶级域名作为公共后缀"""
+        labels = domain.split(".")
+        for i in range(len(labels)):
+            candidate = ".".join(labels[i:])
+            if candidate in self._exceptions:
+                # 例外规则：公共后缀为去掉最左侧标签后的部分
+                return ".".join(labels[i + 1 :])
+            if candidate in self._rules:
+                return candidate
+            if i + 1 < len(labels) and ".".join(labels[i + 1 :]) in self._wildcards:
+                return candidate
+        return labels[-1]
+
+    def registrable_domain(self, domain: str) -> Optional[str]:
+        """返回域名的可注册域名（eTLD+1），域名本身是公共后缀时返回 None"""
+        suffix = self.public_suffix(domain)
+        if len(domain) <= len(suffix):
+            return None
+        index = domain.rfind(".", 0, len(domain) - len(suffix) - 1)
+        return domain[index + 1 :]
+
+
+_psl: Optional[PublicSuffixList] = None
+
+
+def get_public_suffix_list() -> PublicSuffixList:
+    """获取进程内共享的公共后缀列表，首次调用时加载"""
+    # pylint: disable=W0603
+    global _psl
+    if _psl is None:
+        _psl = PublicSuffixList.load()
+    return _psl
+
+
+@lru_cache(maxsize=1 << 16)
+def get_main_domain(domain: str) -> str:
+    """
+    提取主域名（eTLD+1），域名本身是公共后缀时返回域名本身
+    """
+    domain = domain.rstrip(".").lower()
+    return get_public_suffix_list().registrable_domain(domain) or domain
+
+
+@lru_cache(maxsize=1 << 16)
+def is_public_suffix(domain: str) -> bool:
+    """判断域名本身是否为公共后缀"""
+    domain = domain.rstrip(".").lower()
+    return get_public_suffix_list().public_suffix(domain) == domain
@@ -0,0 +1,287 @@
+"""发布清单与增量变更
+
+每次构建后将新的规则集与 rules 分支上的上一次发布比较，并写入 manifest.json：
+- files：每个发布文件的 SHA-256 和大小，下游只需获取清单并比较哈希，
+  即可判断是否需要重新下载规则集
+- counts：合并后规则集中各规则类型的条目数量
+- changes：与上一次发布相比各规则类型新增和删除的条目
+
+所有发布文件的哈希都与上一次的清单一致时无需比较规则内容；
+哈希不同但规则内容相同（如仅编码变化）时同样视为未变化，跳过发布。
+"""
+
+import json
+import os
+import sys
+import time
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+import requests
+
+from build_cache import DownloadError, fetch_all, file_sha256
+from rule_model import (
+    DOMAIN_RULE_KEYS,
+    RULE_MODEL_KEYS,
+    DomainArray,
+    LabelTable,
+    RuleModel,
+)
+from srs import read_srs
+
+# pylint: disable=C0301
+RELEASE_BASE_URL = (
+    "https://raw.githubusercontent.com/OneOhCloud/one-geosite/refs/heads/rules/"
+)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# 上一次发布的文件下载到此目录，供下次运行的条件请求使用
+PREVIOUS_RELEASE_DIR = Path("tmp/previous")
+# 清单中每种规则类型最多列出的新增或删除条目数量
+MANIFEST_ENTRY_LIMIT = 50_000
+
+
+def fetch_previous(name: str) -> Optional[Path]:
+    """下载上一次发布的文件，不存在或下载失败时返回 None"""
+    dest = PREVIOUS_RELEASE_DIR / name
+    try:
+        fetch_all({RELEASE_BASE_URL + name: dest})
+    except (DownloadError, requests.RequestException) as e:
+        print(f"Previous release unavailable: {e}")
+        return None
+    return dest
+
+
+def load_model(
+    path: Union[str, Path], labels: Optional[LabelTable] = None
+) -> RuleModel:
+    """读取只包含一条 headless 规则的 .srs 文件为规则模型"""
+    rules = read_srs(path)["rules"]
+    if len(rules) > 1:
+        raise ValueError(f"{path}: expected a single rule, found {len(rules)}")
+    return RuleModel.from_rule(rules[0] if rules else {}, labels)
+
+
+def diff_sorted(old: Iterable[Any], new: Iterable[Any]) -> Iterator[tuple[bool, Any]]:
+    """
+    比较两个已排序的序列，返回 (是否为新增, 条目)
+    两侧各自重复的条目按一条处理
+    """
+    old_iter, new_iter = iter(old), iter(new)
+    sentinel = object()
+    old_value = next(old_iter, sentinel)
+    new_value = next(new_iter, sentinel)
+    previous = sentinel
+    while old_value is not sentinel or new_value is not sentinel:
+        if new_value is sentinel or (
+            old_value is not sentinel and old_value < new_value
+        ):
+            if old_value != previous:
+                yield False, old_value
+            previous, old_value = old_value, next(old_iter, sentinel)
+        elif old_value is sentinel or new_value < old_value:
+            if new_value != previous:
+                yield True, new_value
+            previous, new_value = new_value, next(new_iter, sentinel)
+        else:
+            previous = old_value
+            old_value = next(old_iter, sentinel)
+            new_value = next(new_iter, sentinel)
+
+
+def _sorted_sort_keys(domains: DomainArray, ranks: array) -> Iterator[bytearray]:
+    """
+    按顺序返回域名的排序键（标签排名的大端字节序列）
+    排序后拼接为一个字节串保存，比较时才逐个切出，不为每个域名保留键对象
+    """
+    keys = domains.sort_keys(ranks)
+    keys.sort()
+    ends = array("Q", accumulate(map(len, keys)))
+    data = bytearray()
+    for key in keys:
+        data += key
+    del keys
+
+    def iter_keys():
+        start = 0
+        for end in ends:
+            yield data[start:end]
+            start = end
+
+    return iter_keys()
+
+
+def _sort_key_decoder(labels: LabelTable, ranks: array) -> Callable[[bytes], str]:
+    """返回将排序键还原为域名的函数"""
+    by_rank = [""] * len(ranks)
+    for label_id, rank in enumerate(ranks):
+        by_rank[rank] = labels[label_id]
+
+    def decode(key: bytes) -> str:
+        label_ranks = array(ranks.typecode, key)
+        if sys.byteorder == "little":
+            label_ranks.byteswap()
+        label_ranks.reverse()
+        return ".".join([by_rank[rank] for rank in label_ranks])
+
+    return decode
+
+
+def diff_models(old: RuleModel, new: RuleModel) -> dict[str, dict[str, Any]]:
+    """
+    比较两个规则模型，返回有变化的规则类型：
+    {类型: {"added": 数量, "removed": 数量, "added_entries": [...], "removed_entries": [...]}}
+    条目超过 MANIFEST_ENTRY_LIMIT 时只列出前面的部分
+
+    两个模型共享标签表时，domain 和 domain_suffix 按标签排名组成的排序键比较，
+    只有列出的条目才还原为字符串，条目按标签由顶级域开始逐级排序
+    """
+    shared = old.labels is new.labels
+    if shared:
+        ranks = new.labels.ranks()
+        decode = _sort_key_decoder(new.labels, ranks)
+
+    changes = {}
+    for key in RULE_MODEL_KEYS:
+        added: list[str] = []
+        removed: list[str] = []
+        n_added = n_removed = 0
+        # 逐个规则类型排序比较，同一时间只保存一种类型的排序键
+        if shared and key in DOMAIN_RULE_KEYS:
+            old_values = _sorted_sort_keys(getattr(old, key), ranks)
+            new_values = _sorted_sort_keys(getattr(new, key), ranks)
+            to_entry = decode
+        else:
+            old_values = sorted(getattr(old, key))
+            new_values = sorted(getattr(new, key))
+            to_entry = str
+        for is_added, value in diff_sorted(old_values, new_values):
+            if is_added:
+                n_added += 1
+                if len(added) < MANIFEST_ENTRY_LIMIT:
+                    added.append(to_entry(value))
+            else:
+                n_removed += 1
+                if len(removed) < MANIFEST_ENTRY_LIMIT:
+                    removed.append(to_entry(value))
+        del old_values, new_values
+        if n_added or n_removed:
+            changes[key] = {
+                "added": n_added,
+                "removed": n_removed,
+                "added_entries": added,
+                "removed_entries": removed,
+            }
+    return changes
+
+
+def load_manifest(path: Union[str, Path, None]) -> Optional[dict[str, Any]]:
+    """读取清单，文件不存在或格式不正确时返回 None"""
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def file_entries(paths: Iterable[Union[str, Path]]) -> dict[str, dict[str, Any]]:
+    """发布文件的哈希和大小，按文件名排序"""
+    return {
+        Path(path).name: {
+            "sha256": file_sha256(path),
+            "size": os.path.getsize(path),
+        }
+        for path in sorted(paths, key=lambda p: Path(p).name)
+    }
+
+
+def _same_files(
+    previous: Optional[dict[str, Any]], files: dict[str, Any], skip: str = ""
+) -> bool:
+    """判断发布文件的哈希是否与上一次的清单一致，可忽略名为 skip 的文件"""
+    if previous is None:
+        return False
+    previous_files = {k: v for k, v in previous.get("files", {}).items() if k != skip}
+    files = {k: v for k, v in files.items() if k != skip}
+    return previous_files.keys() == files.keys() and all(
+        previous_files[name].get("sha256") == entry["sha256"]
+        for name, entry in files.items()
+    )
+
+
+def build_manifest(
+    rule_set_path: Union[str, Path], published: Iterable[Union[str, Path]]
+) -> tuple[dict[str, Any], bool]:
+    """
+    生成发布清单，返回 (清单, 是否有变化)
+    rule_set_path 为合并后的规则集，published 为全部发布文件
+    """
+    rule_set_path = Path(rule_set_path)
+    files = file_entries(published)
+    previous = load_manifest(fetch_previous(MANIFEST_NAME))
+    if _same_files(previous, files):
+        print("Release files unchanged.")
+        return previous, False
+
+    model = load_model(rule_set_path)
+    manifest: dict[str, Any] = {
+        "version": MANIFEST_VERSION,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": files,
+        "counts": model.counts(),
+        "previous": None,
+        "changes": None,
+    }
+
+    previous_path = fetch_previous(rule_set_path.name)
+    if previous_path is None:
+        # 首次发布，没有可比较的规则集
+        return manifest, True
+
+    manifest["previous"] = {
+        "generated_at": previous.get("generated_at") if previous else None,
+        "sha256": file_sha256(previous_path),
+    }
+    try:
+        previous_model = load_model(previous_path, model.labels)
+    except (OSError, ValueError) as e:
+        # 上一次发布的规则集无法解码时无法比较，按有变化处理
+        print(f"Previous rule set unreadable: {e}")
+        return manifest, True
+
+    changes = diff_models(previous_model, model)
+    manifest["changes"] = changes
+    if previous_model.extra != model.extra:
+        changes["extra"] = {"before": previous_model.extra, "after": model.extra}
+
+    # 规则内容相同时，其余发布文件也必须与上一次的清单一致才视为未变化
+    if not changes and _same_files(previous, files, skip=rule_set_path.name):
+        print("Rule content unchanged.")
+        return previous, False
+    return manifest, True
+
+
+def write_manifest(path: Union[str, Path], manifest: dict[str, Any]) -> None:
+    """写入清单"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def set_github_output(name: str, value: str) -> None:
+    """在 GitHub Actions 中设置步骤输出，其他环境下忽略"""
+    output = os.environ.get("GITHUB_OUTPUT")
+    if output:
+        with open(output, "a", encoding="utf-8") as f:
+            f.write(f"{name}={value}\n")
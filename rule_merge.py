@@ -0,0 +1,199 @@
+"""规则合并
+
+合并两组 headless 规则（geosite 规则与 rules.json 中的自定义规则）：
+- domain_keyword、domain_regex 按集合去重
+- domain 和 domain_suffix 保存在紧凑的规则模型中，按反序标签排序后一次扫描完成
+  去重，跳过已被现有后缀覆盖的自定义后缀，并去掉已被 domain_suffix 覆盖的 domain
+- domain_regex 去掉匹配结果已被 domain_suffix 完全覆盖的规则
+- ip_cidr 转换为整数区间后合并重叠和相邻的网段，再拆分为最少的 CIDR 前缀
+"""
+
+from typing import Any, Union
+
+from domain_regex import find_subsumed
+from ip_ranges import aggregate_cidrs
+from rule_model import DOMAIN_RULE_KEYS, RuleModel, SortedDomainSet
+
+# 按集合合并的规则类型
+SET_RULE_KEYS = ("domain_keyword", "domain_regex")
+
+
+class MergeStats:
+    """一次合并的统计"""
+
+    __slots__ = (
+        "added",
+        "skipped_suffixes",
+        "pruned_domains",
+        "subsumed_regexes",
+        "cidrs_before",
+    )
+
+    def __init__(self):
+        # 每种规则新增的条目数
+        self.added: dict[str, int] = {}
+        # 被现有后缀覆盖而跳过的自定义后缀：(规则, 覆盖它的后缀)
+        self.skipped_suffixes: list[tuple[str, str]] = []
+        # 被 domain_suffix 覆盖而删除的 domain
+        self.pruned_domains: list[str] = []
+        # 被 domain_suffix 完全覆盖而删除的 domain_regex：(规则, 覆盖它的后缀)
+        self.subsumed_regexes: list[tuple[str, str]] = []
+        # 聚合前的网段数量
+        self.cidrs_before = 0
+
+
+class RuleMerger:
+    """
+    在紧凑的规则模型上合并 headless 规则，合并完成后通过 to_model() 或
+    to_rule() 输出，domain 和 domain_suffix 的去重与覆盖检查在输出时一次完成
+    """
+
+    def __init__(self, rule: Union[dict[str, Any], RuleModel, None] = None):
+        if isinstance(rule, RuleModel):
+            self._model = rule
+        else:
+            self._model = RuleModel.from_rule(rule or {})
+        # 上游规则的数量，之后追加的均为自定义规则
+        self._base_domains = len(self._model.domain)
+        self._base_suffixes = len(self._model.domain_suffix)
+        self._sets: dict[str, set[str]] = {
+            key: set(getattr(self._model, key)) for key in SET_RULE_KEYS
+        }
+        self._cidrs: list[str] = list(self._model.ip_cidr)
+        self.stats = MergeStats()
+
+    def merge(self, custom: dict[str, Any]) -> MergeStats:
+        """
+        合并一组自定义规则
+        domain 和 domain_suffix 的新增数量在输出时统计
+        """
+        for key in SET_RULE_KEYS:
+            values = self._sets[key]
+            before = len(values)
+            values.update(custom.get(key, []))
+            self._count(key, len(values) - before)
+
+        for key in DOMAIN_RULE_KEYS:
+            for value in custom.get(key, []):
+                self._model.add(key, value)
+
+        cidrs = custom.get("ip_cidr", [])
+        self._cidrs.extend(cidrs)
+        self._count("ip_cidr", len(cidrs))
+        return self.stats
+
+    def _count(self, key: str, added: int) -> None:
+        self.stats.added[key] = self.stats.added.get(key, 0) + added
+
+    def _resolve_domains(self) -> tuple[list[int], list[int], SortedDomainSet]:
+        """
+        将 domain_suffix 和 domain 按反序标签排序后线性扫描一次：
+        父域名总是先于其子域名出现，扫描时用栈保存覆盖当前位置的后缀规则。
+        返回保留的 domain_suffix 下标、domain 下标以及后缀的有序集合
+        """
+        # pylint: disable=R0914
+        model = self._model
+        suffixes, domains = model.domain_suffix, model.domain
+        n_suffixes = len(suffixes)
+        ranks = model.labels.ranks()
+        # 前 n_suffixes 个为 domain_suffix 的排序键，其后为 domain 的排序键
+        keys = suffixes.sort_keys(ranks)
+        keys += domains.sort_keys(ranks)
+        width = ranks.itemsize
+        # 空标签（以 . 开头的后缀）是字符串顺序最小的标签，排名为 0
+        empty_key = bytes(width) if model.labels.get("") is not None else None
+
+        # 排序是稳定的：键相同时上游后缀先于自定义后缀，后缀先于 domain
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        kept_suffixes: list[int] = []
+        kept_domains: list[int] = []
+        # (前缀, 是否只覆盖子域名, 后缀下标)
+        stack: list[tuple[bytes, bool, int]] = []
+        previous_domain = previous_custom = None
+        suffixes_added = domains_added = 0
+        base_suffixes, base_domains = self._base_suffixes, self._base_domains
+        for index in order:
+            current = keys[index]
+            while stack and not current.startswith(stack[-1][0]):
+                stack.pop()
+            # 离当前条目最近的覆盖它的后缀规则，同一级上 example.com 优先于
+            # .example.com，与 SuffixIndex.match 一致
+            cover = None
+            for position in range(len(stack) - 1, -1, -1):
+                prefix, subdomain_only, cover = stack[position]
+                if subdomain_only and keys[cover] == current:
+                    break
+                if subdomain_only and position and stack[position - 1][0] == prefix:
+                    cover = stack[position - 1][2]
+                    break
+                if not subdomain_only or len(current) > len(prefix):
+                    break
+            else:
+                cover = None
+
+            if index < n_suffixes:
+                if index >= base_suffixes:
+                    if current == previous_custom:
+                        # 自定义规则中重复的后缀
+                        continue
+                    previous_custom = current
+                    if cover is not None:
+                        self.stats.skipped_suffixes.append(
+                            (suffixes[index], suffixes[cover])
+                        )
+                        continue
+                    suffixes_added += 1
+                elif stack and keys[stack[-1][2]] == current:
+                    # 上游规则中重复的后缀
+                    continue
+                kept_suffixes.append(index)
+                subdomain_only = empty_key is not None and current.endswith(empty_key)
+                prefix = current[:-width] if subdomain_only else current
+                stack.append((prefix, subdomain_only, index))
+                continue
+
+            index -= n_suffixes
+            if current == previous_domain:
+                continue
+            previous_domain = current
+            if index >= base_domains:
+                domains_added += 1
+            if cover is not None:
+                self.stats.pruned_domains.append(domains[index])
+            else:
+                kept_domains.append(index)
+
+        self._count("domain", domains_added)
+        self._count("domain_suffix", suffixes_added)
+        self.stats.pruned_domains.sort()
+        suffix_set = SortedDomainSet(suffixes, kept_suffixes, keys, ranks)
+        return kept_suffixes, kept_domains, suffix_set
+
+    def to_model(self) -> RuleModel:
+        """输出合并后的规则模型，与输入模型共享标签表"""
+        self.stats.skipped_suffixes = []
+        self.stats.pruned_domains = []
+        self.stats.added.pop("domain", None)
+        self.stats.added.pop("domain_suffix", None)
+        kept_suffixes, kept_domains, suffix_set = self._resolve_domains()
+
+        model = RuleModel(self._model.labels)
+        model.extra = dict(self._model.extra)
+        model.domain = self._model.domain.take(kept_domains)
+        model.domain_suffix = self._model.domain_suffix.take(kept_suffixes)
+        model.domain_keyword = sorted(self._sets["domain_keyword"])
+
+        self.stats.subsumed_regexes = sorted(
+            find_subsumed(self._sets["domain_regex"], suffix_set)
+        )
+        subsumed = {pattern for pattern, _ in self.stats.subsumed_regexes}
+        model.domain_regex = sorted(self._sets["domain_regex"] - subsumed)
+
+        self.stats.cidrs_before = len(self._cidrs)
+        model.ip_cidr = aggregate_cidrs(self._cidrs)
+        return model
+
+    def to_rule(self) -> dict[str, Any]:
+        """输出合并后的规则，各规则项均已排序"""
+        return self.to_model().to_rule()
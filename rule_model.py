@@ -0,0 +1,346 @@
+"""紧凑的规则模型
+
+合并数百万条规则时，以 Python 字符串列表保存每个域名的开销远大于域名本身。
+RuleModel 将 domain 和 domain_suffix 按标签拆分后驻留到 LabelTable 中，
+每个域名只保存为一段标签编号（由顶级域开始的反序），所有域名的编号
+连续存放在 array 中并以偏移量切分，不再为每个域名创建对象。
+
+反序的标签编号按标签的字符串顺序映射为排名并转为大端字节后，
+字节序即为按标签逐级比较的顺序，父域名总是排在其子域名之前，
+合并时只需一次排序和线性扫描即可去重并找出被后缀覆盖的条目。
+
+规则模型可以按行流式保存和加载，每行为 ``规则类型<TAB>值``。
+"""
+
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
+
+from domain_index import normalize_domain
+
+# 使用 array 保存的规则类型
+DOMAIN_RULE_KEYS = ("domain", "domain_suffix")
+# 数量较少、以字符串列表保存的规则类型
+LIST_RULE_KEYS = ("domain_keyword", "domain_regex", "ip_cidr")
+RULE_MODEL_KEYS = DOMAIN_RULE_KEYS + LIST_RULE_KEYS
+
+# 流式保存时写在文件开头的格式标识
+MODEL_FILE_HEADER = "# one-geosite rule model v1"
+# 其余规则项以 JSON 保存在该前缀开头的行中
+_EXTRA_PREFIX = "@"
+
+# 标签编号与偏移量使用的无符号整数类型（至少 4 字节）
+_ID_TYPECODE = "I" if array("I").itemsize >= 4 else "L"
+
+
+class _LabelIds(dict):
+    """标签到编号的映射，查询不存在的标签时为其分配下一个编号"""
+
+    __slots__ = ("labels",)
+
+    def __init__(self):
+        super().__init__()
+        self.labels: list[str] = []
+
+    def __missing__(self, label: str) -> int:
+        label_id = len(self.labels)
+        self[label] = label_id
+        self.labels.append(label)
+        return label_id
+
+
+class LabelTable:
+    """标签驻留表，相同的标签只保存一次"""
+
+    __slots__ = ("_ids", "_labels")
+
+    def __init__(self):
+        self._ids = _LabelIds()
+        self._labels = self._ids.labels
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __getitem__(self, label_id: int) -> str:
+        return self._labels[label_id]
+
+    def intern(self, label: str) -> int:
+        """返回标签的编号，新标签追加到表尾"""
+        return self._ids[label]
+
+    def intern_all(self, labels: Iterable[str]) -> list[int]:
+        """批量返回标签的编号"""
+        return list(map(self._ids.__getitem__, labels))
+
+    def get(self, label: str) -> Optional[int]:
+        """返回已驻留标签的编号，不存在时返回 None"""
+        return self._ids.get(label)
+
+    def ranks(self) -> array:
+        """每个标签编号在按字符串排序后的排名"""
+        ranks = array(_ID_TYPECODE, bytes(array(_ID_TYPECODE).itemsize * len(self)))
+        for rank, label_id in enumerate(
+            sorted(range(len(self._labels)), key=self._labels.__getitem__)
+        ):
+            ranks[label_id] = rank
+        return ranks
+
+
+class DomainArray:
+    """
+    以标签编号序列保存的域名数组
+    第 i 个域名的标签编号为 labels[ends[i - 1]:ends[i]]，由顶级域开始反序排列
+    以 . 开头的后缀规则保存为末尾带一个空标签的序列
+    """
+
+    __slots__ = ("table", "_labels", "_ends")
+
+    def __init__(self, table: LabelTable, domains: Iterable[str] = ()):
+        self.table = table
+        self._labels = array(_ID_TYPECODE)
+        self._ends = array(_ID_TYPECODE)
+        self.extend(domains)
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def __getitem__(self, index: int) -> str:
+        table = self.table
+        return ".".join([table[i] for i in reversed(self.label_ids(index))])
+
+    def __iter__(self) -> Iterator[str]:
+        table = self.table
+        labels = self._labels
+        start = 0
+        for end in self._ends:
+            label_ids = labels[start:end]
+            label_ids.reverse()
+            yield ".".join([table[i] for i in label_ids])
+            start = end
+
+    def append(self, domain: str) -> None:
+        """追加一个已规范化的域名"""
+        label_ids = self.table.intern_all(domain.split("."))
+        label_ids.reverse()
+        self._labels.extend(label_ids)
+        self._ends.append(len(self._labels))
+
+    def extend(self, domains: Iterable[str]) -> None:
+        """追加多个已规范化的域名"""
+        intern_all = self.table.intern_all
+        labels, ends = self._labels, self._ends
+        for domain in domains:
+            label_ids = intern_all(domain.split("."))
+            label_ids.reverse()
+            labels.extend(label_ids)
+            ends.append(len(labels))
+
+    def label_ids(self, index: int) -> array:
+        """第 index 个域名的标签编号（反序）"""
+        if index < 0:
+            index += len(self._ends)
+        start = self._ends[index - 1] if index else 0
+        return self._labels[start : self._ends[index]]
+
+    def take(self, indices: Iterable[int]) -> "DomainArray":
+        """按给定顺序复制部分域名，返回共享同一标签表的新数组"""
+        result = DomainArray(self.table)
+        # pylint: disable=W0212
+        labels, ends = result._labels, result._ends
+        view = memoryview(self._labels).cast("B")
+        width = self._labels.itemsize
+        for index in indices:
+            start = self._ends[index - 1] if index else 0
+            labels.frombytes(view[start * width : self._ends[index] * width])
+            ends.append(len(labels))
+        return result
+
+    def sort_keys(self, ranks: array) -> list[bytes]:
+        """
+        返回每个域名的排序键：标签排名的大端字节序列，
+        字节序即按标签逐级比较的顺序，父域名是其子域名排序键的前缀
+        """
+        remapped = array(_ID_TYPECODE, map(ranks.__getitem__, self._labels))
+        if sys.byteorder == "little":
+            remapped.byteswap()
+        view = memoryview(remapped).cast("B")
+        width = remapped.itemsize
+        keys = []
+        start = 0
+        for end in self._ends:
+            keys.append(view[start * width : end * width].tobytes())
+            start = end
+        return keys
+
+
+class SortedDomainSet:
+    """
+    DomainArray 中按排序键有序的部分条目，支持二分查找
+    match() 的语义与 SuffixIndex.match 一致，可代替其用于后缀覆盖检查
+    """
+
+    __slots__ = ("_domains", "_order", "_keys", "_ranks")
+
+    def __init__(
+        self,
+        domains: DomainArray,
+        order: Sequence[int],
+        keys: Sequence[bytes],
+        ranks: array,
+    ):
+        self._domains = domains
+        # 按排序键有序的条目下标，以及全部条目的排序键
+        self._order = order
+        self._keys = keys
+        self._ranks = ranks
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _encode(self, domain: str) -> Optional[bytes]:
+        """将域名编码为排序键，含有未驻留的标签时返回 None"""
+        table = self._domains.table
+        ranks = array(_ID_TYPECODE)
+        for label in reversed(domain.split(".")):
+            label_id = table.get(label)
+            if label_id is None:
+                return None
+            ranks.append(self._ranks[label_id])
+        if sys.byteorder == "little":
+            ranks.byteswap()
+        return ranks.tobytes()
+
+    def __contains__(self, domain: str) -> bool:
+        target = self._encode(normalize_domain(domain))
+        if target is None:
+            return False
+        index = bisect_left(self._order, target, key=self._keys.__getitem__)
+        return index < len(self._order) and self._keys[self._order[index]] == target
+
+    def match(self, domain: str) -> Optional[str]:
+        """返回覆盖该域名的后缀规则，没有匹配时返回 None"""
+        domain = normalize_domain(domain)
+        if not domain:
+            return None
+        if domain.startswith("."):
+            if domain in self:
+                return domain
+            return self.match(domain[1:])
+        if domain in self:
+            return domain
+
+        index = domain.find(".")
+        while index != -1:
+            parent = domain[index + 1 :]
+            if parent in self:
+                return parent
+            if "." + parent in self:
+                return "." + parent
+            index = domain.find(".", index + 1)
+        return None
+
+    def covers(self, domain: str) -> bool:
+        """判断域名是否已被集合中的后缀规则覆盖"""
+        return self.match(domain) is not None
+
+
+class RuleModel:
+    """headless 规则的紧凑表示"""
+
+    __slots__ = ("labels", *RULE_MODEL_KEYS, "extra")
+
+    def __init__(self, labels: Optional[LabelTable] = None):
+        self.labels = labels if labels is not None else LabelTable()
+        self.domain = DomainArray(self.labels)
+        self.domain_suffix = DomainArray(self.labels)
+        self.domain_keyword: list[str] = []
+        self.domain_regex: list[str] = []
+        self.ip_cidr: list[str] = []
+        # 模型不处理的其余规则项，原样保留
+        self.extra: dict[str, Any] = {}
+
+    @classmethod
+    def from_rule(
+        cls, rule: dict[str, Any], labels: Optional[LabelTable] = None
+    ) -> "RuleModel":
+        """由 headless 规则构建模型，可与其他模型共享标签表"""
+        model = cls(labels)
+        for key, value in rule.items():
+            if key not in RULE_MODEL_KEYS:
+                model.extra[key] = value
+                continue
+            values = [value] if isinstance(value, str) else value
+            if key in DOMAIN_RULE_KEYS:
+                getattr(model, key).extend(filter(None, map(normalize_domain, values)))
+            else:
+                for item in values:
+                    model.add(key, item)
+        return model
+
+    def to_rule(self) -> dict[str, Any]:
+        """
+        输出 headless 规则，空的规则项不输出
+        域名类规则按字符串排序，ip_cidr 保持原有顺序（合并后按地址排序）
+        """
+        rule = dict(self.extra)
+        for key in RULE_MODEL_KEYS:
+            values = getattr(self, key)
+            if len(values):
+                rule[key] = list(values) if key == "ip_cidr" else sorted(values)
+        return rule
+
+    def add(self, key: str, value: str) -> None:
+        """添加一条规则"""
+        if key in DOMAIN_RULE_KEYS:
+            value = normalize_domain(value)
+            if value:
+                getattr(self, key).append(value)
+        elif key in LIST_RULE_KEYS:
+            value = value.strip()
+            if value:
+                getattr(self, key).append(value)
+        else:
+            raise KeyError(f"Unsupported rule type: {key}")
+
+    def counts(self) -> dict[str, int]:
+        """各规则类型的条目数量"""
+        return {key: len(getattr(self, key)) for key in RULE_MODEL_KEYS}
+
+    def entries(self) -> Iterator[tuple[str, str]]:
+        """逐条返回 (规则类型, 值)，不保证顺序"""
+        for key in RULE_MODEL_KEYS:
+            for value in getattr(self, key):
+                yield key, value
+
+    def save(self, path: Union[str, Path]) -> None:
+        """按行流式写入模型"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(MODEL_FILE_HEADER + "\n")
+            for key, value in self.extra.items():
+                f.write(f"{_EXTRA_PREFIX}{key}\t{json.dumps(value)}\n")
+            for key, value in self.entries():
+                f.write(f"{key}\t{value}\n")
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RuleModel":
+        """按行流式读取模型"""
+        model = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n")
+            if header != MODEL_FILE_HEADER:
+                raise ValueError(f"Invalid rule model file: {path}")
+            for line_no, line in enumerate(f, 2):
+                key, sep, value = line.rstrip("\n").partition("\t")
+                if not sep:
+                    raise ValueError(f"{path}:{line_no}: malformed line")
+                if key.startswith(_EXTRA_PREFIX):
+                    model.extra[key[1:]] = json.loads(value)
+                else:
+                    model.add(key, value)
+        return model
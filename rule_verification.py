@@ -0,0 +1,104 @@
+"""规则复查调度
+
+记录 rules.json 中每条 domain_suffix 规则最近一次复查通过的时间和连续失败次数，
+保存在 data/rule_verification.json 中。每次运行只通过优先队列选出最久未复查的
+K 条规则进行复查，规则只有在连续 N 次复查失败后才会被删除，
+偶发的探测失败不会导致规则丢失。
+"""
+
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+VERIFICATION_STATE_PATH = Path(__file__).parent / "data" / "rule_verification.json"
+
+# 每次运行复查的规则数量上限
+VERIFY_BUDGET = 500
+# 连续复查失败达到该次数后删除规则
+MAX_FAILURE_STREAK = 3
+
+
+class VerificationScheduler:
+    """规则复查状态与调度"""
+
+    def __init__(
+        self,
+        path: Path = VERIFICATION_STATE_PATH,
+        budget: int = VERIFY_BUDGET,
+        max_failures: int = MAX_FAILURE_STREAK,
+    ):
+        self.path = Path(path)
+        self.budget = budget
+        self.max_failures = max_failures
+        # 规则 -> {"last_verified": 最近一次复查通过的时间, "failures": 连续失败次数}
+        self._state: dict[str, dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    @classmethod
+    def load(cls, path: Path = VERIFICATION_STATE_PATH, **kwargs):
+        """加载复查状态，文件不存在时所有规则都视为从未复查"""
+        scheduler = cls(path, **kwargs)
+        try:
+            with open(scheduler.path, "r", encoding="utf-8") as f:
+                scheduler._state = json.load(f)
+        except FileNotFoundError:
+            pass
+        return scheduler
+
+    def save(self) -> None:
+        """保存复查状态"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def last_verified(self, suffix: str) -> int:
+        """最近一次复查通过的时间，从未通过复查时返回 0"""
+        return self._state.get(suffix, {}).get("last_verified", 0)
+
+    def failures(self, suffix: str) -> int:
+        """连续复查失败的次数"""
+        return self._state.get(suffix, {}).get("failures", 0)
+
+    def prune(self, suffixes: Iterable[str]) -> None:
+        """删除已不在规则中的条目"""
+        keep = set(suffixes)
+        self._state = {k: v for k, v in self._state.items() if k in keep}
+
+    def select(
+        self, suffixes: Iterable[str], budget: Optional[int] = None
+    ) -> list[str]:
+        """选出最久未复查通过的规则，从未复查和复查失败的规则优先"""
+        if budget is None:
+            budget = self.budget
+        return heapq.nsmallest(
+            budget, suffixes, key=lambda s: (self.last_verified(s), s)
+        )
+
+    def record(
+        self, suffix: str, ok: Optional[bool], now: Optional[int] = None
+    ) -> bool:
+        """
+        记录一次复查结果，返回规则是否应被删除
+        复查失败时不更新复查时间，使该规则在下次运行时再次被优先复查
+        ok 为 None 表示探测未完成（超时等），不改变该规则的状态
+        """
+        if ok is None:
+            return False
+        entry = self._state.setdefault(suffix, {"last_verified": 0, "failures": 0})
+        if ok:
+            entry["last_verified"] = int(time.time()) if now is None else now
+            entry["failures"] = 0
+            return False
+
+        entry["failures"] += 1
+        if entry["failures"] >= self.max_failures:
+            del self._state[suffix]
+            return True
+        return False
@@ -0,0 +1,636 @@
+"""sing-box 二进制规则集（.srs）的读写
+
+直接在 .srs 文件和内存中的规则集（与 sing-box 源规则集 JSON 结构相同的字典）
+之间转换，无需下载 sing-box 并执行 rule-set decompile / compile。
+
+文件格式：3 字节魔数 "SRS"、1 字节版本号，其后为 zlib 压缩的正文。
+正文以 uvarint 规则数开头，每条规则由若干规则项组成，以 0xFF 结束。
+domain 和 domain_suffix 合并编码为一个 succinct trie（键为按字符反转后的域名），
+IP 网段编码为合并后的地址区间。
+"""
+
+import ipaddress
+import os
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Iterable, Union
+
+from ip_ranges import merge_ranges
+
+SRS_MAGIC = b"SRS"
+SRS_VERSION_1 = 1
+# 版本 2 起 domain_suffix 使用根后缀标记编码
+SRS_VERSION_2 = 2
+# 版本 3 起支持 network_type 等网络状态规则项
+SRS_VERSION_3 = 3
+SRS_VERSION_CURRENT = SRS_VERSION_3
+
+# 规则项类型
+_ITEM_QUERY_TYPE = 0
+_ITEM_NETWORK = 1
+_ITEM_DOMAIN = 2
+_ITEM_DOMAIN_KEYWORD = 3
+_ITEM_DOMAIN_REGEX = 4
+_ITEM_SOURCE_IP_CIDR = 5
+_ITEM_IP_CIDR = 6
+_ITEM_SOURCE_PORT = 7
+_ITEM_SOURCE_PORT_RANGE = 8
+_ITEM_PORT = 9
+_ITEM_PORT_RANGE = 10
+_ITEM_PROCESS_NAME = 11
+_ITEM_PROCESS_PATH = 12
+_ITEM_PACKAGE_NAME = 13
+_ITEM_WIFI_SSID = 14
+_ITEM_WIFI_BSSID = 15
+_ITEM_ADGUARD_DOMAIN = 16
+_ITEM_PROCESS_PATH_REGEX = 17
+_ITEM_NETWORK_TYPE = 18
+_ITEM_NETWORK_IS_EXPENSIVE = 19
+_ITEM_NETWORK_IS_CONSTRAINED = 20
+_ITEM_FINAL = 0xFF
+
+_STRING_ITEMS = {
+    _ITEM_NETWORK: "network",
+    _ITEM_DOMAIN_KEYWORD: "domain_keyword",
+    _ITEM_DOMAIN_REGEX: "domain_regex",
+    _ITEM_SOURCE_PORT_RANGE: "source_port_range",
+    _ITEM_PORT_RANGE: "port_range",
+    _ITEM_PROCESS_NAME: "process_name",
+    _ITEM_PROCESS_PATH: "process_path",
+    _ITEM_PACKAGE_NAME: "package_name",
+    _ITEM_WIFI_SSID: "wifi_ssid",
+    _ITEM_WIFI_BSSID: "wifi_bssid",
+    _ITEM_PROCESS_PATH_REGEX: "process_path_regex",
+}
+_UINT16_ITEMS = {
+    _ITEM_QUERY_TYPE: "query_type",
+    _ITEM_SOURCE_PORT: "source_port",
+    _ITEM_PORT: "port",
+}
+_IP_ITEMS = {
+    _ITEM_SOURCE_IP_CIDR: "source_ip_cidr",
+    _ITEM_IP_CIDR: "ip_cidr",
+}
+_FLAG_ITEMS = {
+    _ITEM_NETWORK_IS_EXPENSIVE: "network_is_expensive",
+    _ITEM_NETWORK_IS_CONSTRAINED: "network_is_constrained",
+}
+
+# 写入规则项的顺序，与 sing-box 一致
+_WRITE_ORDER = (
+    _ITEM_QUERY_TYPE,
+    _ITEM_NETWORK,
+    _ITEM_DOMAIN,
+    _ITEM_DOMAIN_KEYWORD,
+    _ITEM_DOMAIN_REGEX,
+    _ITEM_SOURCE_IP_CIDR,
+    _ITEM_IP_CIDR,
+    _ITEM_SOURCE_PORT,
+    _ITEM_SOURCE_PORT_RANGE,
+    _ITEM_PORT,
+    _ITEM_PORT_RANGE,
+    _ITEM_PROCESS_NAME,
+    _ITEM_PROCESS_PATH,
+    _ITEM_PROCESS_PATH_REGEX,
+    _ITEM_PACKAGE_NAME,
+    _ITEM_NETWORK_TYPE,
+    _ITEM_NETWORK_IS_EXPENSIVE,
+    _ITEM_NETWORK_IS_CONSTRAINED,
+    _ITEM_WIFI_SSID,
+    _ITEM_WIFI_BSSID,
+)
+
+_NETWORK_TYPES = ("wifi", "cellular", "ethernet", "other")
+_LOGICAL_MODES = ("and", "or")
+_QUERY_TYPES = {
+    "A": 1,
+    "NS": 2,
+    "CNAME": 5,
+    "SOA": 6,
+    "PTR": 12,
+    "MX": 15,
+    "TXT": 16,
+    "AAAA": 28,
+    "SRV": 33,
+    "SVCB": 64,
+    "HTTPS": 65,
+    "ANY": 255,
+}
+
+# 域名匹配器中的键前缀：".example.com" 形式的后缀，以及版本 2 起的根后缀
+_PREFIX_LABEL = "\r"
+_ROOT_LABEL = "\n"
+_DOMAIN_MATCHER_VERSION = 0
+_IP_SET_VERSION = 1
+
+RuleSet = dict[str, Any]
+
+
+class SRSError(ValueError):
+    """规则集文件格式错误或包含不支持的规则项"""
+
+
+class _Reader:
+    """按顺序读取正文中的各类数据"""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise SRSError("unexpected end of rule-set data")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def read(self, length: int) -> bytes:
+        end = self.pos + length
+        if end > len(self.data):
+            raise SRSError("unexpected end of rule-set data")
+        value = self.data[self.pos : end]
+        self.pos = end
+        return value
+
+    def uvarint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            b = self.byte()
+            value |= (b & 0x7F) << shift
+            if b < 0x80:
+                return value
+            shift += 7
+
+    def strings(self) -> list[str]:
+        return [
+            self.read(self.uvarint()).decode("utf-8") for _ in range(self.uvarint())
+        ]
+
+    def uint16s(self) -> list[int]:
+        count = self.uvarint()
+        raw = self.read(2 * count)
+        return [int.from_bytes(raw[i : i + 2], "big") for i in range(0, len(raw), 2)]
+
+    def uint64s(self) -> list[int]:
+        count = self.uvarint()
+        raw = self.read(8 * count)
+        return [int.from_bytes(raw[i : i + 8], "big") for i in range(0, len(raw), 8)]
+
+
+def _write_uvarint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _write_strings(buf: bytearray, values: Iterable[str]) -> None:
+    values = list(values)
+    _write_uvarint(buf, len(values))
+    for value in values:
+        raw = value.encode("utf-8")
+        _write_uvarint(buf, len(raw))
+        buf += raw
+
+
+def _write_uint16s(buf: bytearray, values: Iterable[int]) -> None:
+    values = list(values)
+    _write_uvarint(buf, len(values))
+    for value in values:
+        buf += value.to_bytes(2, "big")
+
+
+def _write_uint64s(buf: bytearray, values: Iterable[int]) -> None:
+    values = list(values)
+    _write_uvarint(buf, len(values))
+    for value in values:
+        buf += value.to_bytes(8, "big")
+
+
+def _as_list(value: Any) -> list:
+    """规则项既可以是单个值也可以是列表"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
+
+
+# ---------------------------------------------------------------------------
+# 域名匹配器（succinct trie）
+
+
+class _BitSet:
+    """按位置置位的位图，输出为 uint64 字，字数到最后一个置位所在的字为止"""
+
+    __slots__ = ("_bytes", "_last")
+
+    def __init__(self):
+        self._bytes = bytearray()
+        self._last = -1
+
+    def set(self, index: int) -> None:
+        """将 index 位置为 1"""
+        offset = index >> 3
+        if offset >= len(self._bytes):
+            self._bytes.extend(bytes(max(offset + 1 - len(self._bytes), 4096)))
+        self._bytes[offset] |= 1 << (index & 7)
+        if index > self._last:
+            self._last = index
+
+    def words(self) -> list[int]:
+        """以低位在前的 uint64 字输出位图"""
+        if self._last < 0:
+            return []
+        count = (self._last >> 6) + 1
+        data = bytes(self._bytes[: count * 8]).ljust(count * 8, b"\0")
+        return [
+            int.from_bytes(data[i : i + 8], "little") for i in range(0, len(data), 8)
+        ]
+
+
+def _unpack_bits(bitmap: list[int]) -> str:
+    """将 uint64 位图展开为由低位到高位排列的 "0"/"1" 字符串"""
+    return "".join(format(word, "064b")[::-1] for word in bitmap)
+
+
+def _build_succinct_set(keys: list[bytes]) -> tuple[list[int], list[int], bytes]:
+    """
+    按层序构建有序键集合的 succinct trie，返回 (leaves, label_bitmap, labels)
+    同一层节点的深度相同，逐层处理时只需保存当前层各节点覆盖的键区间
+    """
+    if not keys:
+        return [], [1], b""
+    # 叶子节点的编号，以及标签位图中置位（节点结束）的位置
+    leaves = _BitSet()
+    node_ends = _BitSet()
+    labels = bytearray()
+    label_index = 0
+    node = 0
+    col = 0
+    starts = array("L", [0])
+    ends = array("L", [len(keys)])
+    while starts:
+        next_starts = array("L")
+        next_ends = array("L")
+        for start, end in zip(starts, ends):
+            if col == len(keys[start]):
+                # 有键在该节点结束
+                start += 1
+                leaves.set(node)
+            j = start
+            while j < end:
+                first = j
+                label = keys[first][col]
+                while j < end and keys[j][col] == label:
+                    j += 1
+                next_starts.append(first)
+                next_ends.append(j)
+                labels.append(label)
+                label_index += 1
+            node_ends.set(label_index)
+            label_index += 1
+            node += 1
+        starts, ends = next_starts, next_ends
+        col += 1
+    return leaves.words(), node_ends.words(), bytes(labels)
+
+
+def _succinct_keys(leaves: list[int], label_bitmap: list[int], labels: bytes):
+    """按层序遍历 succinct trie，返回全部键，只保留当前层和下一层节点的前缀"""
+    node_count = len(labels) + 1
+    leaf_bits = _unpack_bits(leaves)
+    keys = []
+    # 当前层各节点对应的前缀，第 k 个标签指向第 k + 1 个节点
+    level = [b""]
+    next_level: list[bytes] = []
+    level_start = 0
+    node = 0
+    label_index = 0
+    for bit in _unpack_bits(label_bitmap):
+        if bit == "1":
+            if node < len(leaf_bits) and leaf_bits[node] == "1":
+                keys.append(level[node - level_start])
+            node += 1
+            if node == node_count:
+                break
+            if node - level_start == len(level):
+                if not next_level:
+                    raise SRSError("corrupted domain matcher")
+                level_start = node
+                level, next_level = next_level, []
+        else:
+            if label_index >= len(labels):
+                raise SRSError("corrupted domain matcher")
+            next_level.append(
+                level[node - level_start] + labels[label_index : label_index + 1]
+            )
+            label_index += 1
+    if node < node_count:
+        raise SRSError("corrupted domain matcher")
+    return keys
+
+
+def _domain_matcher_keys(
+    domains: Iterable[str], domain_suffixes: Iterable[str], legacy: bool
+) -> list[bytes]:
+    """
+    生成域名匹配器的键（反序的 UTF-8 字节），legacy 为 True 时使用版本 1 的后缀编码
+    排序后原地去重，不另外保存已出现的规则
+    """
+    keys = []
+    for suffix in domain_suffixes:
+        if not suffix:
+            continue
+        if suffix[0] == ".":
+            keys.append((_PREFIX_LABEL + suffix)[::-1].encode("utf-8"))
+        elif legacy:
+            # 版本 1 中 example.com 后缀编码为完整域名 example.com 加上 .example.com 后缀
+            keys.append(suffix[::-1].encode("utf-8"))
+            keys.append((_PREFIX_LABEL + "." + suffix)[::-1].encode("utf-8"))
+        else:
+            keys.append((_ROOT_LABEL + suffix)[::-1].encode("utf-8"))
+    for domain in domains:
+        if domain:
+            keys.append(domain[::-1].encode("utf-8"))
+
+    keys.sort()
+    # 与后缀规则相同的 domain 已被该后缀覆盖：排序后 example.com 的键
+    # 紧邻其后缀键（末尾多一个根标签）之前
+    root = _ROOT_LABEL.encode("utf-8")
+    unique = 0
+    for key in keys:
+        if unique and key == keys[unique - 1]:
+            continue
+        if unique and key == keys[unique - 1] + root:
+            unique -= 1
+        keys[unique] = key
+        unique += 1
+    del keys[unique:]
+    return keys
+
+
+def _dump_domain_keys(keys: Iterable[bytes]) -> tuple[list[str], list[str]]:
+    """由匹配器的键还原 domain 和 domain_suffix 规则"""
+    domains = set()
+    prefixes = set()
+    suffixes = []
+    for raw in keys:
+        key = raw.decode("utf-8")[::-1]
+        if key.startswith(_PREFIX_LABEL):
+            prefixes.add(key[1:])
+        elif key.startswith(_ROOT_LABEL):
+            suffixes.append(key[1:])
+        else:
+            domains.add(key)
+    for prefix in prefixes:
+        # 版本 1 的后缀规则：example.com 与 .example.com 同时存在
+        if prefix.startswith(".") and prefix[1:] in domains:
+            domains.discard(prefix[1:])
+            suffixes.append(prefix[1:])
+            continue
+        suffixes.append(prefix)
+    return sorted(domains), sorted(suffixes)
+
+
+def _read_domain_matcher(reader: _Reader) -> tuple[list[str], list[str]]:
+    reader.byte()  # 匹配器版本
+    leaves = reader.uint64s()
+    label_bitmap = reader.uint64s()
+    labels = reader.read(reader.uvarint())
+    return _dump_domain_keys(_succinct_keys(leaves, label_bitmap, labels))
+
+
+def _write_domain_matcher(
+    buf: bytearray, domains: Iterable[str], domain_suffixes: Iterable[str], legacy: bool
+) -> None:
+    keys = _domain_matcher_keys(domains, domain_suffixes, legacy)
+    leaves, label_bitmap, labels = _build_succinct_set(keys)
+    buf.append(_DOMAIN_MATCHER_VERSION)
+    _write_uint64s(buf, leaves)
+    _write_uint64s(buf, label_bitmap)
+    _write_uvarint(buf, len(labels))
+    buf += labels
+
+
+# ---------------------------------------------------------------------------
+# IP 网段集合
+
+
+def _read_ip_set(reader: _Reader) -> list[str]:
+    version = reader.byte()
+    if version != _IP_SET_VERSION:
+        raise SRSError(f"unknown IP set version: {version}")
+    count = int.from_bytes(reader.read(8), "big")
+    prefixes = []
+    for _ in range(count):
+        first = ipaddress.ip_address(reader.read(reader.uvarint()))
+        last = ipaddress.ip_address(reader.read(reader.uvarint()))
+        prefixes.extend(
+            str(network) for network in ipaddress.summarize_address_range(first, last)
+        )
+    return prefixes
+
+
+def _write_ip_set(buf: bytearray, cidrs: Iterable[str]) -> None:
+    ranges: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+    for cidr in cidrs:
+        try:
+            network = ipaddress.ip_network(cidr, strict=False)
+        except ValueError as e:
+            raise SRSError(f"invalid IP CIDR: {cidr}") from e
+        ranges[network.version].append(
+            (int(network.network_address), int(network.broadcast_address))
+        )
+
+    # IPv4 区间在前，与 sing-box 中 netipx.IPSet 的顺序一致
+    merged = [(4, r) for r in merge_ranges(ranges[4])]
+    merged += [(6, r) for r in merge_ranges(ranges[6])]
+    buf.append(_IP_SET_VERSION)
+    buf += len(merged).to_bytes(8, "big")
+    for version, (first, last) in merged:
+        size = 4 if version == 4 else 16
+        for value in (first, last):
+            _write_uvarint(buf, size)
+            buf += value.to_bytes(size, "big")
+
+
+# ---------------------------------------------------------------------------
+# 规则
+
+
+def _read_default_rule(reader: _Reader) -> dict[str, Any]:
+    rule: dict[str, Any] = {}
+    while True:
+        item = reader.byte()
+        if item == _ITEM_FINAL:
+            if reader.byte():
+                rule["invert"] = True
+            return rule
+        if item in _STRING_ITEMS:
+            rule[_STRING_ITEMS[item]] = reader.strings()
+        elif item in _UINT16_ITEMS:
+            rule[_UINT16_ITEMS[item]] = reader.uint16s()
+        elif item in _IP_ITEMS:
+            rule[_IP_ITEMS[item]] = _read_ip_set(reader)
+        elif item in _FLAG_ITEMS:
+            rule[_FLAG_ITEMS[item]] = True
+        elif item == _ITEM_DOMAIN:
+            domains, suffixes = _read_domain_matcher(reader)
+            if domains:
+                rule["domain"] = domains
+            if suffixes:
+                rule["domain_suffix"] = suffixes
+        elif item == _ITEM_NETWORK_TYPE:
+            rule["network_type"] = [
+                _NETWORK_TYPES[t] if t < len(_NETWORK_TYPES) else t
+                for t in reader.read(reader.uvarint())
+            ]
+        else:
+            raise SRSError(f"unsupported rule item type: {item}")
+
+
+def _read_rule(reader: _Reader) -> dict[str, Any]:
+    rule_type = reader.byte()
+    if rule_type == 0:
+        return _read_default_rule(reader)
+    if rule_type != 1:
+        raise SRSError(f"unknown rule type: {rule_type}")
+
+    mode = reader.byte()
+    if mode >= len(_LOGICAL_MODES):
+        raise SRSError(f"unknown logical mode: {mode}")
+    rule: dict[str, Any] = {"type": "logical", "mode": _LOGICAL_MODES[mode]}
+    rule["rules"] = [_read_rule(reader) for _ in range(reader.uvarint())]
+    if reader.byte():
+        rule["invert"] = True
+    return rule
+
+
+def _write_default_rule(buf: bytearray, rule: dict[str, Any], version: int) -> None:
+    buf.append(0)
+    for item in _WRITE_ORDER:
+        if item == _ITEM_DOMAIN:
+            domains = _as_list(rule.get("domain"))
+            suffixes = _as_list(rule.get("domain_suffix"))
+            if domains or suffixes:
+                buf.append(item)
+                _write_domain_matcher(
+                    buf, domains, suffixes, legacy=version == SRS_VERSION_1
+                )
+            continue
+
+        if item in _FLAG_ITEMS:
+            if rule.get(_FLAG_ITEMS[item]):
+                if version < SRS_VERSION_3:
+                    raise SRSError(f"{_FLAG_ITEMS[item]} requires version 3")
+                buf.append(item)
+            continue
+
+        if item == _ITEM_NETWORK_TYPE:
+            values = _as_list(rule.get("network_type"))
+            if values:
+                if version < SRS_VERSION_3:
+                    raise SRSError("network_type requires version 3")
+                buf.append(item)
+                _write_uvarint(buf, len(values))
+                buf += bytes(
+                    _NETWORK_TYPES.index(v) if isinstance(v, str) else v for v in values
+                )
+            continue
+
+        key = _STRING_ITEMS.get(item) or _UINT16_ITEMS.get(item) or _IP_ITEMS[item]
+        values = _as_list(rule.get(key))
+        if not values:
+            continue
+        buf.append(item)
+        if item in _STRING_ITEMS:
+            _write_strings(buf, values)
+        elif item in _IP_ITEMS:
+            _write_ip_set(buf, values)
+        elif item == _ITEM_QUERY_TYPE:
+            _write_uint16s(
+                buf, (_QUERY_TYPES[v] if isinstance(v, str) else v for v in values)
+            )
+        else:
+            _write_uint16s(buf, values)
+
+    if rule.get("adguard_domain"):
+        raise SRSError("adguard_domain is not supported")
+    buf.append(_ITEM_FINAL)
+    buf.append(1 if rule.get("invert") else 0)
+
+
+def _write_rule(buf: bytearray, rule: dict[str, Any], version: int) -> None:
+    rule_type = rule.get("type", "default")
+    if rule_type == "default":
+        _write_default_rule(buf, rule, version)
+        return
+    if rule_type != "logical":
+        raise SRSError(f"unknown rule type: {rule_type}")
+
+    buf.append(1)
+    buf.append(_LOGICAL_MODES.index(rule["mode"]))
+    rules = rule.get("rules", [])
+    _write_uvarint(buf, len(rules))
+    for sub_rule in rules:
+        _write_rule(buf, sub_rule, version)
+    buf.append(1 if rule.get("invert") else 0)
+
+
+def decode_srs(data: bytes) -> RuleSet:
+    """将 .srs 文件内容解码为规则集字典 {"version": ..., "rules": [...]}"""
+    if data[:3] != SRS_MAGIC:
+        raise SRSError("invalid rule-set file: bad magic")
+    if len(data) < 4:
+        raise SRSError("invalid rule-set file: missing version")
+    version = data[3]
+    if version > SRS_VERSION_CURRENT:
+        raise SRSError(f"unsupported rule-set version: {version}")
+
+    try:
+        body = zlib.decompress(data[4:])
+    except zlib.error as e:
+        raise SRSError(f"invalid rule-set body: {e}") from e
+
+    reader = _Reader(body)
+    rules = [_read_rule(reader) for _ in range(reader.uvarint())]
+    return {"version": version, "rules": rules}
+
+
+def encode_srs(rule_set: RuleSet) -> bytes:
+    """将规则集字典编码为 .srs 文件内容，版本号取自 rule_set["version"]"""
+    version = rule_set.get("version", SRS_VERSION_CURRENT)
+    if not SRS_VERSION_1 <= version <= SRS_VERSION_CURRENT:
+        raise SRSError(f"unsupported rule-set version: {version}")
+
+    body = bytearray()
+    rules = rule_set.get("rules", [])
+    _write_uvarint(body, len(rules))
+    for rule in rules:
+        _write_rule(body, rule, version)
+    return SRS_MAGIC + bytes([version]) + zlib.compress(bytes(body), 9)
+
+
+def read_srs(path: Union[str, Path]) -> RuleSet:
+    """读取 .srs 文件"""
+    with open(path, "rb") as f:
+        return decode_srs(f.read())
+
+
+def write_srs(path: Union[str, Path], rule_set: RuleSet) -> None:
+    """写入 .srs 文件，先写入临时文件再替换，失败时不留下不完整的文件"""
+    path = Path(path)
+    data = encode_srs(rule_set)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
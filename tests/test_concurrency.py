@@ -0,0 +1,119 @@
+"""自适应并发限制测试"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+import concurrency
+from concurrency import AdaptiveLimiter
+
+
+class AdaptiveLimiterTest(unittest.IsolatedAsyncioTestCase):
+    """AIMD 窗口调整、评估轮次与名额分配"""
+
+    def setUp(self):
+        # 每轮评估的完成数等于当前窗口
+        self.enterContext(mock.patch.object(concurrency, "LIMITER_MIN_EPOCH", 1))
+
+    async def run_epoch(self, limiter, failures=0):
+        """占满窗口后全部归还，前 failures 个请求记为出错"""
+        slots = [await limiter.acquire() for _ in range(limiter.window)]
+        for index, slot in enumerate(slots):
+            if index < failures:
+                slot.error()
+            limiter.release(slot)
+
+    async def test_additive_increase(self):
+        limiter = AdaptiveLimiter("test", 4, max_limit=6)
+        with self.assertLogs(concurrency.logger, "INFO") as logs:
+            await self.run_epoch(limiter)
+        self.assertEqual(limiter.window, 5)
+        self.assertIn("test 并发窗口: 4 -> 5", logs.output[0])
+        for _ in range(3):
+            await self.run_epoch(limiter)
+        # 不超过窗口上限
+        self.assertEqual(limiter.window, 6)
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_unsaturated_window_stays(self):
+        limiter = AdaptiveLimiter("test", 4)
+        for _ in range(20):
+            async with limiter.slot():
+                pass
+        self.assertEqual(limiter.window, 4)
+
+    async def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter("test", 8, min_limit=3)
+        await self.run_epoch(limiter, failures=1)
+        self.assertEqual(limiter.window, 4)
+        await self.run_epoch(limiter, failures=4)
+        # 不低于窗口下限
+        self.assertEqual(limiter.window, 3)
+
+    async def test_error_threshold(self):
+        limiter = AdaptiveLimiter("test", 10, error_threshold=0.2)
+        await self.run_epoch(limiter, failures=2)
+        self.assertEqual(limiter.window, 11)
+        await self.run_epoch(limiter, failures=3)
+        self.assertEqual(limiter.window, 5)
+
+    async def test_stale_slots_after_decrease(self):
+        limiter = AdaptiveLimiter("test", 4)
+        slots = [await limiter.acquire() for _ in range(4)]
+        for slot in slots[:3]:
+            slot.error()
+            limiter.release(slot)
+        stale = await limiter.acquire()
+        slots[3].error()
+        limiter.release(slots[3])
+        self.assertEqual(limiter.window, 2)
+
+        # 缩小窗口前发出的请求不计入下一轮统计
+        stale.error()
+        limiter.release(stale)
+        await self.run_epoch(limiter)
+        self.assertEqual(limiter.window, 3)
+
+    async def test_slot_marks_error_types(self):
+        limiter = AdaptiveLimiter("test", 2)
+        with self.assertRaises(TimeoutError):
+            async with limiter.slot():
+                raise TimeoutError
+        with self.assertRaises(ValueError):
+            async with limiter.slot():
+                raise ValueError
+        # 一轮两个请求中只有超时记为出错
+        self.assertEqual(limiter.window, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_waiters_in_order(self):
+        limiter = AdaptiveLimiter("test", 1, max_limit=1)
+        first = await limiter.acquire()
+        order = []
+
+        async def worker(name):
+            async with limiter.slot():
+                order.append(name)
+
+        tasks = [asyncio.create_task(worker(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        limiter.release(first)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(order, ["a", "c"])
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_divide(self):
+        limiter = AdaptiveLimiter("test", 40)
+        limiter.divide(4)
+        self.assertEqual((limiter.window, limiter.max_limit), (10, 40))
+        limiter.divide(0)
+        self.assertEqual((limiter.window, limiter.max_limit), (10, 40))
+
+        limiter = AdaptiveLimiter("test", 3, min_limit=2, max_limit=5)
+        limiter.divide(4)
+        self.assertEqual((limiter.window, limiter.max_limit), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""DNSResolverPool 对本地桩 DNS 服务器的测试"""
+
+import asyncio
+import socket
+import struct
+import unittest
+import warnings
+
+from dns_resolver import (
+    DNS_MAX_TTL,
+    DNS_MIN_TTL,
+    DNS_NEGATIVE_TTL,
+    DNSCache,
+    DNSResolutionError,
+    DNSResolverPool,
+)
+
+_QTYPES = {1: "A", 28: "AAAA"}
+_RCODE_NXDOMAIN = 3
+_RCODE_SERVFAIL = 2
+
+
+class StubDNSServer(asyncio.DatagramProtocol):
+    """
+    按 (域名, 记录类型) 返回预设应答的 UDP DNS 服务器
+    zones: {域名: {"A": [(地址, TTL), ...], "AAAA": [...]}}，不在其中的域名返回 NXDOMAIN
+    servfail 中的域名返回 SERVFAIL
+    """
+
+    def __init__(self, zones, servfail=()):
+        self.zones = zones
+        self.servfail = set(servfail)
+        self.queries: list[tuple[str, str]] = []
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        qid = struct.unpack(">H", data[:2])[0]
+        offset = 12
+        labels = []
+        while data[offset]:
+            length = data[offset]
+            labels.append(data[offset + 1 : offset + 1 + length].decode("ascii"))
+            offset += length + 1
+        offset += 1
+        qtype = _QTYPES.get(struct.unpack(">H", data[offset : offset + 2])[0])
+        question = data[12 : offset + 4]
+        name = ".".join(labels).lower()
+        self.queries.append((name, qtype))
+
+        answers = []
+        rcode = 0
+        if name in self.servfail:
+            rcode = _RCODE_SERVFAIL
+        elif name not in self.zones:
+            rcode = _RCODE_NXDOMAIN
+        else:
+            for address, ttl in self.zones[name].get(qtype, []):
+                family, rtype = (
+                    (socket.AF_INET6, 28) if qtype == "AAAA" else (socket.AF_INET, 1)
+                )
+                rdata = socket.inet_pton(family, address)
+                answers.append(
+                    b"\xc0\x0c"
+                    + struct.pack(">HHIH", rtype, 1, ttl, len(rdata))
+                    + rdata
+                )
+
+        header = struct.pack(">HHHHHH", qid, 0x8180 | rcode, 1, len(answers), 0, 0)
+        self.transport.sendto(header + question + b"".join(answers), addr)
+
+    def count(self, name, qtype):
+        """服务器收到的 (域名, 记录类型) 查询次数"""
+        return self.queries.count((name, qtype))
+
+
+class RecordingCache(DNSCache):
+    """记录每次写入缓存时使用的 TTL"""
+
+    def __init__(self):
+        super().__init__()
+        self.ttls: dict[tuple[str, str], float] = {}
+
+    def put(self, name, qtype, records, ttl):
+        self.ttls[(name, qtype)] = ttl
+        super().put(name, qtype, records, ttl)
+
+
+class DNSResolverPoolTest(unittest.IsolatedAsyncioTestCase):
+    """通过本地桩 DNS 服务器测试解析、缓存与错误处理"""
+
+    async def asyncSetUp(self):
+        # aiodns 4 起 query() 带有弃用警告
+        self.enterContext(warnings.catch_warnings())
+        warnings.simplefilter("ignore", DeprecationWarning)
+        self.server = StubDNSServer(
+            {
+                "short.test": {"A": [("192.0.2.1", 5)]},
+                "long.test": {"A": [("192.0.2.2", 30 * 24 * 3600)]},
+                "dual.test": {
+                    "A": [("192.0.2.3", 600), ("192.0.2.4", 600)],
+                    "AAAA": [("2001:db8::1", 600)],
+                },
+                "v4only.test": {"A": [("192.0.2.5", 600)]},
+            },
+            servfail={"broken.test"},
+        )
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: self.server, local_addr=("127.0.0.1", 0)
+        )
+        self.addCleanup(transport.close)
+        port = transport.get_extra_info("sockname")[1]
+        self.cache = RecordingCache()
+        self.pool = DNSResolverPool(
+            [f"127.0.0.1:{port}"], cache=self.cache, timeout=1.0
+        )
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_ttl_is_clamped(self):
+        self.assertEqual(await self.pool.query("short.test", "A"), ("192.0.2.1",))
+        self.assertEqual(self.cache.ttls[("short.test", "A")], DNS_MIN_TTL)
+
+        self.assertEqual(await self.pool.query("long.test", "A"), ("192.0.2.2",))
+        self.assertEqual(self.cache.ttls[("long.test", "A")], DNS_MAX_TTL)
+
+        # 缓存有效期内不再查询服务器
+        await self.pool.query("short.test", "A")
+        self.assertEqual(self.server.count("short.test", "A"), 1)
+
+    async def test_negative_answers_are_cached(self):
+        self.assertEqual(await self.pool.query("missing.test", "A"), ())
+        self.assertEqual(self.cache.ttls[("missing.test", "A")], DNS_NEGATIVE_TTL)
+        self.assertEqual(await self.pool.query("missing.test", "A"), ())
+        self.assertEqual(self.server.count("missing.test", "A"), 1)
+
+        # 域名存在但没有该类型记录（NODATA）
+        self.assertEqual(await self.pool.query("v4only.test", "AAAA"), ())
+        self.assertEqual(self.cache.ttls[("v4only.test", "AAAA")], DNS_NEGATIVE_TTL)
+        await self.pool.query("v4only.test", "AAAA")
+        self.assertEqual(self.server.count("v4only.test", "AAAA"), 1)
+
+    async def test_resolve_returns_a_and_aaaa(self):
+        self.assertEqual(
+            await self.pool.resolve("dual.test"),
+            ["192.0.2.3", "192.0.2.4", "2001:db8::1"],
+        )
+        self.assertEqual(await self.pool.resolve("v4only.test"), ["192.0.2.5"])
+        self.assertEqual(await self.pool.resolve("missing.test"), [])
+
+    async def test_server_failure_raises(self):
+        with self.assertRaises(DNSResolutionError):
+            await self.pool.query("broken.test", "A")
+        self.assertNotIn(("broken.test", "A"), self.cache.ttls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""check_domain_geo 的地址选择测试"""
+
+import unittest
+from unittest import mock
+
+import utils
+
+# 模拟的 CN 地址
+CN_IPS = {"192.0.2.1", "2001:db8::1"}
+
+
+def classify(ips):
+    return [ip in CN_IPS for ip in ips]
+
+
+class DomainGeoTest(unittest.IsolatedAsyncioTestCase):
+    """以第一条 A 记录判断，AAAA 记录不影响结果"""
+
+    async def check(self, ips):
+        async def resolve(_domain):
+            return ips
+
+        with (
+            mock.patch.object(utils, "get_ip_from_domain", resolve),
+            mock.patch.object(utils, "get_cn_range_table"),
+            mock.patch.object(utils, "classify_chinese_ips", side_effect=classify),
+        ):
+            return await utils._check_domain_geo("example.cn")  # pylint: disable=W0212
+
+    async def test_first_a_record_decides(self):
+        # 国际 CDN 的境外 AAAA 记录不影响判定
+        self.assertTrue(await self.check(["192.0.2.1", "2001:db8::2"]))
+        self.assertFalse(await self.check(["192.0.2.2", "2001:db8::1"]))
+        self.assertTrue(await self.check(["192.0.2.1", "192.0.2.2"]))
+
+    async def test_ipv6_only(self):
+        self.assertTrue(await self.check(["2001:db8::1"]))
+        self.assertFalse(await self.check(["2001:db8::2"]))
+
+    async def test_no_address(self):
+        self.assertFalse(await self.check([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""domain_regex 的覆盖检查与批量匹配测试"""
+
+import unittest
+from unittest import mock
+
+import domain_regex
+from domain_index import SuffixIndex
+from domain_regex import RegexSet, find_subsumed, literal_tails
+from rule_merge import RuleMerger
+
+# RE2 支持而 Python re 无法解析的写法
+RE2_ONLY = r"^foo\.a\.com\z"
+PATTERNS = [r"^x\.a\.com$", r"(www|img)\.a\.com$", r"\.b\.com$", "cdn", RE2_ONLY]
+
+
+class SubsumedTest(unittest.TestCase):
+    """被 domain_suffix 完全覆盖的正则规则"""
+
+    def test_find_subsumed(self):
+        index = SuffixIndex(["a.com"])
+        self.assertEqual(
+            find_subsumed(PATTERNS, index),
+            [(r"^x\.a\.com$", "a.com"), (r"(www|img)\.a\.com$", "a.com")],
+        )
+
+    def test_unparsable_pattern_is_kept(self):
+        self.assertIsNone(literal_tails(RE2_ONLY))
+        rule = RuleMerger(
+            {"domain_suffix": ["a.com"], "domain_regex": [RE2_ONLY, r"^x\.a\.com$"]}
+        ).to_rule()
+        self.assertEqual(rule["domain_regex"], [RE2_ONLY])
+
+    def test_without_parser_keeps_every_pattern(self):
+        with mock.patch.object(domain_regex, "sre_parse", None):
+            self.assertEqual(find_subsumed(PATTERNS, SuffixIndex(["a.com"])), [])
+
+
+class RegexSetTest(unittest.TestCase):
+    """RegexSet 的匹配结果与逐条搜索一致"""
+
+    DOMAINS = ["x.a.com", "img.a.com", "y.a.com", "s.b.com", "b.com", "cdn.example"]
+
+    def test_search(self):
+        with self.assertLogs(domain_regex.logger, "WARNING") as logs:
+            regex_set = RegexSet(PATTERNS)
+        self.assertIn(repr(RE2_ONLY), logs.output[0])
+        self.assertEqual(regex_set.patterns, PATTERNS[:-1])
+        self.assertEqual(
+            regex_set.filter(self.DOMAINS),
+            ["x.a.com", "img.a.com", "s.b.com", "cdn.example"],
+        )
+        self.assertEqual(regex_set.match("img.a.com"), r"(www|img)\.a\.com$")
+        self.assertIsNone(regex_set.match("y.a.com"))
+
+    def test_without_parser(self):
+        expected = RegexSet(PATTERNS[:-1]).filter(self.DOMAINS)
+        with mock.patch.object(domain_regex, "sre_parse", None):
+            self.assertEqual(RegexSet(PATTERNS[:-1]).filter(self.DOMAINS), expected)
+
+    def test_scoped_flags(self):
+        # 带标志的分组不展开为字面量，尾部只保留其后的部分
+        self.assertEqual(literal_tails(r"(?i:FOO)\.com$"), ({".com"}, False))
+        self.assertIsNone(literal_tails(r"(?i)FOO\.com$"))
+        for pattern in (r"(?i:FOO)\.com$", r"(?i)FOO\.com$"):
+            with self.subTest(pattern):
+                self.assertTrue(RegexSet([pattern]).search("foo.com"))
+        self.assertEqual(literal_tails(r"(?:x|y)\.com$"), ({"x.com", "y.com"}, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""CN 地址区间表测试"""
+
+import ipaddress
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+import geoip_table
+import utils
+from geoip_table import CNRangeTable, load_or_build
+
+CN = {"country": {"iso_code": "CN"}}
+US = {"country": {"iso_code": "US"}}
+
+NETWORKS = [
+    ("1.0.1.0/24", CN),
+    # 与上一网段相邻，合并为一个区间
+    ("1.0.2.0/23", CN),
+    ("1.0.4.0/24", US),
+    ("8.8.8.0/24", None),
+    ("36.0.0.0/8", CN),
+    ("240e::/18", CN),
+    ("2400:cb00::/32", US),
+    ("2408:8000::/20", CN),
+    ("2408:9000::/20", {"continent": {"code": "AS"}}),
+]
+
+EXPECTED = {
+    "1.0.1.0": True,
+    "1.0.3.255": True,
+    "1.0.0.255": False,
+    "1.0.4.1": False,
+    "8.8.8.8": False,
+    "36.255.255.255": True,
+    "37.0.0.0": False,
+    "::ffff:36.1.2.3": True,
+    "::ffff:1.0.4.1": False,
+    "240e:3fff:ffff::1": True,
+    "240e:4000::": False,
+    "2400:cb00::1": False,
+    "2408:8fff::1": True,
+    "2408:9000::1": False,
+    "not an ip": False,
+    "1.2.3.4.5": False,
+}
+
+
+class FakeReader:
+    """替代 maxminddb 读取器，遍历固定的网段，记录遍历次数"""
+
+    iterations = 0
+
+    def __init__(self, build_epoch, networks):
+        self.build_epoch = build_epoch
+        self.networks = networks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def metadata(self):
+        return SimpleNamespace(build_epoch=self.build_epoch)
+
+    def __iter__(self):
+        FakeReader.iterations += 1
+        for network, record in self.networks:
+            yield ipaddress.ip_network(network), record
+
+
+class CNRangeTableTest(unittest.TestCase):
+    """区间表的构建、缓存与批量查询"""
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.db_path = self.dir / "GeoLite2-Country.mmdb"
+        self.db_path.touch()
+        self.cache_path = self.dir / "cn_ranges.bin"
+        self.build_epoch = 1000
+        self.networks = NETWORKS
+        FakeReader.iterations = 0
+        self.enterContext(
+            mock.patch.object(
+                geoip_table.maxminddb,
+                "open_database",
+                lambda *_: FakeReader(self.build_epoch, self.networks),
+            )
+        )
+
+    def check(self, table, expected=None):
+        expected = expected or EXPECTED
+        ips = list(expected)
+        self.assertEqual(table.contains(ips).tolist(), list(expected.values()))
+
+    def test_build(self):
+        table = CNRangeTable.build(self.db_path)
+        self.assertEqual(table.build_epoch, 1000)
+        self.assertEqual((len(table.v4_start), len(table.v6_start)), (2, 2))
+        self.check(table)
+        self.assertEqual(table.contains([]).tolist(), [])
+
+    def test_save_and_load(self):
+        table = CNRangeTable.build(self.db_path)
+        table.save(self.cache_path)
+        self.assertFalse(self.cache_path.with_name("cn_ranges.bin.tmp").exists())
+
+        loaded = CNRangeTable.load(self.cache_path)
+        self.assertEqual(loaded.build_epoch, 1000)
+        for name in ("v4_start", "v4_end", "v6_start", "v6_end"):
+            array = getattr(loaded, name)
+            np.testing.assert_array_equal(array, getattr(table, name))
+            # 直接引用 mmap 的只读内存，不复制
+            self.assertFalse(array.flags.writeable)
+        self.check(loaded)
+
+    def test_load_invalid_file(self):
+        self.cache_path.write_bytes(b"NOTRANGE" + b"\0" * 24)
+        with self.assertRaises(ValueError):
+            CNRangeTable.load(self.cache_path)
+
+    def test_load_or_build_reuses_cache(self):
+        self.check(load_or_build(self.db_path, self.cache_path))
+        self.assertEqual(FakeReader.iterations, 1)
+        self.assertTrue(self.cache_path.exists())
+
+        self.check(load_or_build(self.db_path, self.cache_path))
+        self.assertEqual(FakeReader.iterations, 1)
+
+    def test_load_or_build_rebuilds_on_new_epoch(self):
+        load_or_build(self.db_path, self.cache_path)
+        self.build_epoch = 2000
+        self.networks = [("8.8.8.0/24", CN)]
+        with self.assertLogs(geoip_table.logger, "INFO"):
+            table = load_or_build(self.db_path, self.cache_path)
+        self.assertEqual(FakeReader.iterations, 2)
+        self.assertEqual(table.build_epoch, 2000)
+        self.check(table, {"8.8.8.8": True, "1.0.1.1": False, "240e::1": False})
+        self.assertEqual(CNRangeTable.load(self.cache_path).build_epoch, 2000)
+
+    def test_load_or_build_replaces_corrupt_cache(self):
+        self.cache_path.write_bytes(b"CNRANGE1")
+        with self.assertLogs(geoip_table.logger, "WARNING"):
+            table = load_or_build(self.db_path, self.cache_path)
+        self.assertEqual(FakeReader.iterations, 1)
+        self.check(table)
+
+    def test_classify_chinese_ips(self):
+        with (
+            mock.patch.object(utils, "DB_PATH", self.db_path),
+            mock.patch.object(utils, "CN_RANGE_TABLE_PATH", self.cache_path),
+            mock.patch.object(utils, "_cn_range_table", None),
+        ):
+            ips = list(EXPECTED)
+            self.assertEqual(utils.classify_chinese_ips(ips), list(EXPECTED.values()))
+            self.assertEqual(utils.classify_chinese_ips(ips[:2]), [True, True])
+            self.assertEqual(utils.classify_chinese_ips([]), [])
+            # 区间表只构建一次，之后复用
+            self.assertEqual(FakeReader.iterations, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
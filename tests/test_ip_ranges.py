@@ -0,0 +1,97 @@
+"""IP 地址区间测试"""
+
+import ipaddress
+import random
+import unittest
+
+from ip_ranges import aggregate_cidrs, merge_ranges, range_to_prefixes
+
+
+def reference_aggregate(cidrs):
+    """ipaddress.collapse_addresses 的结果，IPv4 在前"""
+    networks = [ipaddress.ip_network(cidr.strip(), strict=False) for cidr in cidrs]
+    return [
+        str(network)
+        for version in (4, 6)
+        for network in ipaddress.collapse_addresses(
+            n for n in networks if n.version == version
+        )
+    ]
+
+
+def random_cidr(rng, version):
+    """随机网段，地址集中在较小的空间内，且多数带有主机位"""
+    if version == 4:
+        address = ipaddress.IPv4Address(rng.getrandbits(12) << 20 | rng.getrandbits(8))
+        length = rng.randint(0, 32)
+    else:
+        address = ipaddress.IPv6Address(rng.getrandbits(12) << 116 | rng.getrandbits(8))
+        length = rng.randint(0, 128)
+    return f"{address}/{length}"
+
+
+class AggregateTest(unittest.TestCase):
+    """aggregate_cidrs 与 ipaddress.collapse_addresses 的结果一致"""
+
+    def check(self, cidrs):
+        self.assertEqual(aggregate_cidrs(cidrs), reference_aggregate(cidrs), cidrs)
+
+    def test_randomised(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            cidrs = [
+                random_cidr(rng, rng.choice((4, 6))) for _ in range(rng.randint(0, 8))
+            ]
+            self.check(cidrs)
+
+    def test_cases(self):
+        cases = {
+            "whole v4": ["0.0.0.0/0", "1.2.3.0/24"],
+            "whole v6": ["::/0", "240e::/18"],
+            "host bits": ["10.1.2.3/16", "2001:db8::1/32", " 192.0.2.7 "],
+            "adjacent v4": ["1.0.0.0/25", "1.0.0.128/25", "1.0.1.0/24"],
+            "adjacent unaligned": ["1.0.0.128/25", "1.0.1.0/24"],
+            "adjacent v6": ["2001:db8::/33", "2001:db8:8000::/33"],
+            "top of space": ["255.255.255.255/32", "255.255.255.254/32"],
+            "top of v6": ["ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff/128"],
+            "nested": ["10.0.0.0/8", "10.1.0.0/16", "10.0.0.0/8"],
+        }
+        for name, cidrs in cases.items():
+            with self.subTest(name):
+                self.check(cidrs)
+        self.assertEqual(aggregate_cidrs(["0.0.0.0/1", "128.0.0.0/1"]), ["0.0.0.0/0"])
+        self.assertEqual(aggregate_cidrs([]), [])
+
+
+class RangeTest(unittest.TestCase):
+    """整数区间的合并与拆分"""
+
+    def test_merge_ranges(self):
+        self.assertEqual(
+            merge_ranges([(5, 9), (0, 3), (4, 4), (11, 12), (12, 20), (13, 14)]),
+            [(0, 9), (11, 20)],
+        )
+
+    def test_range_to_prefixes(self):
+        rng = random.Random(1)
+        for bits, address_class in (
+            (32, ipaddress.IPv4Address),
+            (128, ipaddress.IPv6Address),
+        ):
+            top = (1 << bits) - 1
+            bounds = [(0, top), (0, 0), (top, top), (1, top - 1)]
+            for _ in range(500):
+                start = rng.getrandbits(bits)
+                bounds.append((start, min(top, start + rng.getrandbits(20))))
+            for start, end in bounds:
+                expected = [
+                    (int(network.network_address), network.prefixlen)
+                    for network in ipaddress.summarize_address_range(
+                        address_class(start), address_class(end)
+                    )
+                ]
+                self.assertEqual(range_to_prefixes(start, end, bits), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""main.build 的失败处理测试"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import build_cache
+import main
+from srs import read_srs, write_srs
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+class BuildTest(unittest.TestCase):
+    """在临时目录中运行 build，上游文件由测试写入"""
+
+    def setUp(self):
+        work_dir = self.enterContext(tempfile.TemporaryDirectory())
+        shutil.copy(REPO_DIR / "rules.json", work_dir)
+        os.makedirs(os.path.join(work_dir, "tmp"))
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        self.addCleanup(os.chdir, cwd)
+        self.enterContext(
+            mock.patch.object(main, "download_inputs", self.download_inputs)
+        )
+
+    @staticmethod
+    def download_inputs():
+        return {main.geosite_cn_url: "0" * 64}
+
+    def cached_builds(self):
+        if not build_cache.BUILD_CACHE_DIR.exists():
+            return []
+        return list(build_cache.BUILD_CACHE_DIR.iterdir())
+
+    def test_missing_input_fails_and_removes_stale_output(self):
+        write_srs(main.GEOSITE_ONE_CN_SRS, {"version": 3, "rules": []})
+        with self.assertRaises(FileNotFoundError):
+            main.build()
+        self.assertFalse(os.path.exists(main.GEOSITE_ONE_CN_SRS))
+        self.assertEqual(self.cached_builds(), [])
+
+    def test_build_stores_merged_output(self):
+        write_srs(
+            main.GEOSITE_CN_SRS,
+            {"version": 3, "rules": [{"domain_suffix": ["example.cn"]}]},
+        )
+        main.build()
+        rule = read_srs(main.GEOSITE_ONE_CN_SRS)["rules"][0]
+        self.assertIn("example.cn", rule["domain_suffix"])
+        self.assertEqual(len(self.cached_builds()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
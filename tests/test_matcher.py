@@ -0,0 +1,175 @@
+"""规则集匹配器测试"""
+
+import contextlib
+import io
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import matcher
+from matcher import RuleSetMatcher, classify_log, iter_batches
+from srs import write_srs
+
+RULES = [
+    {
+        "domain": ["exact.example.com", "Upper.Example.ORG."],
+        "domain_suffix": ["example.cn", ".sub.example.net"],
+        "domain_keyword": ["baidu"],
+        "domain_regex": [r"^cdn\d+\.example\.io$"],
+    },
+    {
+        "ip_cidr": [
+            "1.0.1.0/24",
+            "10.1.2.3/16",
+            "240e::/18",
+            "::ffff:192.0.2.0/120",
+        ]
+    },
+]
+
+
+class ClassifyTest(unittest.TestCase):
+    """classify_many 对各规则类型的分类"""
+
+    def setUp(self):
+        self.matcher = RuleSetMatcher(RULES)
+
+    def check(self, expected):
+        values = list(expected)
+        self.assertEqual(
+            dict(zip(values, self.matcher.classify_many(values))), expected
+        )
+
+    def test_domains(self):
+        self.check(
+            {
+                "exact.example.com": "domain",
+                "www.exact.example.com": None,
+                "upper.example.org": "domain",
+                "example.cn": "domain_suffix",
+                "a.b.example.cn": "domain_suffix",
+                "notexample.cn": None,
+                # .sub.example.net 只匹配子域名
+                "sub.example.net": None,
+                "a.sub.example.net": "domain_suffix",
+                "www.baidu.co": "domain_keyword",
+                "cdn12.example.io": "domain_regex",
+                "cdn.example.io": None,
+                "example.org": None,
+                "": None,
+            }
+        )
+
+    def test_normalisation(self):
+        self.check(
+            {
+                "EXACT.Example.COM.": "domain",
+                "Upper.Example.ORG.": "domain",
+                "  WWW.Example.CN.\n": "domain_suffix",
+                "CDN7.EXAMPLE.IO": "domain_regex",
+            }
+        )
+
+    def test_ips(self):
+        self.check(
+            {
+                "1.0.1.255": "ip_cidr",
+                "1.0.2.0": None,
+                # 10.1.2.3/16 按网段 10.1.0.0/16 处理
+                "10.1.200.1": "ip_cidr",
+                "10.2.0.1": None,
+                "240e:3ff::1": "ip_cidr",
+                "240f::1": None,
+                # IPv4 映射地址按 IPv4 匹配
+                "::ffff:1.0.1.1": "ip_cidr",
+                "::ffff:1.0.2.1": None,
+                "192.0.2.77": "ip_cidr",
+                "::ffff:192.0.2.77": "ip_cidr",
+                "1.2.3.4.5": None,
+            }
+        )
+
+    def test_single_value_helpers(self):
+        self.assertEqual(self.matcher.classify("a.example.cn"), "domain_suffix")
+        self.assertEqual(self.matcher.match_domain("Exact.Example.com."), "domain")
+        self.assertTrue(self.matcher.match_ip("::ffff:1.0.1.1"))
+        self.assertFalse(self.matcher.match_ip("example.cn"))
+
+    def test_unsupported_rules(self):
+        for rule in (
+            {"domain_suffix": ["example.cn"], "port": [443]},
+            {"domain": ["example.cn"], "invert": True},
+            {"type": "logical", "mode": "or", "rules": []},
+        ):
+            with self.subTest(rule=rule):
+                with self.assertRaises(ValueError):
+                    RuleSetMatcher([rule])
+
+    def test_invalid_cidr(self):
+        with self.assertRaises(ValueError):
+            RuleSetMatcher([{"ip_cidr": ["1.2.3.0/33"]}])
+
+
+class LogTest(unittest.TestCase):
+    """日志文件的流式分类与命令行"""
+
+    LOG = (
+        "t1 query exact.example.com\n"
+        "\n"
+        "t2 query WWW.EXAMPLE.CN.\n"
+        "t3 answer 1.0.1.7\n"
+        "short\n"
+        "t4 query unknown.org\n"
+    )
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.log = self.dir / "dns.log"
+        self.log.write_text(self.LOG, encoding="utf-8")
+        self.rule_set = self.dir / "rules.srs"
+        write_srs(self.rule_set, {"version": 3, "rules": RULES})
+
+    def test_iter_batches(self):
+        self.assertEqual(
+            list(iter_batches(self.log, 2, field=2)),
+            [["exact.example.com", "WWW.EXAMPLE.CN."], ["1.0.1.7", "unknown.org"]],
+        )
+        self.assertEqual(
+            list(iter_batches(self.log, 10, field=-1))[0][-2:],
+            ["short", "unknown.org"],
+        )
+        # 不指定列时跳过空行，保留整行
+        lines = [line for batch in iter_batches(self.log, 4) for line in batch]
+        self.assertEqual(len(lines), 5)
+
+    def test_classify_log(self):
+        counts = classify_log(
+            RuleSetMatcher.load(self.rule_set), self.log, batch_size=1, field=2
+        )
+        self.assertEqual(
+            counts,
+            Counter({"domain": 1, "domain_suffix": 1, "ip_cidr": 1, None: 1}),
+        )
+
+    def test_cli(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            matcher.main(
+                [
+                    "classify",
+                    str(self.log),
+                    "--field",
+                    "2",
+                    "--rule-set",
+                    str(self.rule_set),
+                ]
+            )
+            matcher.main(["bench", "--count", "100", "--rule-set", str(self.rule_set)])
+        text = output.getvalue()
+        self.assertIn("总计: 4 行", text)
+        self.assertIn("总计: 100 行", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
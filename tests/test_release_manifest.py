@@ -0,0 +1,148 @@
+"""发布清单的增量比较测试"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import release_manifest
+from release_manifest import build_manifest, diff_models, file_entries, write_manifest
+from rule_model import RuleModel
+from srs import write_srs
+
+OLD_RULE = {
+    "domain": ["a.example.com", "b.example.com", "例子.cn", "a.example.com"],
+    "domain_suffix": ["cn", ".example.org", "example.net"],
+    "domain_keyword": ["old"],
+    "ip_cidr": ["1.0.1.0/24"],
+}
+NEW_RULE = {
+    "domain": ["b.example.com", "c.example.com", "例子.cn", "a.b.example.com"],
+    "domain_suffix": ["cn", "example.org", "example.net"],
+    "domain_keyword": ["old"],
+    "ip_cidr": ["1.0.1.0/24", "1.0.2.0/24"],
+}
+
+
+class DiffModelsTest(unittest.TestCase):
+    """共享标签表时按排序键比较，结果与按字符串比较一致"""
+
+    def expected(self):
+        changes = {}
+        for key in ("domain", "domain_suffix", "ip_cidr"):
+            old, new = set(OLD_RULE[key]), set(NEW_RULE[key])
+            changes[key] = (sorted(new - old), sorted(old - new))
+        return changes
+
+    def check(self, old, new):
+        changes = diff_models(old, new)
+        self.assertEqual(
+            {
+                key: (
+                    sorted(change["added_entries"]),
+                    sorted(change["removed_entries"]),
+                )
+                for key, change in changes.items()
+            },
+            self.expected(),
+        )
+        for change in changes.values():
+            self.assertEqual(change["added"], len(change["added_entries"]))
+            self.assertEqual(change["removed"], len(change["removed_entries"]))
+
+    def test_shared_labels(self):
+        new = RuleModel.from_rule(NEW_RULE)
+        self.check(RuleModel.from_rule(OLD_RULE, new.labels), new)
+
+    def test_separate_labels(self):
+        self.check(RuleModel.from_rule(OLD_RULE), RuleModel.from_rule(NEW_RULE))
+
+    def test_entry_limit(self):
+        new = RuleModel.from_rule({"domain": [f"{i}.example.com" for i in range(10)]})
+        old = RuleModel.from_rule({}, new.labels)
+        with mock.patch.object(release_manifest, "MANIFEST_ENTRY_LIMIT", 3):
+            change = diff_models(old, new)["domain"]
+        self.assertEqual(change["added"], 10)
+        self.assertEqual(len(change["added_entries"]), 3)
+
+
+class BuildManifestTest(unittest.TestCase):
+    """与上一次发布比较，判断是否有变化"""
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.rule_set = self.dir / "geosite-one-cn.srs"
+        write_srs(self.rule_set, {"version": 3, "rules": [NEW_RULE]})
+        # 原样转发的上游规则集
+        self.upstream = self.dir / "geosite-cn.srs"
+        write_srs(self.upstream, {"version": 3, "rules": [OLD_RULE]})
+        self.previous = self.dir / "previous.srs"
+        self.previous_manifest = self.dir / "previous.json"
+
+    def build(self, published=None):
+        def fetch_previous(name):
+            if name == release_manifest.MANIFEST_NAME:
+                if self.previous_manifest.exists():
+                    return self.previous_manifest
+                return None
+            return self.previous
+
+        with mock.patch.object(release_manifest, "fetch_previous", fetch_previous):
+            return build_manifest(self.rule_set, published or [self.rule_set])
+
+    def publish_previous(self, files):
+        """以 files 作为上一次清单的发布文件，规则集与本次相同"""
+        shutil.copyfile(self.rule_set, self.previous)
+        previous = {"version": release_manifest.MANIFEST_VERSION, "files": files}
+        write_manifest(self.previous_manifest, previous)
+        return previous
+
+    def test_same_files_unchanged(self):
+        published = [self.rule_set, self.upstream]
+        previous = self.publish_previous(file_entries(published))
+        # 哈希一致时不读取上一次的规则集
+        self.previous.unlink()
+        manifest, changed = self.build(published)
+        self.assertFalse(changed)
+        self.assertEqual(manifest, previous)
+
+    def test_same_content_unchanged(self):
+        published = [self.rule_set, self.upstream]
+        files = file_entries(published)
+        files[self.rule_set.name]["sha256"] = "0" * 64
+        previous = self.publish_previous(files)
+        manifest, changed = self.build(published)
+        self.assertFalse(changed)
+        self.assertEqual(manifest, previous)
+
+    def test_changed_upstream_file_is_published(self):
+        published = [self.rule_set, self.upstream]
+        files = file_entries(published)
+        files[self.rule_set.name]["sha256"] = "0" * 64
+        files[self.upstream.name]["sha256"] = "0" * 64
+        self.publish_previous(files)
+        manifest, changed = self.build(published)
+        self.assertTrue(changed)
+        # 规则内容没有变化，变化来自其他发布文件
+        self.assertEqual(manifest["changes"], {})
+        self.assertEqual(manifest["files"], file_entries(published))
+
+    def test_changes_against_previous(self):
+        write_srs(self.previous, {"version": 3, "rules": [OLD_RULE]})
+        manifest, changed = self.build()
+        self.assertTrue(changed)
+        self.assertEqual(
+            manifest["changes"]["ip_cidr"]["added_entries"], ["1.0.2.0/24"]
+        )
+
+    def test_unreadable_previous_is_changed(self):
+        self.previous.write_bytes(b"SRS\x03not zlib")
+        manifest, changed = self.build()
+        self.assertTrue(changed)
+        self.assertIsNone(manifest["changes"])
+        self.assertEqual(manifest["counts"], RuleModel.from_rule(NEW_RULE).counts())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""规则合并测试
+
+RuleMerger 在排序后的规则模型上一次扫描完成 domain 和 domain_suffix 的
+去重与覆盖检查，这里与基于 SuffixIndex 哈希集合的直接实现逐项比较。
+"""
+
+import random
+import unittest
+
+from domain_index import SuffixIndex
+from rule_merge import RuleMerger
+
+
+def reference_merge(base, custom):
+    """
+    基于 SuffixIndex 的参考实现，返回
+    (domain_suffix, domain, skipped_suffixes, pruned_domains)
+    上游后缀只去重；自定义后缀按标签数从少到多加入，已被覆盖的跳过
+    """
+    suffixes = list(dict.fromkeys(base.get("domain_suffix", [])))
+    index = SuffixIndex(suffixes)
+    skipped = []
+    for rule in sorted(
+        set(custom.get("domain_suffix", [])), key=lambda x: (x.count("."), x)
+    ):
+        matched = index.match(rule)
+        if matched is not None:
+            skipped.append((rule, matched))
+            continue
+        index.add(rule)
+        suffixes.append(rule)
+
+    domains = set(base.get("domain", [])) | set(custom.get("domain", []))
+    pruned = sorted(d for d in domains if index.covers(d))
+    return (
+        sorted(suffixes),
+        sorted(domains - set(pruned)),
+        sorted(skipped),
+        pruned,
+    )
+
+
+def merge(base, custom):
+    merger = RuleMerger(base)
+    stats = merger.merge(custom)
+    rule = merger.to_rule()
+    return (
+        rule.get("domain_suffix", []),
+        rule.get("domain", []),
+        sorted(stats.skipped_suffixes),
+        stats.pruned_domains,
+    ), stats
+
+
+def random_names(rng, count, dotted):
+    """由少量标签组成的域名，使覆盖、重复和同级冲突大量出现"""
+    names = []
+    for _ in range(count):
+        labels = rng.choices(["a", "b", "c", "ab"], k=rng.randint(0, 3))
+        name = ".".join(labels + [rng.choice(["com", "cn"])])
+        if dotted and rng.random() < 0.3:
+            name = "." + name
+        names.append(name)
+    return names
+
+
+class ResolveDomainsTest(unittest.TestCase):
+    """domain 与 domain_suffix 的去重和覆盖检查"""
+
+    def check(self, base, custom):
+        result, stats = merge(base, custom)
+        expected = reference_merge(base, custom)
+        self.assertEqual(result, expected, (base, custom))
+        self.assertEqual(
+            stats.added["domain_suffix"],
+            len(expected[0]) - len(set(base.get("domain_suffix", []))),
+        )
+
+    def test_randomised_against_suffix_index(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            base = {
+                "domain_suffix": random_names(rng, rng.randint(0, 6), True),
+                "domain": random_names(rng, rng.randint(0, 6), False),
+            }
+            custom = {
+                "domain_suffix": random_names(rng, rng.randint(0, 6), True),
+                "domain": random_names(rng, rng.randint(0, 4), False),
+            }
+            self.check(base, custom)
+
+    def test_skipped_suffixes(self):
+        result, _ = merge(
+            {"domain_suffix": ["example.com", ".example.org"]},
+            {"domain_suffix": ["a.example.com", "example.com", "b.example.org"]},
+        )
+        self.assertEqual(result[0], [".example.org", "example.com"])
+        self.assertEqual(
+            result[2],
+            [
+                ("a.example.com", "example.com"),
+                ("b.example.org", ".example.org"),
+                ("example.com", "example.com"),
+            ],
+        )
+
+    def test_pruned_domains(self):
+        result, _ = merge(
+            {"domain_suffix": [".example.org"], "domain": ["example.org"]},
+            {"domain": ["www.example.org", "example.net"], "domain_suffix": ["net"]},
+        )
+        # .example.org 不覆盖 example.org 本身
+        self.assertEqual(result[1], ["example.org"])
+        self.assertEqual(result[3], ["example.net", "www.example.org"])
+
+    def test_base_duplicates(self):
+        result, stats = merge(
+            {
+                "domain_suffix": ["example.com", "example.com", "a.example.com"],
+                "domain": ["x.cn", "x.cn"],
+            },
+            {"domain_suffix": ["a.example.com"], "domain": ["x.cn"]},
+        )
+        # 上游规则中被覆盖的后缀保留，只去掉重复
+        self.assertEqual(result[0], ["a.example.com", "example.com"])
+        self.assertEqual(result[1], ["x.cn"])
+        self.assertEqual(result[2], [("a.example.com", "a.example.com")])
+        self.assertEqual(stats.added["domain_suffix"], 0)
+
+    def test_same_level_precedence(self):
+        # example.com 与 .example.com 同时存在时 example.com 优先
+        result, _ = merge(
+            {"domain_suffix": [".example.com", "example.com"]},
+            {"domain_suffix": ["www.example.com", ".example.com"]},
+        )
+        self.assertEqual(
+            result[2],
+            [
+                (".example.com", ".example.com"),
+                ("www.example.com", "example.com"),
+            ],
+        )
+        result, _ = merge(
+            {"domain_suffix": ["example.com"]},
+            {"domain_suffix": [".example.com"]},
+        )
+        self.assertEqual(result[2], [(".example.com", "example.com")])
+        # .example.com 不覆盖 example.com 本身
+        result, _ = merge(
+            {"domain_suffix": [".example.com"]},
+            {"domain_suffix": ["example.com"]},
+        )
+        self.assertEqual(result[0], [".example.com", "example.com"])
+        self.assertEqual(result[2], [])
+
+    def test_other_rule_types(self):
+        merger = RuleMerger(
+            {
+                "domain_keyword": ["a"],
+                "domain_regex": [r"^x\.example\.com$", r"^y\.org$"],
+                "ip_cidr": ["1.0.0.0/25"],
+                "query_type": [1],
+            }
+        )
+        stats = merger.merge(
+            {
+                "domain_keyword": ["a", "b"],
+                "domain_suffix": ["example.com"],
+                "ip_cidr": ["1.0.0.128/25"],
+            }
+        )
+        self.assertEqual(
+            merger.to_rule(),
+            {
+                "query_type": [1],
+                "domain_suffix": ["example.com"],
+                "domain_keyword": ["a", "b"],
+                "domain_regex": [r"^y\.org$"],
+                "ip_cidr": ["1.0.0.0/24"],
+            },
+        )
+        self.assertEqual(
+            stats.subsumed_regexes, [(r"^x\.example\.com$", "example.com")]
+        )
+        self.assertEqual(stats.added["domain_keyword"], 1)
+        self.assertEqual(stats.cidrs_before, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""规则模型测试"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from rule_model import MODEL_FILE_HEADER, RuleModel
+
+RULE = {
+    "query_type": [1, "AAAA"],
+    "domain": ["Example.COM.", "a.example.cn"],
+    "domain_suffix": [".sub.example.net", "example.cn"],
+    "domain_keyword": ["baidu"],
+    "domain_regex": [r"^cdn\d+\.example\.io$", "a\tb"],
+    "ip_cidr": ["10.0.0.0/8", "1.0.1.0/24", "240e::/18"],
+    "source_port": 443,
+}
+
+
+class SaveLoadTest(unittest.TestCase):
+    """RuleModel.save / load 往返"""
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.path = self.dir / "model.txt"
+
+    def test_round_trip(self):
+        model = RuleModel.from_rule(RULE)
+        model.save(self.path)
+        self.assertFalse(self.path.with_name("model.txt.tmp").exists())
+
+        loaded = RuleModel.load(self.path)
+        self.assertEqual(loaded.to_rule(), model.to_rule())
+        self.assertEqual(loaded.counts(), model.counts())
+        # ip_cidr 保持原有顺序，其余规则项原样保留
+        self.assertEqual(loaded.ip_cidr, RULE["ip_cidr"])
+        self.assertEqual(loaded.extra, {"query_type": [1, "AAAA"], "source_port": 443})
+        self.assertEqual(loaded.domain_regex, RULE["domain_regex"])
+
+    def test_empty_model(self):
+        RuleModel().save(self.path)
+        self.assertEqual(
+            self.path.read_text(encoding="utf-8"), MODEL_FILE_HEADER + "\n"
+        )
+        self.assertEqual(RuleModel.load(self.path).to_rule(), {})
+
+    def test_invalid_file(self):
+        self.path.write_text("domain\texample.com\n", encoding="utf-8")
+        with self.assertRaises(ValueError):
+            RuleModel.load(self.path)
+        self.path.write_text(MODEL_FILE_HEADER + "\nexample.com\n", encoding="utf-8")
+        with self.assertRaisesRegex(ValueError, ":2: malformed line"):
+            RuleModel.load(self.path)
+        self.path.write_text(MODEL_FILE_HEADER + "\nport\t443\n", encoding="utf-8")
+        with self.assertRaises(KeyError):
+            RuleModel.load(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""规则复查调度与可用性检查测试"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import utils
+from dns_resolver import DNSResolutionError
+from rule_verification import MAX_FAILURE_STREAK, VerificationScheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    """VerificationScheduler 的选择、记录与清理"""
+
+    def setUp(self):
+        self.path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "s.json"
+        self.scheduler = VerificationScheduler(self.path, budget=3)
+
+    def test_select_stalest_first(self):
+        scheduler = self.scheduler
+        for suffix, now in (("a.cn", 300), ("b.cn", 100), ("c.cn", 200)):
+            scheduler.record(suffix, True, now=now)
+        # 从未复查的规则优先，相同时间按名称排序
+        suffixes = ["c.cn", "a.cn", "e.cn", "b.cn", "d.cn"]
+        self.assertEqual(scheduler.select(suffixes), ["d.cn", "e.cn", "b.cn"])
+        self.assertEqual(
+            scheduler.select(suffixes, budget=10),
+            ["d.cn", "e.cn", "b.cn", "c.cn", "a.cn"],
+        )
+        self.assertEqual(scheduler.select(suffixes, budget=0), [])
+
+    def test_failed_rule_stays_stale(self):
+        scheduler = self.scheduler
+        scheduler.record("a.cn", True, now=100)
+        scheduler.record("b.cn", True, now=200)
+        scheduler.record("b.cn", False, now=300)
+        self.assertEqual(scheduler.last_verified("b.cn"), 200)
+        self.assertEqual(scheduler.select(["a.cn", "b.cn"], budget=1), ["a.cn"])
+
+    def test_record_streak(self):
+        scheduler = self.scheduler
+        for _ in range(MAX_FAILURE_STREAK - 1):
+            self.assertFalse(scheduler.record("a.cn", False))
+        self.assertEqual(scheduler.failures("a.cn"), MAX_FAILURE_STREAK - 1)
+
+        # 一次通过即重置连续失败次数
+        self.assertFalse(scheduler.record("a.cn", True, now=100))
+        self.assertEqual(scheduler.failures("a.cn"), 0)
+
+        for _ in range(MAX_FAILURE_STREAK - 1):
+            self.assertFalse(scheduler.record("a.cn", False))
+        self.assertTrue(scheduler.record("a.cn", False))
+        # 删除后状态中不再保留该规则
+        self.assertEqual(len(scheduler), 0)
+
+    def test_inconclusive_leaves_entry_untouched(self):
+        scheduler = self.scheduler
+        scheduler.record("a.cn", True, now=100)
+        scheduler.record("a.cn", False)
+        for _ in range(MAX_FAILURE_STREAK * 2):
+            self.assertFalse(scheduler.record("a.cn", None))
+        self.assertEqual(scheduler.failures("a.cn"), 1)
+        self.assertEqual(scheduler.last_verified("a.cn"), 100)
+        self.assertFalse(scheduler.record("b.cn", None))
+        self.assertEqual(len(scheduler), 1)
+
+    def test_prune_and_persist(self):
+        scheduler = self.scheduler
+        scheduler.record("a.cn", True, now=100)
+        scheduler.record("b.cn", False)
+        scheduler.prune(["b.cn", "c.cn"])
+        self.assertEqual(len(scheduler), 1)
+        self.assertEqual(scheduler.last_verified("a.cn"), 0)
+        scheduler.save()
+
+        loaded = VerificationScheduler.load(self.path)
+        self.assertEqual(loaded.failures("b.cn"), 1)
+        self.assertEqual(len(loaded), 1)
+
+
+class AvailabilityTest(unittest.IsolatedAsyncioTestCase):
+    """check_domain_availability 区分失败与未完成"""
+
+    async def check(self, geo, http, ips=("192.0.2.1",)):
+        async def resolve(_domain):
+            if isinstance(ips, Exception):
+                raise ips
+            return list(ips)
+
+        with (
+            mock.patch.object(utils, "get_ip_from_domain", resolve),
+            mock.patch.object(
+                utils, "check_domain_geo", mock.AsyncMock(return_value=geo)
+            ),
+            mock.patch.object(
+                utils, "check_http_status", mock.AsyncMock(return_value=http)
+            ),
+        ):
+            return await utils.check_domain_availability("example.cn")
+
+    async def test_results(self):
+        self.assertIs(await self.check(True, True), True)
+        self.assertIs(await self.check(True, False), False)
+        self.assertIs(await self.check(False, True), False)
+        self.assertIs(await self.check(True, True, ips=()), False)
+
+    async def test_inconclusive(self):
+        self.assertIsNone(await self.check(True, None))
+        self.assertIsNone(await self.check(None, True))
+        self.assertIsNone(
+            await self.check(True, True, ips=DNSResolutionError("example.cn", "x"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
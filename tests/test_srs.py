@@ -0,0 +1,233 @@
+"""srs.py 编解码测试
+
+tests/data/srs 下的 rules-v<N>.srs 由 sing-box 1.12.12 执行
+sing-box rule-set compile rules-v<N>.json 生成，覆盖全部支持的规则项与逻辑规则。
+"""
+
+import json
+import random
+import unittest
+import zlib
+from pathlib import Path
+
+from srs import (
+    SRS_VERSION_1,
+    SRS_VERSION_2,
+    SRS_VERSION_3,
+    SRSError,
+    decode_srs,
+    encode_srs,
+)
+
+DATA_DIR = Path(__file__).parent / "data" / "srs"
+VERSIONS = (SRS_VERSION_1, SRS_VERSION_2, SRS_VERSION_3)
+
+# 每种规则项一条规范形式的规则（解码结果即为该形式）：
+# 域名排序，IP 网段为合并后的区间且 IPv4 在前，query_type 为数值
+CANONICAL_RULES = {
+    "query_type": {"query_type": [1, 28, 65]},
+    "network": {"network": ["tcp", "udp"]},
+    "domain": {"domain": ["example.com", "www.example.org", "测试.cn"]},
+    "domain_suffix": {"domain_suffix": [".example.edu", "cn", "example.net"]},
+    "domain_keyword": {"domain_keyword": ["google", "baidu"]},
+    "domain_regex": {"domain_regex": [r"^stun\..+", r"\.example\.(com|net)$"]},
+    "source_ip_cidr": {"source_ip_cidr": ["10.0.0.0/8", "fd00::/8"]},
+    "ip_cidr": {
+        "ip_cidr": [
+            "1.0.1.0/24",
+            "1.0.2.0/23",
+            "192.168.0.1/32",
+            "2001:db8::/32",
+            "240e::/18",
+        ]
+    },
+    "source_port": {"source_port": [12345]},
+    "source_port_range": {"source_port_range": ["1000:2000", ":3000"]},
+    "port": {"port": [80, 443]},
+    "port_range": {"port_range": ["8000:9000"]},
+    "process_name": {"process_name": ["curl"]},
+    "process_path": {"process_path": ["/usr/bin/curl"]},
+    "process_path_regex": {"process_path_regex": ["^/usr/bin/.+"]},
+    "package_name": {"package_name": ["com.example.app"]},
+    "wifi_ssid": {"wifi_ssid": ["home"]},
+    "wifi_bssid": {"wifi_bssid": ["00:00:00:00:00:00"]},
+    "invert": {"domain": ["example.com"], "invert": True},
+    "logical": {
+        "type": "logical",
+        "mode": "or",
+        "rules": [
+            {"ip_cidr": ["8.8.8.8/32"]},
+            {
+                "type": "logical",
+                "mode": "and",
+                "rules": [{"network": ["udp"]}, {"port": [53]}],
+                "invert": True,
+            },
+        ],
+        "invert": True,
+    },
+}
+# 版本 3 起支持的规则项
+V3_RULES = {
+    "network_type": {"network_type": ["wifi", "cellular"]},
+    "network_is_expensive": {"network_is_expensive": True},
+    "network_is_constrained": {"network_is_constrained": True},
+}
+
+
+def round_trip(rule_set):
+    return decode_srs(encode_srs(rule_set))
+
+
+def random_domains(rng, count):
+    """生成有大量公共后缀的随机域名，使 trie 有多层分支"""
+    tlds = ["cn", "com", "com.cn", "net", "org"]
+    words = ["a", "ab", "abc", "b", "ba", "cdn", "img", "www", "api", "x-1", "静态"]
+    words += [f"s{i}" for i in range(20)]
+    return {
+        ".".join(rng.choices(words, k=rng.randint(1, 3)) + [rng.choice(tlds)])
+        for _ in range(count)
+    }
+
+
+class RuleTypeRoundTripTest(unittest.TestCase):
+    """decode(encode(x)) == x"""
+
+    def test_each_rule_type(self):
+        for version in VERSIONS:
+            rules = dict(CANONICAL_RULES)
+            if version >= SRS_VERSION_3:
+                rules.update(V3_RULES)
+            for name, rule in rules.items():
+                with self.subTest(version=version, rule=name):
+                    rule_set = {"version": version, "rules": [rule]}
+                    self.assertEqual(round_trip(rule_set), rule_set)
+
+    def test_all_rules_together(self):
+        combined = {}
+        for name, rule in CANONICAL_RULES.items():
+            if name != "logical":
+                combined.update(rule)
+        for version in VERSIONS:
+            with self.subTest(version=version):
+                rule_set = {
+                    "version": version,
+                    "rules": [combined, CANONICAL_RULES["logical"]],
+                }
+                self.assertEqual(round_trip(rule_set), rule_set)
+
+    def test_v3_items_require_v3(self):
+        for version in (SRS_VERSION_1, SRS_VERSION_2):
+            for name, rule in V3_RULES.items():
+                with self.subTest(version=version, rule=name):
+                    with self.assertRaises(SRSError):
+                        encode_srs({"version": version, "rules": [rule]})
+
+    def test_domain_trie(self):
+        rng = random.Random(0)
+        names = sorted(random_domains(rng, 5000))
+        rng.shuffle(names)
+        # domain、example.com 形式后缀与 .example.com 形式后缀互不相同，
+        # 避免 a.com 与 .a.com 同时出现时被解码为后缀 a.com
+        half, three_quarters = len(names) // 2, len(names) * 3 // 4
+        domains = sorted(names[:half])
+        suffixes = sorted(
+            names[half:three_quarters] + ["." + d for d in names[three_quarters:]]
+        )
+        for version in VERSIONS:
+            with self.subTest(version=version):
+                rule_set = {
+                    "version": version,
+                    "rules": [{"domain": domains, "domain_suffix": suffixes}],
+                }
+                self.assertEqual(round_trip(rule_set), rule_set)
+
+    def test_equivalent_domain_rules_collapse(self):
+        for version in VERSIONS:
+            with self.subTest(version=version):
+                # 与后缀规则相同的 domain 已被该后缀覆盖
+                self.assertEqual(
+                    round_trip(
+                        {
+                            "version": version,
+                            "rules": [
+                                {
+                                    "domain": ["a.com", "b.com"],
+                                    "domain_suffix": ["a.com"],
+                                }
+                            ],
+                        }
+                    )["rules"],
+                    [{"domain": ["b.com"], "domain_suffix": ["a.com"]}],
+                )
+                # a.com 加上 .a.com 与后缀 a.com 匹配相同的域名
+                self.assertEqual(
+                    round_trip(
+                        {
+                            "version": version,
+                            "rules": [
+                                {"domain": ["a.com"], "domain_suffix": [".a.com"]}
+                            ],
+                        }
+                    )["rules"],
+                    [{"domain_suffix": ["a.com"]}],
+                )
+
+    def test_ip_cidr_is_merged(self):
+        rule_set = {
+            "version": SRS_VERSION_3,
+            "rules": [
+                {
+                    "ip_cidr": [
+                        "2001:db8::/33",
+                        "1.0.0.0/25",
+                        "1.0.0.128/25",
+                        "1.0.0.7/32",
+                        "2001:db8:8000::/33",
+                        "10.0.0.1",
+                    ]
+                }
+            ],
+        }
+        self.assertEqual(
+            round_trip(rule_set)["rules"][0]["ip_cidr"],
+            ["1.0.0.0/24", "10.0.0.1/32", "2001:db8::/32"],
+        )
+
+
+class SingBoxFixtureTest(unittest.TestCase):
+    """与 sing-box 生成的规则集文件比较"""
+
+    def load(self, version):
+        with open(DATA_DIR / f"rules-v{version}.json", "r", encoding="utf-8") as f:
+            source = json.load(f)
+        data = (DATA_DIR / f"rules-v{version}.srs").read_bytes()
+        return source, data
+
+    def test_decode_matches_source(self):
+        for version in VERSIONS:
+            with self.subTest(version=version):
+                source, data = self.load(version)
+                decoded = decode_srs(data)
+                self.assertEqual(decoded["version"], version)
+                # 解码后的规则与源规则集编码后再解码的结果一致
+                self.assertEqual(decoded, round_trip(source))
+                self.assertEqual(
+                    decoded["rules"][0]["domain_suffix"],
+                    sorted(source["rules"][0]["domain_suffix"]),
+                )
+
+    def test_encode_matches_sing_box(self):
+        for version in VERSIONS:
+            with self.subTest(version=version):
+                source, data = self.load(version)
+                # 压缩参数可能不同，比较解压后的正文
+                for encoded in (encode_srs(source), encode_srs(decode_srs(data))):
+                    self.assertEqual(encoded[:4], data[:4])
+                    self.assertEqual(
+                        zlib.decompress(encoded[4:]), zlib.decompress(data[4:])
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""TLS 握手与 HEAD 探测对本地自签名 TLS 服务器的测试"""
+
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import utils
+
+# 自签名证书（CN=localhost，SAN 包含 localhost 和 127.0.0.1）与私钥
+CERT_FILE = Path(__file__).parent / "data" / "localhost.pem"
+
+
+class StubHTTPSServer:
+    """
+    按路径返回预设状态码的 HTTPS 服务器
+    routes: {路径: (状态码, Location 或 None)}，未列出的路径返回 404
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.paths: list[str] = []
+        self.hosts: list[str] = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(CERT_FILE)
+        self.server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0, ssl=context
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "host":
+                    self.hosts.append(value.strip())
+            if not request_line:
+                return
+            path = request_line.split()[1].decode("ascii")
+            self.paths.append(path)
+            status, location = self.routes.get(path, (404, None))
+            response = f"HTTP/1.1 {status} Stub\r\nContent-Length: 0\r\n"
+            if location:
+                response += f"Location: {location}\r\n"
+            writer.write((response + "Connection: close\r\n\r\n").encode("ascii"))
+            await writer.drain()
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+
+class TLSProbeTest(unittest.IsolatedAsyncioTestCase):
+    """check_tls_handshake 的握手、状态码与重定向处理"""
+
+    async def asyncSetUp(self):
+        self.trusted = ssl.create_default_context(cafile=str(CERT_FILE))
+
+    async def serve(self, routes) -> StubHTTPSServer:
+        """启动一个本地服务器，测试结束时关闭"""
+        server = StubHTTPSServer(routes)
+        await server.start()
+        self.addAsyncCleanup(server.close)
+        return server
+
+    async def probe(self, server, send_head=True, ssl_context=None) -> bool:
+        """以 localhost 作为 SNI 探测本地服务器"""
+        return await utils.check_tls_handshake(
+            "localhost",
+            send_head=send_head,
+            host="127.0.0.1",
+            port=server.port,
+            ssl_context=ssl_context or self.trusted,
+        )
+
+    async def test_handshake(self):
+        server = await self.serve({})
+        self.assertTrue(await self.probe(server, send_head=False))
+        self.assertEqual(server.paths, [])
+
+    async def test_untrusted_certificate_fails(self):
+        server = await self.serve({"/": (200, None)})
+        self.assertFalse(
+            await self.probe(server, ssl_context=ssl.create_default_context())
+        )
+
+    async def test_head_status(self):
+        server = await self.serve({"/": (200, None)})
+        self.assertTrue(await self.probe(server))
+
+        server = await self.serve({"/": (500, None)})
+        self.assertFalse(await self.probe(server))
+
+    async def test_head_follows_redirects(self):
+        server = await self.serve({})
+        server.routes.update(
+            {
+                "/": (301, "/next"),
+                "/next": (302, f"https://localhost:{server.port}/final?a=1"),
+                "/final?a=1": (200, None),
+            }
+        )
+        self.assertTrue(await self.probe(server))
+        self.assertEqual(server.paths, ["/", "/next", "/final?a=1"])
+        # 非 443 端口时 Host 带上端口
+        self.assertEqual(server.hosts, [f"localhost:{server.port}"] * 3)
+
+    async def test_head_redirect_to_error_fails(self):
+        server = await self.serve({"/": (302, "/gone"), "/gone": (500, None)})
+        self.assertFalse(await self.probe(server))
+
+    async def test_head_redirect_loop_fails(self):
+        server = await self.serve({"/": (302, "/")})
+        self.assertFalse(await self.probe(server))
+        self.assertEqual(len(server.paths), utils.HTTP_MAX_REDIRECTS + 1)
+
+    async def test_head_redirect_to_http_fails(self):
+        server = await self.serve({"/": (301, "http://localhost/")})
+        self.assertFalse(await self.probe(server))
+        self.assertEqual(server.paths, ["/"])
+
+    async def test_connections_are_closed(self):
+        server = await self.serve({"/": (301, "/ok"), "/ok": (200, None)})
+        sockets = []
+        open_connection = asyncio.open_connection
+
+        async def recording_open_connection(*args, **kwargs):
+            reader, writer = await open_connection(*args, **kwargs)
+            sockets.append(writer.get_extra_info("socket"))
+            return reader, writer
+
+        with mock.patch.object(
+            utils.asyncio, "open_connection", recording_open_connection
+        ):
+            self.assertTrue(await self.probe(server))
+            self.assertTrue(await self.probe(server, send_head=False))
+        # 探测返回时每个连接都已完成关闭
+        self.assertEqual(len(sockets), 3)
+        self.assertEqual([sock.fileno() for sock in sockets], [-1, -1, -1])
+
+
+class InconclusiveProbeTest(unittest.IsolatedAsyncioTestCase):
+    """探测超时时返回 None，check_domain 将结果标记为未完成"""
+
+    async def test_handshake_timeout_is_inconclusive(self):
+        async def silent(reader, writer):
+            await reader.read()
+            writer.close()
+
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+
+        with mock.patch.object(utils, "HTTP_PROBE_TIMEOUT", 0.2):
+            result = await utils.check_tls_handshake(
+                "localhost", send_head=True, host="127.0.0.1", port=port
+            )
+        self.assertIsNone(result)
+
+    async def test_check_domain_marks_inconclusive(self):
+        async def resolve(_domain):
+            return ["192.0.2.1"]
+
+        for http_result, is_chinese, conclusive in (
+            (True, True, True),
+            (False, False, True),
+            (None, False, False),
+        ):
+            with (
+                mock.patch.object(utils, "get_ip_from_domain", resolve),
+                mock.patch.object(
+                    utils, "check_domain_geo", mock.AsyncMock(return_value=True)
+                ),
+                mock.patch.object(
+                    utils,
+                    "check_http_status",
+                    mock.AsyncMock(return_value=http_result),
+                ),
+                mock.patch.object(utils, "get_ips_country", return_value="CN"),
+            ):
+                data = await utils.check_domain("example.cn")
+            self.assertEqual(data["is_chinese_ip"], is_chinese)
+            self.assertEqual(data["conclusive"], conclusive)
+
+
+class ProbeModeTest(unittest.TestCase):
+    """PROBE_MODE 环境变量的校验"""
+
+    def test_invalid_probe_mode_is_rejected(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import utils"],
+            cwd=Path(__file__).parent.parent,
+            env={**os.environ, "PROBE_MODE": "haed"},
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Unsupported probe mode: haed", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
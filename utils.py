@@ -1,22 +1,73 @@
 """Utility functions for IP address handling and GeoLite2 database management."""
 
+import asyncio
+import atexit
+import contextlib
 import logging
 import os
-import random
+import ssl
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
+from urllib.parse import urljoin, urlsplit
 
-import aiodns
 import aiohttp
 import geoip2.database
+import geoip2.errors
+from geoip2.database import MODE_MMAP
 from urllib3 import Retry
 
+from concurrency import AdaptiveLimiter
+from dns_resolver import DNSResolutionError, DNSResolverPool
+from geoip_table import CNRangeTable, load_or_build
+from probe_memo import ProbeMemo
+from public_suffix import get_main_domain
+
 logger = logging.getLogger(__name__)
 
 GEOLITE2_URL = "http://geolite2-mirror.nesnode.com/GeoLite2-Country.mmdb"
 DB_PATH = Path(__file__).parent / "data" / "GeoLite2-Country.mmdb"
 LAST_UPDATE_FILE = Path(__file__).parent / "data" / ".last_update"
+CN_RANGE_TABLE_PATH = Path(__file__).parent / "data" / "GeoLite2-Country.cn-ranges.bin"
+
+# IP -> 国家代码缓存的最大条目数，CDN 会为大量域名返回相同的地址
+IP_COUNTRY_CACHE_SIZE = 1 << 18
+
+# HTTP 探测连接池的总连接数和单个主机的连接数上限
+HTTP_CONNECTION_LIMIT = 200
+HTTP_CONNECTION_LIMIT_PER_HOST = 4
+# HTTP 探测连接池内置 DNS 缓存的有效期，单位秒
+HTTP_DNS_CACHE_TTL = 300
+# 如果 2 秒内都无法连接，可以认为此网站的提供者没有服务用户的诚意。
+HTTP_PROBE_TIMEOUT = 2
+HTTP_SUCCESS_STATUSES = {200, 403, 404}
+HTTP_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+HTTPS_PORT = 443
+# HEAD 探测最多跟随的重定向次数，以及每个应答最多读取的头部行数
+HTTP_MAX_REDIRECTS = 5
+HTTP_MAX_HEADERS = 100
+
+# DNS 查询和 HTTP 探测并发窗口的初始值和上限，运行中按超时率自适应调整
+DNS_CONCURRENCY_INITIAL = 100
+DNS_CONCURRENCY_MAX = 500
+HTTP_CONCURRENCY_INITIAL = 50
+HTTP_CONCURRENCY_MAX = HTTP_CONNECTION_LIMIT
+
+# HTTP 探测模式，通过环境变量 PROBE_MODE 或 set_probe_mode 按次运行选择：
+# - get: 发送完整的 HTTPS GET 请求并检查状态码
+# - tls: 只连接 443 端口并以正确的 SNI 完成 TLS 握手
+# - head: 完成 TLS 握手后在同一连接上发送 HEAD 请求并检查状态码，跟随重定向
+PROBE_MODES = ("get", "tls", "head")
+PROBE_MODE = os.getenv("PROBE_MODE", "get")
+if PROBE_MODE not in PROBE_MODES:
+    raise ValueError(f"Unsupported probe mode: {PROBE_MODE}")
+
+# pylint: disable=invalid-name
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_geoip_reader: Optional[geoip2.database.Reader] = None
+_cn_range_table: Optional[CNRangeTable] = None
 
 
 async def download_geolite2_db():
@@ -27,12 +78,21 @@ async def download_geolite2_db():
         async with aiohttp.ClientSession() as session:
             async with session.get(GEOLITE2_URL) as response:
                 if response.status == 200:
-                    with open(DB_PATH, "wb") as f:
-                        while True:
-                            chunk = await response.content.read(8192)
-                            if not chunk:
-                                break
-                            f.write(chunk)
+                    # 先写入临时文件，下载期间读取器仍使用完整的旧数据库
+                    tmp_path = DB_PATH.with_name(DB_PATH.name + ".part")
+                    try:
+                        with open(tmp_path, "wb") as f:
+                            while True:
+                                chunk = await response.content.read(8192)
+                                if not chunk:
+                                    break
+                                f.write(chunk)
+                    except BaseException:
+                        tmp_path.unlink(missing_ok=True)
+                        raise
+                    # 替换数据库文件前关闭共享的 mmap 读取器，下次调用时打开新文件
+                    close_geoip_reader()
+                    os.replace(tmp_path, DB_PATH)
                     with open(LAST_UPDATE_FILE, "w", encoding="utf-8") as f:
                         f.write(str(int(time.time())))
                     logger.info("GeoLite2 database download completed")
@@ -66,89 +126,283 @@ def needs_update():
 
 dns_server_list = ["223.5.5.5", "119.29.29.29"]
 
+# 进程内共享的 DNS 解析器池，每个 DNS 服务器一个长期解析器
+dns_pool = DNSResolverPool(dns_server_list)
+
+# DNS 查询的自适应并发限制，解析失败（超时、服务器拒绝）视为过载信号
+dns_limiter = AdaptiveLimiter(
+    "DNS",
+    DNS_CONCURRENCY_INITIAL,
+    max_limit=DNS_CONCURRENCY_MAX,
+    error_types=(DNSResolutionError, TimeoutError),
+)
+
+# HTTP 探测的自适应并发限制，探测超时视为过载信号
+http_limiter = AdaptiveLimiter(
+    "HTTP", HTTP_CONCURRENCY_INITIAL, max_limit=HTTP_CONCURRENCY_MAX
+)
+
+# 本次运行内的探测结果备忘，utils.py 和 helper.py 的所有入口共用
+probe_memo = ProbeMemo()
+
 
-async def get_ip_from_domain(domain: str) -> str:
+async def get_ip_from_domain(domain: str) -> list[str]:
     """
-    异步获取域名的 IP 地址
+    异步获取域名的全部 IP 地址（A 和 AAAA 记录）
+    域名不存在时返回空列表，解析失败时抛出 DNSResolutionError
     """
+    return await probe_memo.get_or_compute("dns", domain, lambda: _resolve(domain))
+
+
+async def _resolve(domain: str) -> list[str]:
     try:
-        dns_server = random.choice(dns_server_list)
-        resolver = aiodns.DNSResolver()
-        resolver.nameservers = [dns_server]
-        result = await resolver.query(domain, "A")
-        ip = result[0].host
-        return f"{ip}"
-    except Exception as e:
-        logger.error(
-            "Error resolving domain %s: %s from dns server: %s",
-            domain,
-            str(e),
-            dns_server,
-        )
-        os.system(
-            f"echo 'Error resolving domain {domain}: {str(e)}:{dns_server}' >> error.log"
-        )
-        return "172.217.12.132"
+        async with dns_limiter.slot():
+            return await dns_pool.resolve(domain)
+    except DNSResolutionError as e:
+        logger.error("Error resolving domain %s: %s", domain, str(e))
+        with open("error.log", "a", encoding="utf-8") as f:
+            f.write(f"Error resolving domain {domain}: {str(e)}\n")
+        raise
 
 
 async def check_domain(domain: str):
-    """检查域名是否为中国大陆域名"""
+    """
+    检查域名是否为中国大陆域名，解析失败时抛出 DNSResolutionError
+    探测超时等临时故障导致无法判定时，结果中的 conclusive 为 False
+    """
+
+    ips = await get_ip_from_domain(domain)
+    if not ips:
+        return {
+            "domain": domain,
+            "ip": None,
+            "ips": ips,
+            "country": None,
+            "is_chinese_ip": False,
+            "conclusive": True,
+        }
+
+    # 任一步骤返回 None 表示探测未完成
+    is_chinese = await check_domain_geo(domain) and await check_cn_domain_http(domain)
+    return {
+        "domain": domain,
+        "ip": ips[0],
+        "ips": ips,
+        "country": get_ips_country(ips),
+        "is_chinese_ip": bool(is_chinese),
+        "conclusive": is_chinese is not None,
+    }
+
+
+def get_geoip_reader() -> geoip2.database.Reader:
+    """获取进程内共享的 GeoLite2 数据库读取器，首次调用时以 mmap 模式打开"""
+    # pylint: disable=W0603
+    global _geoip_reader
+    if _geoip_reader is None:
+        if not DB_PATH.exists():
+            logger.error("GeoLite2 database file does not exist")
+            raise FileNotFoundError("GeoLite2 database file does not exist")
+        _geoip_reader = geoip2.database.Reader(DB_PATH, mode=MODE_MMAP)
+    return _geoip_reader
+
+
+def close_geoip_reader():
+    """关闭共享的 GeoLite2 数据库读取器，并清空 IP 国家代码缓存和 CN 区间表"""
+    # pylint: disable=W0603
+    global _geoip_reader, _cn_range_table
+    if _geoip_reader is not None:
+        _geoip_reader.close()
+        _geoip_reader = None
+    _cn_range_table = None
+    get_ip_country.cache_clear()
+
+
+atexit.register(close_geoip_reader)
+
+
+@lru_cache(maxsize=IP_COUNTRY_CACHE_SIZE)
+def get_ip_country(ip: str) -> Optional[str]:
+    """查询 IP 地址所属国家的 ISO 代码，数据库中没有记录时返回 None"""
+    try:
+        response = get_geoip_reader().country(ip)
+    except geoip2.errors.AddressNotFoundError:
+        return None
+    return response.country.iso_code
+
+
+def get_ips_country(ips: Sequence[str]) -> Optional[str]:
+    """返回一组 IP 地址所属国家的 ISO 代码，多个国家时以逗号连接"""
+    countries = set()
+    for ip in ips:
+        try:
+            countries.add(get_ip_country(ip) or "")
+        except ValueError:
+            continue
+    return ",".join(sorted(c for c in countries if c)) or None
+
+
+def get_cn_range_table() -> CNRangeTable:
+    """获取 CN 地址区间表，数据库更新后首次调用时重新生成缓存文件"""
+    # pylint: disable=W0603
+    global _cn_range_table
+    if _cn_range_table is None:
+        if not DB_PATH.exists():
+            logger.error("GeoLite2 database file does not exist")
+            raise FileNotFoundError("GeoLite2 database file does not exist")
+        _cn_range_table = load_or_build(DB_PATH, CN_RANGE_TABLE_PATH)
+    return _cn_range_table
 
-    ip = await get_ip_from_domain(domain)
-    if not ip:
-        return {"domain": domain, "ip": ip, "is_chinese_ip": False}
 
-    is_chinese = await is_chinese_ip(ip, domain)
-    return {"domain": domain, "ip": ip, "is_chinese_ip": is_chinese}
+def classify_chinese_ips(ips: Sequence[str]) -> list[bool]:
+    """批量判断 IP 地址的地理位置是否在中国"""
+    if not ips:
+        return []
+    return get_cn_range_table().contains(ips).tolist()
 
 
 async def is_chinese_ip(ip: str, domain: Optional[str] = None) -> bool:
     """异步检查 IP 地址是否来自中国"""
-    if not DB_PATH.exists():
-        logger.error("GeoLite2 database file does not exist")
-        raise FileNotFoundError("GeoLite2 database file does not exist")
+    # 数据库文件不存在时直接抛出异常
+    get_geoip_reader()
 
     try:
-        with geoip2.database.Reader(DB_PATH) as reader:
-            response = reader.country(ip)
-            is_cn_res = response.country.iso_code == "CN"
-            logger.info("IP %s is %s China", ip, "from" if is_cn_res else "not from")
-            if not is_cn_res:
-                # 如果 IP 不在中国，则直接返回 False
-                return False
-
-            # 如果 IP 在中国，则检查域名的HTTP状态码
-            if domain:
-                http_available = await check_http_status(domain)
-                if http_available:
-                    logger.info("Domain %s returned HTTPS 200", domain)
-                    return True
-                else:
-                    # 如果HTTPS不返回200，则返回 False
-                    logger.info("Domain %s does not return HTTPS 200", domain)
-                    return False
-            else:
-                # 如果没有提供域名，只能返回IP地理位置的结果
-                return True
+        is_cn_res = get_ip_country(ip) == "CN"
+        logger.info("IP %s is %s China", ip, "from" if is_cn_res else "not from")
+        if not is_cn_res:
+            # 如果 IP 不在中国，则直接返回 False
+            return False
+
+        return bool(await check_cn_domain_http(domain))
 
     except Exception as e:  # pylint: disable=broad-except
         logger.error("Error checking IP %s: %s", ip, str(e))
         return False
 
 
-async def check_http_status(domain: str) -> bool:
-    """异步检查域名的HTTPS状态码，返回200,或重定向到200则返回True"""
+async def check_domain_geo(domain: str) -> Optional[bool]:
+    """
+    检查域名的第一条 A 记录是否来自中国（没有 A 记录时取第一条 AAAA 记录），
+    解析失败时抛出 DNSResolutionError，查询 GeoIP 数据出错时返回 None
+    国内域名经国际 CDN 加速时 AAAA 记录常指向境外节点，因此不以全部地址判断
+    """
+    return await probe_memo.get_or_compute(
+        "geo", domain, lambda: _check_domain_geo(domain)
+    )
+
+
+async def _check_domain_geo(domain: str) -> Optional[bool]:
+    ips = await get_ip_from_domain(domain)
+    if not ips:
+        return False
+    # 数据库文件不存在时直接抛出异常
+    get_cn_range_table()
+
+    ip = next((ip for ip in ips if ":" not in ip), ips[0])
+    try:
+        is_cn_res = classify_chinese_ips([ip])[0]
+        logger.info("IP %s is %s China", ip, "from" if is_cn_res else "not from")
+        return is_cn_res
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Error checking IP %s: %s", ip, str(e))
+        return None
+
+
+async def check_cn_domain_http(domain: Optional[str]) -> Optional[bool]:
+    """IP 位于中国时，进一步检查域名的 HTTP 状态码，探测超时时返回 None"""
+    if domain:
+        http_available = await check_http_status(domain)
+        if http_available:
+            logger.info("Domain %s returned HTTPS 200", domain)
+            return True
+        elif http_available is None:
+            logger.info("Domain %s HTTPS probe did not complete", domain)
+            return None
+        else:
+            # 如果HTTPS不返回200，则返回 False
+            logger.info("Domain %s does not return HTTPS 200", domain)
+            return False
+    else:
+        # 如果没有提供域名，只能返回IP地理位置的结果
+        return True
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    获取本次运行共享的 HTTP 探测会话
+    所有探测共用一个连接池，复用 TCP/TLS 连接和 DNS 缓存
+    """
+    # pylint: disable=W0603
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_PROBE_TIMEOUT),
+        )
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_probe_clients():
+    """关闭本次运行共享的 HTTP 探测会话和 DNS 解析器"""
+    # pylint: disable=W0603
+    global _http_session, _http_session_loop
+    if _http_session is not None:
+        if not _http_session.closed:
+            await _http_session.close()
+        _http_session = None
+        _http_session_loop = None
+    await dns_pool.close()
+
+
+def set_probe_mode(mode: str) -> None:
+    """设置本次运行的 HTTP 探测模式"""
+    # pylint: disable=W0603
+    global PROBE_MODE
+    if mode not in PROBE_MODES:
+        raise ValueError(f"Unsupported probe mode: {mode}")
+    PROBE_MODE = mode
+
+
+async def check_http_status(domain: str) -> Optional[bool]:
+    """
+    按本次运行的探测模式检查域名的 HTTPS 可用性，每个域名每次运行只探测一次
+    探测因超时或解析失败未能完成时返回 None
+    """
+    return await probe_memo.get_or_compute(
+        "http", domain, lambda: _check_http_status(domain)
+    )
+
+
+async def _check_http_status(domain: str) -> Optional[bool]:
+    if PROBE_MODE == "tls":
+        return await check_tls_handshake(domain)
+    if PROBE_MODE == "head":
+        return await check_tls_handshake(domain, send_head=True)
+    return await check_https_get(domain)
+
+
+async def check_https_get(domain: str) -> Optional[bool]:
+    """
+    异步检查域名的HTTPS状态码，返回200,或重定向到200则返回True
+    请求超时时返回 None
+    """
     url = f"https://{domain}"
-    success_statuses = [200, 403, 404]
+    success_statuses = HTTP_SUCCESS_STATUSES
+    session = get_http_session()
 
-    # 如果 2 秒内都无法连接，可以认为此网站的提供者没有服务用户的诚意。
-    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2)) as session:
+    async with http_limiter.slot() as slot:
         try:
             async with session.get(url) as response:
                 if response.status in success_statuses:
                     logger.info("URL %s returned status 200", url)
                     return True
-                elif response.status in {301, 302, 303, 307, 308}:
+                elif response.status in HTTP_REDIRECT_STATUSES:
                     logger.info(
                         "URL %s returned redirect status %d", url, response.status
                     )
@@ -170,48 +424,176 @@ async def check_http_status(domain: str) -> bool:
                 else:
                     logger.info("URL %s returned status %d", url, response.status)
         except Exception as e:
+            if isinstance(e, TimeoutError):
+                slot.error()
             logger.info("Error checking URL %s: %s", url, str(e))
+            if _is_transient(e):
+                return None
 
     logger.info("No successful HTTPS connections for domain %s", domain)
     return False
 
 
-def get_main_domain(domain: str) -> str:
+async def check_tls_handshake(
+    domain: str,
+    send_head: bool = False,
+    host: Optional[str] = None,
+    port: int = HTTPS_PORT,
+    ssl_context: Optional[ssl.SSLContext] = None,
+) -> Optional[bool]:
     """
-    提取主域名
+    只连接 443 端口并以域名作为 SNI 完成 TLS 握手（证书需校验通过）
+    send_head 为 True 时，在同一连接上发送 HEAD 请求，返回成功状态码才视为可用；
+    与 GET 模式一样跟随重定向（最多 HTTP_MAX_REDIRECTS 次），每一跳重新完成握手，
+    重定向到非 HTTPS 地址时视为不可用
+    host 为 None 时，使用共享 DNS 解析器（通常命中缓存）解析出的第一个地址
+    超时或解析失败导致探测未完成时返回 None
     """
+    async with http_limiter.slot() as slot:
+        try:
+            if not send_head:
+                await _tls_request(domain, host, port, ssl_context)
+                logger.info("TLS handshake with %s succeeded", domain)
+                return True
+
+            path = "/"
+            for _ in range(HTTP_MAX_REDIRECTS + 1):
+                status, location = await _tls_request(
+                    domain, host, port, ssl_context, path
+                )
+                logger.info(
+                    "HEAD https://%s:%d%s returned status %s",
+                    domain,
+                    port,
+                    path,
+                    status,
+                )
+                if status in HTTP_SUCCESS_STATUSES:
+                    return True
+                if status not in HTTP_REDIRECT_STATUSES or not location:
+                    return False
+
+                target = urlsplit(urljoin(f"https://{domain}:{port}{path}", location))
+                if target.scheme != "https" or not target.hostname:
+                    logger.info("HEAD https://%s redirected to %s", domain, location)
+                    return False
+                if target.hostname != domain:
+                    # 重定向到其他域名时重新解析地址
+                    domain, host = target.hostname, None
+                port = target.port or HTTPS_PORT
+                path = (target.path or "/") + (
+                    f"?{target.query}" if target.query else ""
+                )
+            logger.info(
+                "HEAD https://%s exceeded %d redirects", domain, HTTP_MAX_REDIRECTS
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            if isinstance(e, TimeoutError):
+                slot.error()
+            logger.info("TLS probe of %s failed: %s", domain, str(e))
+            if _is_transient(e):
+                return None
 
-    domain_parts = domain.split(".")
-    if len(domain_parts) > 2:
-        return ".".join(domain_parts[-2:])
-    return domain
+    return False
+
+
+def _is_transient(error: BaseException) -> bool:
+    """超时和 DNS 解析失败属于临时故障，不能作为域名的判定结果"""
+    return isinstance(error, (TimeoutError, DNSResolutionError))
 
 
-async def check_domain_availability(url: str) -> bool:
+async def _tls_request(
+    domain: str,
+    host: Optional[str],
+    port: int,
+    ssl_context: Optional[ssl.SSLContext],
+    path: Optional[str] = None,
+) -> tuple[Optional[int], Optional[str]]:
+    """
+    以域名作为 SNI 完成 TLS 握手，path 不为 None 时再发送 HEAD 请求
+    返回 (状态码, Location)，只握手时均为 None；无法解析地址时抛出 OSError
+    """
+    async with asyncio.timeout(HTTP_PROBE_TIMEOUT):
+        if host is None:
+            ips = await get_ip_from_domain(domain)
+            if not ips:
+                raise OSError(f"Domain {domain} has no address to probe")
+            host = ips[0]
+        reader, writer = await asyncio.open_connection(
+            host,
+            port,
+            ssl=ssl_context or _get_ssl_context(),
+            server_hostname=domain,
+            ssl_shutdown_timeout=HTTP_PROBE_TIMEOUT,
+        )
+
+    try:
+        if path is None:
+            return None, None
+        # 非默认端口时 Host 需要带上端口
+        authority = domain if port == HTTPS_PORT else f"{domain}:{port}"
+        async with asyncio.timeout(HTTP_PROBE_TIMEOUT):
+            writer.write(
+                (
+                    f"HEAD {path} HTTP/1.1\r\nHost: {authority}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("ascii")
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            location = None
+            for _ in range(HTTP_MAX_HEADERS):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "location":
+                    location = value.strip()
+    finally:
+        # 等待连接关闭，避免遗留未关闭的传输；TLS 关闭握手受 ssl_shutdown_timeout 限制
+        writer.close()
+        with contextlib.suppress(Exception):
+            await writer.wait_closed()
+
+    parts = status_line.split()
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    return status, location
+
+
+@lru_cache(maxsize=1)
+def _get_ssl_context() -> ssl.SSLContext:
+    """TLS 探测共用的 SSL 上下文"""
+    return ssl.create_default_context()
+
+
+async def check_domain_availability(url: str) -> Optional[bool]:
     """
     检查主域名是否可用
     Args:
         url: 完整的URL或域名
     Returns:
-        bool: 如果域名可访问则返回True，否则返回False
+        Optional[bool]: 如果域名可访问则返回True，否则返回False；
+        没有可用的域名且有探测因超时或解析失败未完成时返回None
     """
     try:
         # 提取主域名
         main_domain = get_main_domain(url)
         domains_to_check = [main_domain, f"www.{main_domain}"]
+        inconclusive = False
 
         for domain in domains_to_check:
             try:
                 # 解析域名
-                ip = await get_ip_from_domain(domain)
-                if not ip:
+                ips = await get_ip_from_domain(domain)
+                if not ips:
                     logger.warning("Failed to resolve domain %s", domain)
                     continue
 
-                if ip == "172.217.12.132":
+                is_chinese = await check_domain_geo(domain)
+                if is_chinese is None:
+                    inconclusive = True
                     continue
-
-                if not (await is_chinese_ip(ip, domain)):
+                if not is_chinese:
                     logger.info("Domain %s is not a Chinese IP", domain)
                     continue
 
@@ -221,11 +603,18 @@ async def check_domain_availability(url: str) -> bool:
                 if http_available:
                     logger.info("Domain %s is available", domain)
                     return True
+                if http_available is None:
+                    inconclusive = True
 
             except Exception as e:
                 logger.error("Error checking domain %s: %s", domain, str(e))
+                if _is_transient(e):
+                    inconclusive = True
                 continue
 
+        if inconclusive:
+            logger.info("Availability check for %s did not complete", url)
+            return None
         logger.info("No available domains found for %s", url)
         return False
 
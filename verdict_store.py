@@ -0,0 +1,264 @@
+"""持久化的域名判定缓存
+
+将域名的判定结果（是否为中国域名、解析出的 IP、所属国家、检查时间）
+保存在 data/ 目录下的 SQLite 数据库中（WAL 模式），跨多次运行复用。
+肯定和否定结果分别使用不同的有效期，写入按批次在单个事务中提交。
+
+多进程运行时，每个进程写入各自的数据库，并以只读方式附加共享的基础数据库
+用于查询；全部进程结束后由父进程通过 merge() 合并到基础数据库中。
+
+支持导出和导入 JSON Lines 文件，以便在不同的运行环境之间迁移缓存：
+
+    python verdict_store.py export verdicts.jsonl
+    python verdict_store.py import verdicts.jsonl
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+VERDICT_DB_PATH = Path(__file__).parent / "data" / "verdicts.sqlite3"
+
+# 中国域名判定结果的有效期，单位秒
+POSITIVE_TTL = 30 * 24 * 3600
+# 非中国域名判定结果的有效期，单位秒
+NEGATIVE_TTL = 7 * 24 * 3600
+# 每批提交的写入条数
+BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    domain TEXT PRIMARY KEY,
+    is_cn INTEGER NOT NULL,
+    ips TEXT NOT NULL,
+    country TEXT,
+    checked_at INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+_UPSERT = """
+INSERT INTO verdicts (domain, is_cn, ips, country, checked_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(domain) DO UPDATE SET
+    is_cn = excluded.is_cn,
+    ips = excluded.ips,
+    country = excluded.country,
+    checked_at = excluded.checked_at
+WHERE excluded.checked_at >= verdicts.checked_at
+"""
+
+_MERGE = """
+INSERT INTO verdicts (domain, is_cn, ips, country, checked_at)
+SELECT domain, is_cn, ips, country, checked_at FROM source.verdicts WHERE true
+ON CONFLICT(domain) DO UPDATE SET
+    is_cn = excluded.is_cn,
+    ips = excluded.ips,
+    country = excluded.country,
+    checked_at = excluded.checked_at
+WHERE excluded.checked_at >= verdicts.checked_at
+"""
+
+_SELECT = "SELECT domain, is_cn, ips, country, checked_at FROM {table} WHERE domain = ?"
+
+
+def _has_verdicts(conn: sqlite3.Connection, schema: str) -> bool:
+    """判断附加的数据库中是否存在判定结果表"""
+    row = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master "
+        "WHERE type = 'table' AND name = 'verdicts'"
+    ).fetchone()
+    return row is not None
+
+
+class VerdictStore:
+    """域名判定结果的持久化存储"""
+
+    def __init__(
+        self,
+        path: Path = VERDICT_DB_PATH,
+        positive_ttl: int = POSITIVE_TTL,
+        negative_ttl: int = NEGATIVE_TTL,
+        batch_size: int = BATCH_SIZE,
+        base: Optional[Path] = None,
+    ):
+        self.path = Path(path)
+        # 只读的基础数据库，查询时与本数据库一起读取，写入只进入本数据库
+        self.base = Path(base) if base is not None else None
+        self._has_base = False
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        # 尚未提交的写入，按域名去重
+        self._pending: dict[str, tuple[str, int, str, Optional[str], int]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            if self.base is not None and self.base.exists():
+                conn.execute("ATTACH DATABASE ? AS base", (str(self.base),))
+                self._has_base = _has_verdicts(conn, "base")
+            self._conn = conn
+        return self._conn
+
+    def _is_fresh(self, is_cn: bool, checked_at: int, now: float) -> bool:
+        ttl = self.positive_ttl if is_cn else self.negative_ttl
+        return now - checked_at < ttl
+
+    def get(self, domain: str) -> Optional[bool]:
+        """返回未过期的判定结果，不存在或已过期时返回 None"""
+        row = self._pending.get(domain)
+        if row is None:
+            conn = self._connect()
+            if self._has_base:
+                # 两个数据库中较新的记录
+                row = conn.execute(
+                    _SELECT.format(table="verdicts")
+                    + " UNION ALL "
+                    + _SELECT.format(table="base.verdicts")
+                    + " ORDER BY checked_at DESC LIMIT 1",
+                    (domain, domain),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    _SELECT.format(table="verdicts"), (domain,)
+                ).fetchone()
+        if row is None:
+            return None
+
+        is_cn = bool(row[1])
+        if not self._is_fresh(is_cn, row[4], time.time()):
+            return None
+        return is_cn
+
+    def put(
+        self,
+        domain: str,
+        is_cn: bool,
+        ips: Iterable[str] = (),
+        country: Optional[str] = None,
+        checked_at: Optional[int] = None,
+    ) -> None:
+        """记录判定结果，累积到一批后统一提交"""
+        if checked_at is None:
+            checked_at = int(time.time())
+        self._pending[domain] = (
+            domain,
+            int(is_cn),
+            ",".join(ips),
+            country,
+            checked_at,
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """在单个事务中提交全部未提交的写入"""
+        if not self._pending:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(_UPSERT, self._pending.values())
+        self._pending.clear()
+
+    def merge(self, path: Path) -> int:
+        """将另一个数据库中的判定结果合并进来，已有记录只会被更新的结果覆盖，返回读取条数"""
+        if not Path(path).exists():
+            return 0
+        self.flush()
+        conn = self._connect()
+        conn.execute("ATTACH DATABASE ? AS source", (str(path),))
+        try:
+            if not _has_verdicts(conn, "source"):
+                return 0
+            count = conn.execute("SELECT count(*) FROM source.verdicts").fetchone()[0]
+            with conn:
+                conn.execute(_MERGE)
+        finally:
+            conn.execute("DETACH DATABASE source")
+        return count
+
+    def close(self) -> None:
+        """提交剩余写入并关闭数据库"""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def export_jsonl(self, path: Path) -> int:
+        """将全部判定结果导出为 JSON Lines 文件，返回导出条数"""
+        self.flush()
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            cursor = self._connect().execute(
+                "SELECT domain, is_cn, ips, country, checked_at "
+                "FROM verdicts ORDER BY domain"
+            )
+            for domain, is_cn, ips, country, checked_at in cursor:
+                record = {
+                    "domain": domain,
+                    "is_cn": bool(is_cn),
+                    "ips": ips.split(",") if ips else [],
+                    "country": country,
+                    "checked_at": checked_at,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, path: Path) -> int:
+        """从 JSON Lines 文件导入判定结果，已有记录只会被更新的结果覆盖，返回读取条数"""
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.put(
+                    record["domain"],
+                    record["is_cn"],
+                    record.get("ips", []),
+                    record.get("country"),
+                    record["checked_at"],
+                )
+                count += 1
+        self.flush()
+        return count
+
+
+def remove_database(path: Path) -> None:
+    """删除数据库文件及其 WAL 和共享内存文件"""
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+
+
+def main():
+    """命令行入口：导出或导入判定缓存"""
+    parser = argparse.ArgumentParser(description="导出或导入持久化的域名判定缓存")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("file", type=Path, help="JSON Lines 文件路径")
+    parser.add_argument("--db", type=Path, default=VERDICT_DB_PATH, help="数据库路径")
+    args = parser.parse_args()
+
+    store = VerdictStore(args.db)
+    try:
+        if args.action == "export":
+            count = store.export_jsonl(args.file)
+            print(f"已导出 {count} 条判定结果到 {args.file}")
+        else:
+            count = store.import_jsonl(args.file)
+            print(f"已从 {args.file} 导入 {count} 条判定结果")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()